@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+"""Compare two result files written by `run_benchmarks.py`, e.g. of two commits.
+
+For each task and number of threads present in both files, the median wall
+time, event loop time, event rate and peak memory of the baseline and of the
+new results are printed, together with their ratio (new/baseline). With
+`--phases`, the timings of the individual phases of the runs are compared
+as well.
+"""
+from __future__ import print_function
+
+import argparse
+import json
+
+
+__all__ = ['compare_results']
+
+
+_QUANTITIES = [
+    ('wall_seconds', 'wall [s]', 1.0),
+    ('event_loop_seconds', 'event loop [s]', 1.0),
+    ('event_loop_events_per_second', 'events/s', 1.0),
+    ('peak_rss_bytes', 'peak RSS [MB]', 1.0 / 1024.0**2),
+]
+
+
+def _get_summaries(result_file_content):
+    return {(_r['task'], _r['jobs']): _r['summary'] for _r in result_file_content['results']}
+
+
+def _format_ratio(baseline, new):
+    if not baseline or new is None:
+        return '-'
+    return '{:.3f}'.format(float(new) / baseline)
+
+
+def compare_results(baseline, new, phases=False):
+    """Print the summaries of the results `new` next to those of `baseline` (contents of result files)."""
+    _baseline_summaries = _get_summaries(baseline)
+    _new_summaries = _get_summaries(new)
+
+    print("[INFO] Baseline: commit {}{} on '{}' (ROOT {})".format(
+        baseline['commit'], ' (dirty)' if baseline['dirty'] else '', baseline['host'], baseline['root_version']))
+    print("[INFO] New:      commit {}{} on '{}' (ROOT {})".format(
+        new['commit'], ' (dirty)' if new['dirty'] else '', new['host'], new['root_version']))
+    if baseline['host'] != new['host']:
+        print("[WARNING] Results were obtained on different hosts!")
+
+    for _key in sorted(set(_baseline_summaries) ^ set(_new_summaries)):
+        print("[WARNING] Task '{}' with {} thread(s) only present in one of the result files. Skipping...".format(*_key))
+
+    print("{:<24} {:>4} {:<16} {:>12} {:>12} {:>8}".format('task', 'jobs', 'quantity', 'baseline', 'new', 'ratio'))
+    for _key in sorted(set(_baseline_summaries) & set(_new_summaries)):
+        _baseline_summary, _new_summary = _baseline_summaries[_key], _new_summaries[_key]
+        _rows = [(_label, _baseline_summary[_quantity], _new_summary[_quantity], _scale) for _quantity, _label, _scale in _QUANTITIES]
+        if phases:
+            _rows += [
+                ("{} [s]".format(_phase), _baseline_summary['phases'].get(_phase), _new_summary['phases'].get(_phase), 1.0)
+                for _phase in sorted(set(_baseline_summary['phases']) | set(_new_summary['phases']))
+            ]
+        for _label, _baseline_value, _new_value, _scale in _rows:
+            print("{:<24} {:>4} {:<16} {:>12} {:>12} {:>8}".format(
+                _key[0], _key[1], _label,
+                '{:.2f}'.format(_baseline_value * _scale) if _baseline_value is not None else '-',
+                '{:.2f}'.format(_new_value * _scale) if _new_value is not None else '-',
+                _format_ratio(_baseline_value, _new_value)))
+
+
+if __name__ == "__main__":
+
+    _parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    _parser.add_argument('BASELINE', help="Result file to compare against.")
+    _parser.add_argument('NEW', help="Result file to compare.")
+    _parser.add_argument('--phases', help="Also compare the timings of the phases of the runs (configuration, JIT, booking, etc.).", action='store_true')
+    _args = _parser.parse_args()
+
+    with open(_args.BASELINE) as _f:
+        _baseline = json.load(_f)
+    with open(_args.NEW) as _f:
+        _new = json.load(_f)
+
+    compare_results(_baseline, _new, phases=_args.phases)
@@ -0,0 +1,252 @@
+#!/usr/bin/env python
+"""Generate a synthetic ntuple with the branches written by `NtupleFlatOutput` (data) for benchmarking Lumberjack.
+
+The events are drawn from simple models of the real distributions: a steeply
+falling leading jet pT spectrum with an almost balanced second jet, jet
+rapidities concentrated in the central region, back-to-back jets in phi,
+Poisson-distributed pile-up and trigger bits which follow the L1/HLT
+thresholds (and typical prescales) of the single-jet and dijet trigger
+paths in the `dijet` analysis configuration. The bit indices are those of
+`_trigger_index_map` in `cfg/dijet/definitions.py`.
+
+The events are generated in compiled C++ code, so even large ntuples are
+produced quickly. The same `--seed` always yields the same ntuple.
+"""
+from __future__ import print_function
+
+import argparse
+import os
+import time
+
+
+__all__ = ['generate_ntuple']
+
+
+_GENERATOR_CODE = r"""
+#include <algorithm>
+#include <cmath>
+#include "TFile.h"
+#include "TMath.h"
+#include "TRandom3.h"
+#include "TTree.h"
+
+namespace lumberjack {
+namespace benchmark {
+
+// branches of `NtupleFlatOutput` for data (see 'DijetAnalysis/src/NtupleFlatOutput.cc')
+struct NtupleEntry {
+    Long64_t run; Int_t lumi; Long64_t event; Int_t bx;
+    Double_t rho; Int_t npv; Int_t npvGood; Double_t nPUMean;
+    Double_t jet1pt; Double_t jet1phi; Double_t jet1eta; Double_t jet1y; Int_t jet1id;
+    Double_t jet2pt; Double_t jet2phi; Double_t jet2eta; Double_t jet2y; Int_t jet2id;
+    Double_t jet12mass; Double_t jet12ptave; Double_t jet12ystar; Double_t jet12yboost;
+    Int_t binIndexJet12PtAve; Int_t binIndexJet12Mass;
+    Double_t met; Double_t sumEt;
+    Long64_t hltBits; Long64_t hltJet1Match; Long64_t hltJet2Match; Long64_t hltJet12Match;
+    Long64_t hltJet1PtPassThresholdsL1; Long64_t hltJet1PtPassThresholdsHLT;
+    Long64_t hltJet2PtPassThresholdsL1; Long64_t hltJet2PtPassThresholdsHLT;
+    Long64_t hltJet12PtAvePassThresholdsL1; Long64_t hltJet12PtAvePassThresholdsHLT;
+    Double_t jet1NeutralHadronFraction; Double_t jet1ChargedHadronFraction; Double_t jet1MuonFraction; Double_t jet1PhotonFraction;
+    Double_t jet1ElectronFraction; Double_t jet1HFHadronFraction; Double_t jet1HFEMFraction;
+    Double_t jet2NeutralHadronFraction; Double_t jet2ChargedHadronFraction; Double_t jet2MuonFraction; Double_t jet2PhotonFraction;
+    Double_t jet2ElectronFraction; Double_t jet2HFHadronFraction; Double_t jet2HFEMFraction;
+};
+
+// HLT thresholds of the single-jet (AK4: bits 1-10, AK8: bits 11-20) and dijet (bits 21-29) trigger paths
+const int kNSingleJetPaths = 10;
+const double kSingleJetThresholds[kNSingleJetPaths] = {40, 60, 80, 140, 200, 260, 320, 400, 450, 500};
+const double kSingleJetPrescales[kNSingleJetPaths] = {5000, 1000, 500, 100, 30, 10, 5, 2, 1, 1};
+const int kNDijetPaths = 9;
+const double kDijetThresholds[kNDijetPaths] = {40, 60, 80, 140, 200, 260, 320, 400, 500};
+const double kDijetPrescales[kNDijetPaths] = {5000, 1000, 500, 100, 30, 10, 5, 2, 1};
+
+// L1 seeds have lower thresholds than the HLT paths
+const double kL1ThresholdFraction = 0.7;
+
+// bin edges of the dijet pT average and mass (for the bin index branches)
+const int kNPtAveEdges = 10;
+const double kPtAveEdges[kNPtAveEdges] = {40, 60, 80, 140, 200, 260, 320, 400, 500, 7000};
+const int kNMassEdges = 10;
+const double kMassEdges[kNMassEdges] = {100, 200, 300, 500, 750, 1000, 1500, 2000, 3000, 13000};
+
+inline int findBin(const double* edges, int nEdges, double value) {
+    for (int i = 0; i < nEdges - 1; ++i)
+        if (edges[i] <= value && value < edges[i + 1]) return i;
+    return -1;
+}
+
+inline double truncatedGaus(TRandom3& rng, double sigma, double limit) {
+    double value;
+    do { value = rng.Gaus(0, sigma); } while (std::abs(value) >= limit);
+    return value;
+}
+
+inline double wrapPhi(double phi) {
+    while (phi >= TMath::Pi()) phi -= 2 * TMath::Pi();
+    while (phi < -TMath::Pi()) phi += 2 * TMath::Pi();
+    return phi;
+}
+
+// energy fractions of the particle-flow candidates in a jet (summing to one)
+inline void pfFractions(TRandom3& rng, double* fractions) {
+    static const double kMeans[7] = {0.10, 0.60, 0.005, 0.25, 0.01, 0.02, 0.015};
+    double sum = 0;
+    for (int i = 0; i < 7; ++i) { fractions[i] = rng.Exp(kMeans[i]); sum += fractions[i]; }
+    for (int i = 0; i < 7; ++i) fractions[i] /= sum;
+}
+
+// trigger decisions of a group of paths for a given trigger-level quantity (leading jet pT or dijet pT average)
+inline void triggerPaths(TRandom3& rng, double value, int firstBit, int nPaths, const double* thresholds, const double* prescales,
+                         Long64_t& fired, Long64_t& matched, Long64_t& passL1, Long64_t& passHLT) {
+    // resolution of the trigger-level quantity
+    const double hltValue = value * (1 + 0.08 * rng.Gaus());
+    const double l1Value = value * (1 + 0.15 * rng.Gaus());
+    for (int i = 0; i < nPaths; ++i) {
+        const Long64_t bit = Long64_t(1) << (firstBit + i);
+        const bool l1 = (l1Value > kL1ThresholdFraction * thresholds[i]);
+        const bool hlt = (hltValue > thresholds[i]);
+        if (l1) passL1 |= bit;
+        if (hlt) passHLT |= bit;
+        if (l1 && hlt && rng.Rndm() * prescales[i] < 1) {
+            fired |= bit;
+            if (rng.Rndm() < 0.97) matched |= bit;
+        }
+    }
+}
+
+Long64_t generate(const char* filePath, const char* treeName, Long64_t nEvents, UInt_t seed, double minJetPt, Int_t nRuns) {
+    TFile file(filePath, "RECREATE");
+    TTree tree(treeName, treeName);
+
+    NtupleEntry e;
+#define LUMBERJACK_BENCHMARK_BRANCH(name, type) tree.Branch(#name, &e.name, #name "/" #type);
+    LUMBERJACK_BENCHMARK_BRANCH(run, L) LUMBERJACK_BENCHMARK_BRANCH(lumi, I) LUMBERJACK_BENCHMARK_BRANCH(event, L) LUMBERJACK_BENCHMARK_BRANCH(bx, I)
+    LUMBERJACK_BENCHMARK_BRANCH(rho, D) LUMBERJACK_BENCHMARK_BRANCH(npv, I) LUMBERJACK_BENCHMARK_BRANCH(npvGood, I) LUMBERJACK_BENCHMARK_BRANCH(nPUMean, D)
+    LUMBERJACK_BENCHMARK_BRANCH(jet1pt, D) LUMBERJACK_BENCHMARK_BRANCH(jet1phi, D) LUMBERJACK_BENCHMARK_BRANCH(jet1eta, D)
+    LUMBERJACK_BENCHMARK_BRANCH(jet1y, D) LUMBERJACK_BENCHMARK_BRANCH(jet1id, I)
+    LUMBERJACK_BENCHMARK_BRANCH(jet2pt, D) LUMBERJACK_BENCHMARK_BRANCH(jet2phi, D) LUMBERJACK_BENCHMARK_BRANCH(jet2eta, D)
+    LUMBERJACK_BENCHMARK_BRANCH(jet2y, D) LUMBERJACK_BENCHMARK_BRANCH(jet2id, I)
+    LUMBERJACK_BENCHMARK_BRANCH(jet12mass, D) LUMBERJACK_BENCHMARK_BRANCH(jet12ptave, D)
+    LUMBERJACK_BENCHMARK_BRANCH(jet12ystar, D) LUMBERJACK_BENCHMARK_BRANCH(jet12yboost, D)
+    LUMBERJACK_BENCHMARK_BRANCH(binIndexJet12PtAve, I) LUMBERJACK_BENCHMARK_BRANCH(binIndexJet12Mass, I)
+    LUMBERJACK_BENCHMARK_BRANCH(met, D) LUMBERJACK_BENCHMARK_BRANCH(sumEt, D)
+    LUMBERJACK_BENCHMARK_BRANCH(hltBits, L) LUMBERJACK_BENCHMARK_BRANCH(hltJet1Match, L)
+    LUMBERJACK_BENCHMARK_BRANCH(hltJet2Match, L) LUMBERJACK_BENCHMARK_BRANCH(hltJet12Match, L)
+    LUMBERJACK_BENCHMARK_BRANCH(hltJet1PtPassThresholdsL1, L) LUMBERJACK_BENCHMARK_BRANCH(hltJet1PtPassThresholdsHLT, L)
+    LUMBERJACK_BENCHMARK_BRANCH(hltJet2PtPassThresholdsL1, L) LUMBERJACK_BENCHMARK_BRANCH(hltJet2PtPassThresholdsHLT, L)
+    LUMBERJACK_BENCHMARK_BRANCH(hltJet12PtAvePassThresholdsL1, L) LUMBERJACK_BENCHMARK_BRANCH(hltJet12PtAvePassThresholdsHLT, L)
+    LUMBERJACK_BENCHMARK_BRANCH(jet1NeutralHadronFraction, D) LUMBERJACK_BENCHMARK_BRANCH(jet1ChargedHadronFraction, D)
+    LUMBERJACK_BENCHMARK_BRANCH(jet1MuonFraction, D) LUMBERJACK_BENCHMARK_BRANCH(jet1PhotonFraction, D)
+    LUMBERJACK_BENCHMARK_BRANCH(jet1ElectronFraction, D) LUMBERJACK_BENCHMARK_BRANCH(jet1HFHadronFraction, D)
+    LUMBERJACK_BENCHMARK_BRANCH(jet1HFEMFraction, D)
+    LUMBERJACK_BENCHMARK_BRANCH(jet2NeutralHadronFraction, D) LUMBERJACK_BENCHMARK_BRANCH(jet2ChargedHadronFraction, D)
+    LUMBERJACK_BENCHMARK_BRANCH(jet2MuonFraction, D) LUMBERJACK_BENCHMARK_BRANCH(jet2PhotonFraction, D)
+    LUMBERJACK_BENCHMARK_BRANCH(jet2ElectronFraction, D) LUMBERJACK_BENCHMARK_BRANCH(jet2HFHadronFraction, D)
+    LUMBERJACK_BENCHMARK_BRANCH(jet2HFEMFraction, D)
+#undef LUMBERJACK_BENCHMARK_BRANCH
+
+    TRandom3 rng(seed);
+    const Long64_t nEventsPerRun = std::max(Long64_t(1), nEvents / std::max(1, nRuns));
+    double fractions[7];
+
+    for (Long64_t i = 0; i < nEvents; ++i) {
+        // -- event information (runs and luminosity sections in increasing order)
+        e.run = 297050 + i / nEventsPerRun;
+        e.lumi = 1 + (i % nEventsPerRun) / 1000;
+        e.event = i + 1;
+        e.bx = 1 + int(rng.Rndm() * 3564);
+
+        // -- pile-up
+        e.nPUMean = std::max(1.0, rng.Gaus(32, 8));
+        e.npv = std::max(1, int(rng.Poisson(0.7 * e.nPUMean)));
+        e.npvGood = (rng.Rndm() < 0.001) ? 0 : e.npv;
+        e.rho = std::max(0.0, 0.55 * e.npv + rng.Gaus(2, 1.5));
+
+        // -- leading jets: falling spectrum (dN/dpT ~ pT^-5) and an almost balanced second jet
+        e.jet1pt = minJetPt * std::pow(1 - rng.Rndm(), -0.25);
+        e.jet2pt = e.jet1pt * (1 - std::abs(rng.Gaus(0, 0.12)));
+        e.jet1y = truncatedGaus(rng, 1.4, 4.7);
+        e.jet2y = truncatedGaus(rng, 1.4, 4.7);
+        e.jet1eta = e.jet1y * (1 + 0.01 * std::abs(rng.Gaus()));
+        e.jet2eta = e.jet2y * (1 + 0.01 * std::abs(rng.Gaus()));
+        e.jet1phi = (2 * rng.Rndm() - 1) * TMath::Pi();
+        e.jet2phi = wrapPhi(e.jet1phi + TMath::Pi() + rng.Gaus(0, 0.15));
+        e.jet1id = (rng.Rndm() < 0.98) ? 3 : 1;
+        e.jet2id = (rng.Rndm() < 0.98) ? 3 : 1;
+
+        e.jet12ptave = 0.5 * (e.jet1pt + e.jet2pt);
+        e.jet12ystar = 0.5 * (e.jet1y - e.jet2y);
+        e.jet12yboost = 0.5 * (e.jet1y + e.jet2y);
+        e.jet12mass = std::sqrt(2 * e.jet1pt * e.jet2pt * (std::cosh(e.jet1y - e.jet2y) - std::cos(e.jet1phi - e.jet2phi)));
+        e.binIndexJet12PtAve = findBin(kPtAveEdges, kNPtAveEdges, e.jet12ptave);
+        e.binIndexJet12Mass = findBin(kMassEdges, kNMassEdges, e.jet12mass);
+
+        // -- missing and total transverse energy
+        e.met = rng.Exp(25);
+        e.sumEt = e.met + e.jet1pt + e.jet2pt + rng.Exp(300) + 15 * e.npv;
+
+        // -- trigger decisions, trigger object matching and trigger thresholds
+        e.hltBits = (rng.Rndm() < 0.05) ? 1 : 0;  // HLT_IsoMu24 (reference trigger)
+        e.hltJet1Match = e.hltJet2Match = e.hltJet12Match = 0;
+        e.hltJet1PtPassThresholdsL1 = e.hltJet1PtPassThresholdsHLT = 0;
+        e.hltJet2PtPassThresholdsL1 = e.hltJet2PtPassThresholdsHLT = 0;
+        e.hltJet12PtAvePassThresholdsL1 = e.hltJet12PtAvePassThresholdsHLT = 0;
+        Long64_t jet2Fired = 0;
+        for (int firstBit : {1, 11}) {  // AK4 and AK8 jets
+            triggerPaths(rng, e.jet1pt, firstBit, kNSingleJetPaths, kSingleJetThresholds, kSingleJetPrescales,
+                         e.hltBits, e.hltJet1Match, e.hltJet1PtPassThresholdsL1, e.hltJet1PtPassThresholdsHLT);
+            triggerPaths(rng, e.jet2pt, firstBit, kNSingleJetPaths, kSingleJetThresholds, kSingleJetPrescales,
+                         jet2Fired, e.hltJet2Match, e.hltJet2PtPassThresholdsL1, e.hltJet2PtPassThresholdsHLT);
+        }
+        triggerPaths(rng, e.jet12ptave, 21, kNDijetPaths, kDijetThresholds, kDijetPrescales,
+                     e.hltBits, e.hltJet12Match, e.hltJet12PtAvePassThresholdsL1, e.hltJet12PtAvePassThresholdsHLT);
+
+        // -- particle-flow energy fractions
+        pfFractions(rng, fractions);
+        e.jet1NeutralHadronFraction = fractions[0]; e.jet1ChargedHadronFraction = fractions[1]; e.jet1MuonFraction = fractions[2];
+        e.jet1PhotonFraction = fractions[3]; e.jet1ElectronFraction = fractions[4]; e.jet1HFHadronFraction = fractions[5];
+        e.jet1HFEMFraction = fractions[6];
+        pfFractions(rng, fractions);
+        e.jet2NeutralHadronFraction = fractions[0]; e.jet2ChargedHadronFraction = fractions[1]; e.jet2MuonFraction = fractions[2];
+        e.jet2PhotonFraction = fractions[3]; e.jet2ElectronFraction = fractions[4]; e.jet2HFHadronFraction = fractions[5];
+        e.jet2HFEMFraction = fractions[6];
+
+        tree.Fill();
+    }
+
+    tree.Write();
+    file.Close();
+    return nEvents;
+}
+
+}  // namespace benchmark
+}  // namespace lumberjack
+"""
+
+
+def generate_ntuple(file_path, n_events, tree_name='Events', seed=4357, min_jet_pt=80.0, n_runs=10):
+    """Write `n_events` synthetic events with the `NtupleFlatOutput` data branches to a TTree in a ROOT file."""
+    import ROOT
+
+    if not hasattr(ROOT, 'lumberjack') or not hasattr(ROOT.lumberjack, 'benchmark'):
+        if not ROOT.gInterpreter.Declare(_GENERATOR_CODE):
+            raise RuntimeError("Failed to declare C++ code for generating synthetic ntuples!")
+
+    _start = time.time()
+    ROOT.lumberjack.benchmark.generate(file_path, tree_name, int(n_events), int(seed), float(min_jet_pt), int(n_runs))
+    print("[INFO] Generated {} events in {:.1f} seconds: {} ({:.1f} MB)".format(
+        n_events, time.time() - _start, file_path, os.path.getsize(file_path) / 1024.0**2))
+
+
+if __name__ == "__main__":
+
+    _parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    _parser.add_argument('OUTPUT_FILE', help="Path of the ROOT file to create.")
+    _parser.add_argument('-n', '--num-events', help="Number of events to generate (default: 1000000).", type=int, default=1000000)
+    _parser.add_argument('-t', '--tree', help="Name of the TTree (default: 'Events').", default='Events')
+    _parser.add_argument('--seed', help="Seed of the random number generator (default: 4357).", type=int, default=4357)
+    _parser.add_argument('--min-jet-pt', metavar='GEV', help="Lower end of the leading jet pT spectrum (default: 80).", type=float, default=80.0)
+    _parser.add_argument('--num-runs', help="Number of runs the events are distributed over (default: 10).", type=int, default=10)
+    _args = _parser.parse_args()
+
+    generate_ntuple(_args.OUTPUT_FILE, _args.num_events, tree_name=_args.tree, seed=_args.seed, min_jet_pt=_args.min_jet_pt, n_runs=_args.num_runs)
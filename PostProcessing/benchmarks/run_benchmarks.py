@@ -0,0 +1,220 @@
+#!/usr/bin/env python
+"""Time representative Lumberjack tasks of the `dijet` analysis on a synthetic ntuple at several thread counts.
+
+Each task is run in a separate `lumberjack.py` process (with
+`--profile-report`) for each number of threads given with `--jobs`, and
+`--repeat` times each. The wall time, the time spent in each phase of the
+run, the event rate of the event loop and the peak memory of every run are
+stored, together with the git commit of the repository, the host and the
+ROOT version, in a JSON file under 'benchmarks/results' (by default named
+after the commit, with a '-dirty' suffix if the working tree has
+uncommitted changes). Two such files can be compared with
+`compare_results.py`.
+
+If no `--input` file is given, a synthetic ntuple with `--num-events` events
+is generated first (see `generate_ntuple.py`).
+"""
+from __future__ import print_function
+
+import argparse
+import datetime
+import json
+import os
+import shlex
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from generate_ntuple import generate_ntuple
+
+
+__all__ = ['get_git_commit', 'run_benchmarks', 'run_lumberjack', 'summarize_runs']
+
+
+_BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+_LUMBERJACK_SCRIPT = os.path.join(os.path.dirname(_BENCHMARKS_DIR), 'scripts', 'lumberjack.py')
+
+_DEFAULT_TASKS = ['Count', 'EventYield', 'Occupancy', 'TriggerEfficienciesAK4']
+
+
+def _median(values):
+    _values = sorted(values)
+    _n = len(_values)
+    if not _n:
+        return None
+    if _n % 2:
+        return _values[_n // 2]
+    return 0.5 * (_values[_n // 2 - 1] + _values[_n // 2])
+
+
+def get_git_commit(repo_dir=_BENCHMARKS_DIR):
+    """Hash of the checked-out commit and whether the working tree has uncommitted changes (`None`, `False` outside a git repository)."""
+    try:
+        _commit = subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=repo_dir).decode().strip()
+        _status = subprocess.check_output(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=repo_dir).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None, False
+    return _commit, bool(_status)
+
+
+def run_lumberjack(input_file, task, jobs, work_dir, tree='Events', selections=None, lumberjack_args=None):
+    """Run a single task with `lumberjack.py` in `work_dir` and return its profile report (see `--profile-report`).
+
+    Raises `RuntimeError` if the run fails.
+    """
+    _report_path = os.path.join(work_dir, 'profile_{}_j{}.json'.format(task, jobs))
+    _command = [
+        sys.executable, _LUMBERJACK_SCRIPT,
+        '-a', 'dijet',
+        '--input-type', 'data',
+        '-i', os.path.abspath(input_file),
+        '-t', tree,
+        '-j', str(jobs),
+        '--overwrite',
+        '--profile-report', _report_path,
+    ]
+    if selections:
+        _command += ['--selections'] + list(selections)
+    _command += list(lumberjack_args or [])
+    _command += ['task', task, '--output-file-suffix', 'benchmark']
+
+    _start = time.time()
+    with open(os.path.join(work_dir, 'lumberjack_{}_j{}.log'.format(task, jobs)), 'a') as _log:
+        _return_code = subprocess.call(_command, cwd=work_dir, stdout=_log, stderr=subprocess.STDOUT)
+    _wall_seconds = time.time() - _start
+
+    if _return_code != 0 or not os.path.exists(_report_path):
+        raise RuntimeError("Benchmark run of task '{}' with {} thread(s) failed (exit code {}). See log in '{}'.".format(
+            task, jobs, _return_code, work_dir))
+
+    with open(_report_path) as _f:
+        _report = json.load(_f)
+    os.remove(_report_path)
+
+    # the wall time measured outside the process also includes starting the interpreter
+    _report['process_wall_seconds'] = _wall_seconds
+    return _report
+
+
+def summarize_runs(runs):
+    """Medians of the wall time, the event loop time and rate, the phase timings and the peak memory of repeated runs."""
+    _event_loop_seconds = [sum([_e['seconds'] for _e in _run['event_loops']]) for _run in runs]
+    _n_events = [sum([_e['n_events'] for _e in _run['event_loops']]) for _run in runs]
+
+    _phases = sorted(set([_phase for _run in runs for _phase in _run['phases']]))
+
+    return dict(
+        n_runs=len(runs),
+        wall_seconds=_median([_run['process_wall_seconds'] for _run in runs]),
+        event_loop_seconds=_median(_event_loop_seconds),
+        event_loop_events_per_second=_median([_n / max(_s, 1e-9) for _n, _s in zip(_n_events, _event_loop_seconds)]),
+        n_events=_median(_n_events),
+        peak_rss_bytes=_median([_run['peak_rss_bytes'] for _run in runs]),
+        phases={_phase: _median([_run['phases'].get(_phase, 0) for _run in runs]) for _phase in _phases},
+    )
+
+
+def run_benchmarks(input_file, tasks, jobs_list, repeat=1, tree='Events', selections=None, lumberjack_args=None, keep_work_dir=False):
+    """Run every task with each number of threads in `jobs_list`, `repeat` times each.
+
+    Returns a list with one entry per task and number of threads, holding the
+    summary (see :py:func:`summarize_runs`) and the individual runs.
+    """
+    _work_dir = tempfile.mkdtemp(prefix='lumberjack_benchmark_')
+    _results = []
+    try:
+        for _task in tasks:
+            for _jobs in jobs_list:
+                _runs = []
+                for _i_repeat in range(repeat):
+                    print("[INFO] Running task '{}' with {} thread(s) ({}/{})...".format(_task, _jobs, _i_repeat + 1, repeat))
+                    _runs.append(run_lumberjack(input_file, _task, _jobs, _work_dir, tree=tree, selections=selections, lumberjack_args=lumberjack_args))
+                _results.append(dict(task=_task, jobs=_jobs, summary=summarize_runs(_runs), runs=_runs))
+    finally:
+        if keep_work_dir:
+            print("[INFO] Outputs and logs of the benchmark runs kept in: {}".format(_work_dir))
+        else:
+            shutil.rmtree(_work_dir)
+
+    return _results
+
+
+def _print_summary(results):
+    print("{:<24} {:>4} {:>10} {:>14} {:>14} {:>12}".format('task', 'jobs', 'wall [s]', 'event loop [s]', 'events/s', 'peak RSS [MB]'))
+    for _result in results:
+        _summary = _result['summary']
+        print("{:<24} {:>4} {:>10.2f} {:>14.2f} {:>14.0f} {:>12.1f}".format(
+            _result['task'], _result['jobs'], _summary['wall_seconds'], _summary['event_loop_seconds'],
+            _summary['event_loop_events_per_second'], _summary['peak_rss_bytes'] / 1024.0**2))
+
+
+if __name__ == "__main__":
+
+    _parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    _parser.add_argument('--input', metavar='FILE', help="Ntuple to run the tasks on. If not given, a synthetic ntuple is generated.", default=None)
+    _parser.add_argument('-t', '--tree', help="Name of the TTree (default: 'Events').", default='Events')
+    _parser.add_argument('-n', '--num-events', help="Number of events of the generated ntuple (default: 1000000).", type=int, default=1000000)
+    _parser.add_argument('--seed', help="Seed for generating the ntuple (default: 4357).", type=int, default=4357)
+    _parser.add_argument('--tasks', metavar='TASK', help="Tasks of the 'dijet' analysis to run (default: {}).".format(' '.join(_DEFAULT_TASKS)),
+                         nargs='+', default=_DEFAULT_TASKS)
+    _parser.add_argument('-j', '--jobs', metavar='N', help="Numbers of threads to run each task with (default: 1 2 4).", type=int, nargs='+', default=[1, 2, 4])
+    _parser.add_argument('--repeat', help="Number of runs of each task and number of threads. The medians are reported (default: 3).", type=int, default=3)
+    _parser.add_argument('--selections', metavar='SELECTION', help="Selections passed to `lumberjack.py` (default: recoJetPhaseSpace).",
+                         nargs='*', default=['recoJetPhaseSpace'])
+    _parser.add_argument('--lumberjack-args', metavar='ARGS', help="Additional arguments for `lumberjack.py`, "
+                                                                   "e.g. \"--batch-fills --split-index\".", default='')
+    _parser.add_argument('-o', '--output', metavar='FILE', help="Path of the result file (default: 'benchmarks/results/<COMMIT>.json').", default=None)
+    _parser.add_argument('--keep-work-dir', help="Keep the outputs and logs of the runs.", action='store_true')
+    _args = _parser.parse_args()
+
+    _commit, _dirty = get_git_commit()
+
+    _output = _args.output
+    if _output is None:
+        _output = os.path.join(_BENCHMARKS_DIR, 'results', '{}{}.json'.format(_commit or 'unknown', '-dirty' if _dirty else ''))
+    if os.path.dirname(_output) and not os.path.isdir(os.path.dirname(_output)):
+        os.makedirs(os.path.dirname(_output))
+
+    _input = _args.input
+    _input_dir = None
+    if _input is None:
+        _input_dir = tempfile.mkdtemp(prefix='lumberjack_benchmark_input_')
+        _input = os.path.join(_input_dir, 'ntuple.root')
+        generate_ntuple(_input, _args.num_events, tree_name=_args.tree, seed=_args.seed)
+
+    try:
+        _results = run_benchmarks(
+            _input, _args.tasks, _args.jobs,
+            repeat=_args.repeat,
+            tree=_args.tree,
+            selections=_args.selections,
+            lumberjack_args=shlex.split(_args.lumberjack_args),
+            keep_work_dir=_args.keep_work_dir,
+        )
+    finally:
+        if _input_dir is not None:
+            shutil.rmtree(_input_dir)
+
+    import ROOT
+
+    with open(_output, 'w') as _f:
+        json.dump(dict(
+            commit=_commit,
+            dirty=_dirty,
+            host=socket.gethostname(),
+            time=datetime.datetime.now().isoformat(),
+            root_version=ROOT.gROOT.GetVersion(),
+            python_version=sys.version.split()[0],
+            input=_args.input,
+            num_events=_args.num_events if _args.input is None else None,
+            seed=_args.seed if _args.input is None else None,
+            selections=_args.selections,
+            lumberjack_args=_args.lumberjack_args,
+            results=_results,
+        ), _f, indent=1, sort_keys=True)
+
+    _print_summary(_results)
+    print("[INFO] Benchmark results written to file: {}".format(_output))
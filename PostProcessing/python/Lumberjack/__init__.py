@@ -1,3 +1,19 @@
+from ._batching import *
+from ._bitmask import *
+from ._booking_plan import *
+from ._cache import *
 from ._core import *
+from ._entry_ranges import *
+from ._expressions import *
+from ._incremental import *
+from ._jit import *
+from ._numpy_backend import *
+from ._output import *
+from ._parallel import *
 from ._postprocessor import *
+from ._profiling import *
+from ._progress import *
+from ._splitting import *
+from ._tree_io import *
 from ._ui import *
+from ._vectorize import *
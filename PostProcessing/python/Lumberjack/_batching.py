@@ -0,0 +1,661 @@
+from __future__ import print_function
+
+import bisect
+import hashlib
+import itertools
+import numpy as np
+
+from array import array
+
+from ._splitting import SplittingIndex, _cpp_double_literal, _declare_once, get_cut_expressions
+
+
+__all__ = ['BatchedObject', 'FillStatistics', 'RaggedBinnings', 'SplitSlots', 'WeightVariants']
+
+
+# C++ helpers for computing the slots of the splits matching an event
+_BATCHING_HELPERS_CODE = """
+#include <algorithm>
+#include <initializer_list>
+#include <limits>
+#include <utility>
+#include <vector>
+#include "ROOT/RVec.hxx"
+
+namespace lumberjack {
+namespace batch {
+
+using Slots = ROOT::VecOps::RVec<int>;
+
+/*
+ * Positions of the conditions which are true
+ */
+inline Slots select(std::initializer_list<bool> conditions) {
+    Slots slots;
+    int position = 0;
+    for (const bool condition : conditions) {
+        if (condition) slots.push_back(position);
+        ++position;
+    }
+    return slots;
+}
+
+/*
+ * Position of the value with index `index` (if not -1), and the positions of the values matching all events
+ */
+inline Slots lookup(const int index, std::initializer_list<int> positionsByIndex, std::initializer_list<int> catchAllPositions) {
+    Slots slots(catchAllPositions);
+    if (index >= 0) slots.push_back(*(positionsByIndex.begin() + index));
+    return slots;
+}
+
+/*
+ * Flat slots of all combinations of the `outer` and `inner` slots
+ */
+inline Slots combine(const Slots& outer, const int nInner, const Slots& inner) {
+    Slots slots;
+    slots.reserve(outer.size() * inner.size());
+    for (const int o : outer) {
+        for (const int i : inner) slots.push_back(o * nInner + i);
+    }
+    return slots;
+}
+
+/*
+ * Slots translated via `table`, dropping those mapped to -1
+ */
+inline Slots remap(const Slots& slots, std::initializer_list<int> table) {
+    Slots mapped;
+    for (const int s : slots) {
+        const int m = *(table.begin() + s);
+        if (m >= 0) mapped.push_back(m);
+    }
+    return mapped;
+}
+
+/*
+ * `value` once for each slot (for filling all slots at once)
+ */
+template <typename T>
+inline ROOT::VecOps::RVec<double> repeat(const T& value, const Slots& slots) {
+    return ROOT::VecOps::RVec<double>(slots.size(), value);
+}
+
+/*
+ * Cells `cell * nVariants + i` holding the sums of the weight variants i of an event in `cell`
+ */
+inline ROOT::VecOps::RVec<int> variantCells(const int cell, const int nVariants) {
+    ROOT::VecOps::RVec<int> cells(nVariants);
+    for (int i = 0; i < nVariants; ++i) cells[i] = cell * nVariants + i;
+    return cells;
+}
+
+/*
+ * Weight variants of an event
+ */
+inline ROOT::VecOps::RVec<double> weights(std::initializer_list<double> variants) {
+    return ROOT::VecOps::RVec<double>(variants);
+}
+
+/*
+ * Terms of the statistics of a histogram or profile (in the order of `TH1::GetStats`, `TH2::GetStats`,
+ * `TProfile::GetStats`, etc.) for a fill with weight `w` and `values` (the values of the binned axes,
+ * followed by the profiled value if `profiled`), followed by the number of entries (1)
+ */
+inline ROOT::VecOps::RVec<double> statsTerms(const double w, const bool profiled, std::initializer_list<double> values) {
+    const double* v = values.begin();
+    const int nBinned = static_cast<int>(values.size()) - (profiled ? 1 : 0);
+    ROOT::VecOps::RVec<double> terms{w, w * w};
+    for (int i = 0; i < nBinned; ++i) {
+        terms.push_back(w * v[i]);
+        terms.push_back(w * v[i] * v[i]);
+        // mixed terms, e.g. sum of w*x*y for 2D histograms
+        for (int j = 0; j < i; ++j) terms.push_back(w * v[j] * v[i]);
+    }
+    if (profiled) {
+        terms.push_back(w * v[nBinned]);
+        terms.push_back(w * v[nBinned] * v[nBinned]);
+    }
+    terms.push_back(1.0);
+    return terms;
+}
+
+/*
+ * Statistics terms for each slot: as in ROOT, the sums only include fills inside the binning (`inRange`) of
+ * the slot, while every fill is counted as an entry
+ */
+inline ROOT::VecOps::RVec<double> slotStats(const ROOT::VecOps::RVec<double>& terms, const ROOT::VecOps::RVec<int>& inRange) {
+    ROOT::VecOps::RVec<double> stats;
+    stats.reserve(inRange.size() * terms.size());
+    for (const int r : inRange) {
+        for (std::size_t k = 0; k + 1 < terms.size(); ++k) stats.push_back(r ? terms[k] : 0.0);
+        stats.push_back(terms[terms.size() - 1]);
+    }
+    return stats;
+}
+
+/*
+ * Statistics terms for each slot, for slots sharing the same binnings
+ */
+inline ROOT::VecOps::RVec<double> slotStats(const ROOT::VecOps::RVec<double>& terms, const bool inRange, const Slots& slots) {
+    return slotStats(terms, ROOT::VecOps::RVec<int>(slots.size(), inRange ? 1 : 0));
+}
+
+/*
+ * Statistics terms for each weight variant (see `statsTerms`)
+ */
+inline ROOT::VecOps::RVec<double> variantStats(const ROOT::VecOps::RVec<double>& weights, const bool inRange, const bool profiled, std::initializer_list<double> values) {
+    ROOT::VecOps::RVec<double> stats;
+    for (const double w : weights) {
+        const ROOT::VecOps::RVec<double> terms = statsTerms(w, profiled, values);
+        for (std::size_t k = 0; k + 1 < terms.size(); ++k) stats.push_back(inRange ? terms[k] : 0.0);
+        stats.push_back(terms[terms.size() - 1]);
+    }
+    return stats;
+}
+
+/*
+ * Cells `slot * nTerms + k` holding the statistics terms of each slot
+ */
+inline ROOT::VecOps::RVec<int> statsCells(const Slots& slots, const int nTerms) {
+    ROOT::VecOps::RVec<int> cells;
+    cells.reserve(slots.size() * nTerms);
+    for (const int s : slots) {
+        for (int k = 0; k < nTerms; ++k) cells.push_back(s * nTerms + k);
+    }
+    return cells;
+}
+
+/*
+ * Binnings differing between slots, stored as one flat buffer of bin edges
+ * with the offsets of the edges of each slot and axis. Each slot has its own
+ * range of cells (bins including under- and overflow) in a flat list.
+ */
+class RaggedBinnings {
+public:
+    RaggedBinnings(std::vector<double> edges, std::vector<int> edgesBegin, std::vector<int> edgesEnd, std::vector<int> cellOffsets, int nAxes) :
+        edges_(std::move(edges)), edgesBegin_(std::move(edgesBegin)), edgesEnd_(std::move(edgesEnd)), cellOffsets_(std::move(cellOffsets)), nAxes_(nAxes) {}
+
+    /*
+     * Flat cell of the values in the binnings of a slot
+     */
+    template <typename... Ts>
+    int cell(const int slot, const Ts&... values) const {
+        const double axisValues[] = {static_cast<double>(values)...};
+        int cell = 0;
+        int stride = 1;
+        for (int axis = 0; axis < nAxes_; ++axis) {
+            const auto first = edges_.begin() + edgesBegin_[slot * nAxes_ + axis];
+            const auto last = edges_.begin() + edgesEnd_[slot * nAxes_ + axis];
+            // 0: underflow, number of edges: overflow (as for ROOT histograms)
+            cell += stride * (std::upper_bound(first, last, axisValues[axis]) - first);
+            stride *= (last - first) + 1;
+        }
+        return cellOffsets_[slot] + cell;
+    }
+
+    /*
+     * Whether the values are inside the binnings of a slot (not in the under- or overflow)
+     */
+    template <typename... Ts>
+    bool inRange(const int slot, const Ts&... values) const {
+        const double axisValues[] = {static_cast<double>(values)...};
+        for (int axis = 0; axis < nAxes_; ++axis) {
+            const double low = edges_[edgesBegin_[slot * nAxes_ + axis]];
+            const double high = edges_[edgesEnd_[slot * nAxes_ + axis] - 1];
+            // values equal to the upper edge (and NaN) are in the overflow, as for ROOT axes
+            if (!(axisValues[axis] >= low && axisValues[axis] < high)) return false;
+        }
+        return true;
+    }
+
+    /*
+     * Whether the values are inside the binnings of each slot
+     */
+    template <typename... Ts>
+    ROOT::VecOps::RVec<int> inRanges(const Slots& slots, const Ts&... values) const {
+        ROOT::VecOps::RVec<int> result;
+        result.reserve(slots.size());
+        for (const int slot : slots) result.push_back(inRange(slot, values...) ? 1 : 0);
+        return result;
+    }
+
+    /*
+     * Flat cells of the values in the binnings of each slot
+     */
+    template <typename... Ts>
+    ROOT::VecOps::RVec<int> cells(const Slots& slots, const Ts&... values) const {
+        ROOT::VecOps::RVec<int> result;
+        result.reserve(slots.size());
+        for (const int slot : slots) result.push_back(cell(slot, values...));
+        return result;
+    }
+
+private:
+    const std::vector<double> edges_;
+    const std::vector<int> edgesBegin_;
+    const std::vector<int> edgesEnd_;
+    const std::vector<int> cellOffsets_;
+    const int nAxes_;
+};
+
+}  // namespace batch
+}  // namespace lumberjack
+"""
+
+
+class SplitSlots(object):
+    """Per-event list of the splits matching an event, as slots (indices) in the flat list of all splits.
+
+    The slot of a split is its flat index in the cross product of the sorted
+    values of the splitting keys. For each key, the matching values are
+    determined via a :py:class:`SplittingIndex` if possible, or by testing
+    the cuts of all values otherwise (values without cuts always match). If
+    the individual `splittings` are not known, the combined splits in
+    `splitting_spec` are treated as the values of a single key.
+    `variable_expressions` maps cut variables which are not columns (e.g. bits
+    of a :py:class:`Bitmask`) to the expressions computing them.
+    """
+
+    def __init__(self, splitting_spec, splittings=None, variable_expressions=None):
+        self._variable_expressions = variable_expressions or {}
+        if splittings is None:
+            self._keys = [(None, sorted(splitting_spec), splitting_spec)]
+        else:
+            _key_names = [_path_element.split(':', 1)[0] for _path_element in sorted(splitting_spec)[0].split('/')]
+            self._keys = [(_key, sorted(splittings[_key]), splittings[_key]) for _key in _key_names]
+        self._split_indices = []
+        self._expression = None
+
+    @property
+    def n_slots(self):
+        """Number of slots (all combinations of the values of the splitting keys)."""
+        return int(np.prod([len(_values) for _, _values, _ in self._keys]))
+
+    def get_slot(self, split_name):
+        """Slot of a split."""
+        if self._keys[0][0] is None:
+            return self._keys[0][1].index(split_name)
+        _slot = 0
+        for (_key, _values, _), _path_element in zip(self._keys, split_name.split('/')):
+            _slot = _slot * len(_values) + _values.index(_path_element.split(':', 1)[1])
+        return _slot
+
+    def _get_cut_expression(self, cuts):
+        '''C++ condition for the cuts of a splitting value'''
+        if not cuts:
+            return "true"
+        return "&&".join(["({})".format(_expr) for _expr in sorted(get_cut_expressions(cuts, self._variable_expressions))])
+
+    def _get_matches_expression(self, key, values, splitting):
+        '''C++ expression for the positions (in `values`) of the values of a splitting key matching an event'''
+        if key is not None:
+            _split_index = SplittingIndex(key, splitting, variable_expressions=self._variable_expressions)
+            if _split_index.is_indexable and _split_index.variables:
+                self._split_indices.append(_split_index)
+                _positions_by_index = [None] * len(values)
+                _catch_all_positions = []
+                for _position, _value in enumerate(values):
+                    _index = _split_index.get_value_index(_value)
+                    if _index is None:
+                        _catch_all_positions.append(_position)
+                    else:
+                        _positions_by_index[_index] = _position
+                return "lumberjack::batch::lookup({}, {{{}}}, {{{}}})".format(
+                    _split_index.expression,
+                    ", ".join([str(_p) for _p in _positions_by_index if _p is not None]),
+                    ", ".join(map(str, _catch_all_positions)),
+                )
+        return "lumberjack::batch::select({{{}}})".format(", ".join([self._get_cut_expression(splitting[_value]) for _value in values]))
+
+    @property
+    def expression(self):
+        """C++ expression for the slots of the splits matching an event."""
+        if self._expression is None:
+            self._split_indices = []
+            _expression = None
+            for _key, _values, _splitting in self._keys:
+                _matches = self._get_matches_expression(_key, _values, _splitting)
+                if _expression is None:
+                    _expression = _matches
+                else:
+                    _expression = "lumberjack::batch::combine({}, {}, {})".format(_expression, len(_values), _matches)
+            self._expression = _expression
+        return self._expression
+
+    @staticmethod
+    def get_remap_expression(slots_column, local_slots, n_slots):
+        """C++ expression for the positions in `local_slots` of the slots in column `slots_column` (other slots are dropped)."""
+        _table = [-1] * n_slots
+        for _local_slot, _slot in enumerate(local_slots):
+            _table[_slot] = _local_slot
+        return "lumberjack::batch::remap({}, {{{}}})".format(slots_column, ", ".join(map(str, _table)))
+
+    @staticmethod
+    def get_repeat_expression(column, slots_column):
+        """C++ expression repeating the value of `column` once for each slot in column `slots_column`."""
+        return "lumberjack::batch::repeat({}, {})".format(column, slots_column)
+
+    def declare(self):
+        """Declare the C++ helpers and the functions of the splitting indices used in `expression`."""
+        # the splitting indices used are determined when building the expression
+        self.expression
+        if not _declare_once(_BATCHING_HELPERS_CODE):
+            raise RuntimeError("Failed to declare C++ helpers for batched filling!")
+        for _split_index in self._split_indices:
+            _split_index.declare()
+
+
+class RaggedBinnings(object):
+    """Binnings of an object differing between splits (e.g. named binnings), for filling all splits at once.
+
+    The bin edges of all slots are stored in one flat buffer, with the offsets
+    of the edges for each slot and axis (identical binnings are stored only
+    once). The cells (bins including under- and overflow) of each slot occupy
+    a contiguous range in a flat list, in the same order as the global bin
+    numbers of a ROOT histogram with the slot's binnings. The flat cell of an
+    event is found with one lookup of the slot's edges and a binary search per
+    axis.
+    """
+
+    def __init__(self, binnings_by_slot):
+        self._binnings_by_slot = [tuple([tuple(_binning) for _binning in _binnings]) for _binnings in binnings_by_slot]
+        self._n_axes = len(self._binnings_by_slot[0])
+
+        self._edges = []
+        self._edges_ranges = []
+        _edges_ranges_by_binning = {}
+        self._cell_offsets = []
+        _n_cells = 0
+        for _binnings in self._binnings_by_slot:
+            if len(_binnings) != self._n_axes:
+                raise ValueError("Cannot store binnings with different numbers of axes: {} and {}!".format(len(_binnings), self._n_axes))
+            for _binning in _binnings:
+                if _binning not in _edges_ranges_by_binning:
+                    _edges_ranges_by_binning[_binning] = (len(self._edges), len(self._edges) + len(_binning))
+                    self._edges += _binning
+                self._edges_ranges.append(_edges_ranges_by_binning[_binning])
+            self._cell_offsets.append(_n_cells)
+            _n_cells += int(np.prod([len(_binning) + 1 for _binning in _binnings]))
+        self._n_cells = _n_cells
+
+    @property
+    def n_cells(self):
+        """Total number of cells of all slots."""
+        return self._n_cells
+
+    @property
+    def n_edges(self):
+        """Number of bin edges in the flat buffer."""
+        return len(self._edges)
+
+    def get_cell_offset(self, slot):
+        """Position of the first cell of a slot in the flat list of cells."""
+        return self._cell_offsets[slot]
+
+    def get_cell(self, slot, *values):
+        """Flat cell of the values (one per axis) in the binnings of a slot."""
+        _cell, _stride = 0, 1
+        for _axis, _value in enumerate(values):
+            _begin, _end = self._edges_ranges[slot * self._n_axes + _axis]
+            _cell += _stride * (bisect.bisect_right(self._edges, float(_value), _begin, _end) - _begin)
+            _stride *= _end - _begin + 1
+        return self._cell_offsets[slot] + _cell
+
+    def is_in_range(self, slot, *values):
+        """Whether the values (one per axis) are inside the binnings of a slot (not in the under- or overflow)."""
+        for _axis, _value in enumerate(values):
+            _begin, _end = self._edges_ranges[slot * self._n_axes + _axis]
+            if not self._edges[_begin] <= float(_value) < self._edges[_end - 1]:
+                return False
+        return True
+
+    @property
+    def name(self):
+        """Name of the C++ object holding the binnings."""
+        _hash = hashlib.md5(repr(self._binnings_by_slot).encode('utf-8')).hexdigest()[:12]
+        return "lumberjack::batch::ragged_{}".format(_hash)
+
+    def get_cell_expression(self, slot, columns):
+        """C++ expression for the flat cell of the values in `columns` (one per axis) for a fixed slot."""
+        return "{}.cell({}, {})".format(self.name, int(slot), ", ".join(columns))
+
+    def get_cells_expression(self, slots_column, columns):
+        """C++ expression for the flat cells of the values in `columns` (one per axis) for the slots in column `slots_column`."""
+        return "{}.cells({}, {})".format(self.name, slots_column, ", ".join(columns))
+
+    def get_in_range_expression(self, slot, columns):
+        """C++ expression for whether the values in `columns` (one per axis) are inside the binnings of a fixed slot."""
+        return "{}.inRange({}, {})".format(self.name, int(slot), ", ".join(columns))
+
+    def get_in_ranges_expression(self, slots_column, columns):
+        """C++ expression for whether the values in `columns` (one per axis) are inside the binnings of each slot in column `slots_column`."""
+        return "{}.inRanges({}, {})".format(self.name, slots_column, ", ".join(columns))
+
+    def get_cpp_code(self):
+        """C++ code defining the object holding the binnings."""
+        return "\n".join([
+            "namespace lumberjack {",
+            "namespace batch {",
+            "const RaggedBinnings {}(".format(self.name.rsplit('::', 1)[1]),
+            "    {{{}}},".format(", ".join([_cpp_double_literal(_edge) for _edge in self._edges])),
+            "    {{{}}},".format(", ".join([str(_begin) for _begin, _ in self._edges_ranges])),
+            "    {{{}}},".format(", ".join([str(_end) for _, _end in self._edges_ranges])),
+            "    {{{}}},".format(", ".join(map(str, self._cell_offsets))),
+            "    {}".format(self._n_axes),
+            ");",
+            "}  // namespace batch",
+            "}  // namespace lumberjack",
+        ])
+
+    def declare(self):
+        """Declare the C++ helpers and the object holding the binnings."""
+        if not (_declare_once(_BATCHING_HELPERS_CODE) and _declare_once(self.get_cpp_code())):
+            raise RuntimeError("Failed to declare C++ code for ragged binnings '{}'!".format(self.name))
+
+
+class WeightVariants(object):
+    """Several weights (e.g. systematic variations) with which the same object is filled, for filling all variants at once.
+
+    The bin of an event is determined only once, and the weights of all
+    variants are added to a contiguous block of cells: cell
+    `bin * n_variants + i` holds the sums for variant `i`. A weight of `None`
+    denotes the unweighted variant.
+    """
+
+    def __init__(self, weights):
+        self._weights = list(weights)
+        if len(set(self._weights)) != len(self._weights):
+            raise ValueError("Duplicate weights in weight variants: {}".format(self._weights))
+
+    @property
+    def weights(self):
+        """List of weights (`None` for the unweighted variant)."""
+        return self._weights
+
+    @property
+    def n_variants(self):
+        """Number of weight variants."""
+        return len(self._weights)
+
+    def get_cells_expression(self, cell_expression):
+        """C++ expression for the cells of all variants of an event in the cell given by `cell_expression`."""
+        return "lumberjack::batch::variantCells({}, {})".format(cell_expression, self.n_variants)
+
+    @property
+    def weights_expression(self):
+        """C++ expression for the weights of all variants of an event."""
+        return "lumberjack::batch::weights({{{}}})".format(", ".join([
+            "1.0" if _weight is None else "static_cast<double>({})".format(_weight) for _weight in self._weights
+        ]))
+
+    @staticmethod
+    def declare():
+        """Declare the C++ helpers."""
+        if not _declare_once(_BATCHING_HELPERS_CODE):
+            raise RuntimeError("Failed to declare C++ helpers for batched filling!")
+
+
+class FillStatistics(object):
+    """Statistics of a histogram or profile filled in a batched action, accumulated separately for each slot.
+
+    The statistics are the terms returned by `GetStats` of the ROOT object
+    (sums of the weights, squared weights and weighted values, in the same
+    order), followed by the number of entries. For each slot, they occupy
+    `n_terms` consecutive cells of a one-dimensional histogram with one bin
+    per cell. As for ROOT objects, the sums only include fills inside the
+    binning, while every fill counts as an entry.
+    """
+
+    def __init__(self, n_binned, is_profile):
+        self._n_binned = n_binned
+        self._is_profile = is_profile
+
+    @property
+    def n_stats(self):
+        """Number of terms returned by `GetStats` of the ROOT object."""
+        return 2 + sum([2 + _i for _i in range(self._n_binned)]) + (2 if self._is_profile else 0)
+
+    @property
+    def n_terms(self):
+        """Number of cells per slot (the statistics and the number of entries)."""
+        return self.n_stats + 1
+
+    def _get_values_expression(self, columns):
+        return "{{{}}}".format(", ".join(["static_cast<double>({})".format(_column) for _column in columns]))
+
+    def get_terms_expression(self, columns, weight=None):
+        """C++ expression for the statistics terms of a fill with the values in `columns` (binned, then profiled) and `weight`."""
+        return "lumberjack::batch::statsTerms({}, {}, {})".format(
+            "1.0" if weight is None else "static_cast<double>({})".format(weight),
+            "true" if self._is_profile else "false",
+            self._get_values_expression(columns),
+        )
+
+    @staticmethod
+    def get_slot_stats_expression(terms_column, in_range_expression, slots_column=None):
+        """C++ expression for the statistics terms of each slot.
+
+        `in_range_expression` gives whether the values are inside the binnings
+        of each slot (see :py:meth:`RaggedBinnings.get_in_ranges_expression`),
+        or, if `slots_column` is given, of all slots.
+        """
+        if slots_column is None:
+            return "lumberjack::batch::slotStats({}, {})".format(terms_column, in_range_expression)
+        return "lumberjack::batch::slotStats({}, {}, {})".format(terms_column, in_range_expression, slots_column)
+
+    def get_cells_expression(self, slots_column):
+        """C++ expression for the cells of the statistics terms of the slots in column `slots_column`."""
+        return "lumberjack::batch::statsCells({}, {})".format(slots_column, self.n_terms)
+
+    def get_variant_stats_expression(self, weights_column, in_range_expression, columns):
+        """C++ expression for the statistics terms of each weight variant (see :py:class:`WeightVariants`)."""
+        return "lumberjack::batch::variantStats({}, {}, {}, {})".format(
+            weights_column, in_range_expression, "true" if self._is_profile else "false", self._get_values_expression(columns))
+
+    def get_variant_cells_expression(self, n_variants):
+        """C++ expression for the cells of the statistics terms of `n_variants` weight variants."""
+        return "lumberjack::batch::statsCells({{{}}}, {})".format(", ".join(map(str, range(n_variants))), self.n_terms)
+
+    @staticmethod
+    def declare():
+        """Declare the C++ helpers."""
+        if not _declare_once(_BATCHING_HELPERS_CODE):
+            raise RuntimeError("Failed to declare C++ helpers for batched filling!")
+
+
+class BatchedObject(object):
+    """A histogram or profile for one split, sliced from an object filled for many splits at once.
+
+    The batched object (a data frame result) either has an additional last
+    binned axis, whose bin `slot + 1` holds the contents for this split, or,
+    if `cell_offset` is given, is one-dimensional with the cells of this split
+    starting at `cell_offset` (see :py:class:`RaggedBinnings`), each
+    `cell_stride` cells apart (see :py:class:`WeightVariants`). The bin
+    contents, errors and bin entries are copied exactly. The statistics (e.g.
+    for the mean) and the number of entries are taken from `stats_result`, a
+    histogram holding the terms of :py:class:`FillStatistics` for this
+    object starting at cell `stats_offset`. Without it, they are recomputed
+    from the bin contents, as for a rebinned histogram.
+    """
+
+    # ROOT classes by object type (profile or not) and number of binned variables
+    _ROOT_CLASS_NAMES = {
+        (False, 1): 'TH1D',
+        (False, 2): 'TH2D',
+        (False, 3): 'TH3D',
+        (True, 1): 'TProfile',
+        (True, 2): 'TProfile2D',
+    }
+
+    def __init__(self, batched_result, is_profile, slot, name, title, binnings, cell_offset=None, cell_stride=1, weighted=None, stats_result=None, stats_offset=0):
+        self._batched_result = batched_result
+        self._stats_result = stats_result
+        self._stats_offset = stats_offset
+        self._is_profile = is_profile
+        self._slot = slot
+        self._cell_offset = cell_offset
+        self._cell_stride = cell_stride
+        # taken from the batched object if not given
+        self._weighted = weighted
+        self._name = name
+        self._title = title
+        self._binnings = binnings
+
+    def get_root_object(self):
+        """ROOT object for the split, with the contents copied from the batched object."""
+        import ROOT
+
+        _batch = self._batched_result.GetValue()
+
+        _args = [self._name, self._title]
+        for _binning in self._binnings:
+            _args += [len(_binning) - 1, array('d', _binning)]
+        _obj = getattr(ROOT, self._ROOT_CLASS_NAMES[(self._is_profile, len(self._binnings))])(*_args)
+        _obj.SetDirectory(0)
+
+        _weighted = self._weighted
+        if _weighted is None:
+            _weighted = _batch.GetSumw2N() > 0 if not self._is_profile else _batch.GetBinSumw2().GetSize() > 0
+        if _weighted:
+            _obj.Sumw2()
+
+        _sum_of_entries = 0.0
+        for _bin_indices in itertools.product(*[range(len(_binning) + 1) for _binning in self._binnings]):
+            _dst_bin = _obj.GetBin(*_bin_indices)
+            if self._cell_offset is None:
+                _src_bin = _batch.GetBin(*(_bin_indices + (self._slot + 1,)))
+            else:
+                # cells are ordered like the global bins of the object (which start at 0)
+                _src_bin = self._cell_offset + _dst_bin * self._cell_stride + 1
+            if self._is_profile:
+                _obj.SetBinEntries(_dst_bin, _batch.GetBinEntries(_src_bin))
+                _obj.SetBinContent(_dst_bin, _batch.At(_src_bin))
+                _obj.GetSumw2().SetAt(_batch.GetSumw2().At(_src_bin), _dst_bin)
+                if _weighted:
+                    _obj.GetBinSumw2().SetAt(_batch.GetBinSumw2().At(_src_bin), _dst_bin)
+                _sum_of_entries += _batch.GetBinEntries(_src_bin)
+            else:
+                _obj.SetBinContent(_dst_bin, _batch.GetBinContent(_src_bin))
+                if _weighted:
+                    _obj.SetBinError(_dst_bin, _batch.GetBinError(_src_bin))
+                _sum_of_entries += _batch.GetBinContent(_src_bin)
+
+        if self._stats_result is not None:
+            _stats_batch = self._stats_result.GetValue()
+            _terms = [
+                _stats_batch.GetBinContent(self._stats_offset + _k + 1)
+                for _k in range(FillStatistics(len(self._binnings), self._is_profile).n_terms)
+            ]
+            _obj.PutStats(array('d', _terms[:-1]))
+            _obj.SetEntries(_terms[-1])
+        else:
+            _obj.ResetStats()
+            if not _weighted:
+                _obj.SetEntries(_sum_of_entries)
+
+        return _obj
+
+    def Write(self):
+        """Write the ROOT object for the split to the current directory."""
+        self.get_root_object().Write()
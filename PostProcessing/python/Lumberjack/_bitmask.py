@@ -0,0 +1,68 @@
+from __future__ import print_function
+
+
+__all__ = ['Bitmask', 'get_bit_expressions', 'get_bitmask_columns', 'get_bitmask_defines']
+
+
+class Bitmask(object):
+    """Named bits of an integer column, e.g. the trigger paths which fired for an event packed into a 64-bit word.
+
+    Each bit can be used like a boolean column with the name of the bit. Cuts
+    on bits in splittings are tested directly on the integer column, so the
+    word is only read once per event and no column needs to be defined for
+    each bit. Columns for individual bits are only defined if they are used
+    in other expressions (see :py:func:`get_bitmask_defines`).
+    """
+
+    # number of bits of the integer columns
+    N_BITS = 64
+
+    def __init__(self, column, bits):
+        self._column = column
+        self._bits = dict(bits)
+        for _name, _index in self._bits.items():
+            if not 0 <= int(_index) < self.N_BITS:
+                raise ValueError("Index {} of bit '{}' in bitmask '{}' is out of range [0, {})!".format(_index, _name, column, self.N_BITS))
+
+    def __repr__(self):
+        return "Bitmask('{}', {} bits)".format(self._column, len(self._bits))
+
+    @property
+    def column(self):
+        """Name of the integer column containing the bits."""
+        return self._column
+
+    @property
+    def bits(self):
+        """Dictionary mapping the names of the bits to their indices."""
+        return self._bits
+
+    def get_bit_expression(self, bit_name):
+        """Expression for the value (0 or 1) of a bit."""
+        return "(({}>>{})&1)".format(self._column, int(self._bits[bit_name]))
+
+
+def _iter_bits(bitmasks):
+    '''pairs of bit names and bitmasks, checking that each bit name is unique'''
+    _seen = {}
+    for _bitmask in bitmasks:
+        for _bit_name in sorted(_bitmask.bits):
+            if _bit_name in _seen:
+                raise ValueError("Bit '{}' is defined in bitmasks '{}' and '{}'!".format(_bit_name, _seen[_bit_name].column, _bitmask.column))
+            _seen[_bit_name] = _bitmask
+            yield _bit_name, _bitmask
+
+
+def get_bit_expressions(bitmasks):
+    """Return a dictionary mapping the names of all bits in `bitmasks` to the expressions for their values (0 or 1)."""
+    return {_bit_name: _bitmask.get_bit_expression(_bit_name) for _bit_name, _bitmask in _iter_bits(bitmasks)}
+
+
+def get_bitmask_columns(bitmasks):
+    """Return a dictionary mapping the names of all bits in `bitmasks` to the integer columns containing them."""
+    return {_bit_name: _bitmask.column for _bit_name, _bitmask in _iter_bits(bitmasks)}
+
+
+def get_bitmask_defines(bitmasks):
+    """Return a dictionary mapping the names of all bits in `bitmasks` to expressions defining them as boolean columns."""
+    return {_bit_name: "{}!=0".format(_expression) for _bit_name, _expression in get_bit_expressions(bitmasks).items()}
@@ -0,0 +1,92 @@
+from __future__ import print_function
+
+import numpy as np
+
+
+__all__ = ['BookingPlan']
+
+
+class BookingPlan(object):
+    """All objects booked for a task, with their binnings and an estimate of the memory needed for filling them.
+
+    Each entry of the plan is a dictionary with the split name, the path of
+    the object in the split directory, the object type ('histogram' or
+    'profile'), the number of variables, the numbers of bins of the binned
+    axes and whether the object is weighted. The memory of an object is
+    estimated from the arrays of double-precision values ROOT stores for each
+    bin (including under- and overflow), plus a fixed overhead. Data frame
+    actions fill a separate copy of each object per implicit multithreading
+    (IMT) slot, so the memory needed for a task scales with the number of
+    slots.
+    """
+
+    # arrays stored per bin, by object type and whether the object is weighted
+    # (histograms: sum of weights [and squared weights]; profiles: additionally the sum of weighted values squared and the bin entries)
+    _ARRAYS_PER_BIN = {
+        ('histogram', False): 1,
+        ('histogram', True): 2,
+        ('profile', False): 3,
+        ('profile', True): 4,
+    }
+
+    # size of the values stored per bin (double precision)
+    BYTES_PER_VALUE = 8
+
+    # approximate size of an object without its bin arrays (axes, name, title, statistics, ...)
+    OBJECT_OVERHEAD_BYTES = 2048
+
+    def __init__(self, entries):
+        self._entries = [dict(_entry) for _entry in entries]
+
+    @property
+    def entries(self):
+        """List of dictionaries describing the booked objects."""
+        return self._entries
+
+    @property
+    def n_objects(self):
+        """Number of booked objects."""
+        return len(self._entries)
+
+    @classmethod
+    def get_bytes(cls, entry):
+        """Estimated size of one copy of the object described by `entry`, in bytes."""
+        _n_cells = int(np.prod([_n_bins + 2 for _n_bins in entry['n_bins']]))
+        return _n_cells * cls._ARRAYS_PER_BIN[(entry['object_type'], bool(entry['weighted']))] * cls.BYTES_PER_VALUE + cls.OBJECT_OVERHEAD_BYTES
+
+    def get_bytes_per_slot(self):
+        """Estimated size of one copy of all booked objects, in bytes."""
+        return sum([self.get_bytes(_entry) for _entry in self._entries])
+
+    def get_total_bytes(self, n_slots=1):
+        """Estimated memory needed for filling all booked objects with `n_slots` IMT slots, in bytes."""
+        return self.get_bytes_per_slot() * max(int(n_slots), 1)
+
+    def get_bytes_per_slot_by_value(self, splitting_key):
+        """Dictionary mapping the values of a splitting key to the estimated size of one copy of the objects booked for them, in bytes."""
+        _bytes_by_value = {}
+        for _entry in self._entries:
+            _split_dict = dict([_path_element.split(':', 1) for _path_element in _entry['split'].split('/')])
+            _value = _split_dict[splitting_key]
+            _bytes_by_value[_value] = _bytes_by_value.get(_value, 0) + self.get_bytes(_entry)
+        return _bytes_by_value
+
+    def report(self, n_slots=1, n_largest=5):
+        """Print a summary of the plan: objects by type and dimensionality, the largest objects and the estimated memory."""
+        _counts = {}
+        for _entry in self._entries:
+            _key = (_entry['object_type'], len(_entry['n_bins']))
+            _counts[_key] = _counts.get(_key, 0) + 1
+
+        print("[INFO] Booking plan: {} object(s)".format(self.n_objects))
+        for (_object_type, _n_dim), _count in sorted(_counts.items()):
+            print("    - {}D {}s: {}".format(_n_dim, _object_type, _count))
+
+        if self._entries:
+            print("    - largest objects:")
+            for _entry in sorted(self._entries, key=lambda _e: (-self.get_bytes(_e), _e['split'], _e['path']))[:n_largest]:
+                print("        {}/{}: {} bins, {:.1f} MB".format(
+                    _entry['split'], _entry['path'], "x".join(map(str, _entry['n_bins'])), self.get_bytes(_entry) / 1024.0**2))
+
+        print("    -> estimated memory: {:.1f} MB per IMT slot, {:.1f} MB for {} slot(s)".format(
+            self.get_bytes_per_slot() / 1024.0**2, self.get_total_bytes(n_slots) / 1024.0**2, max(int(n_slots), 1)))
@@ -0,0 +1,400 @@
+from __future__ import print_function
+
+import errno
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+
+from ._core import Quantity
+
+
+__all__ = ['BookingPlanCache', 'CompiledCodeCache', 'EntryRangeCache', 'ResultCache', 'SnapshotCache', 'get_default_cache_dir', 'get_input_file_identity']
+
+
+def get_default_cache_dir():
+    """Default directory for caching Lumberjack outputs between runs (`$XDG_CACHE_HOME/lumberjack`)."""
+    _cache_home = os.environ.get('XDG_CACHE_HOME', None) or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(_cache_home, 'lumberjack')
+
+
+def _makedirs(path):
+    '''create directory `path` (and parent directories), if it does not exist'''
+    try:
+        os.makedirs(path)
+    except OSError as _e:
+        if _e.errno != errno.EEXIST:
+            raise
+
+
+def _write_file_atomically(path, content):
+    '''write `content` to a temporary file and move it to `path` afterwards'''
+    _fd, _tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp_')
+    with os.fdopen(_fd, 'w') as _f:
+        _f.write(content)
+    os.rename(_tmp_path, path)
+
+
+def _copy_file_atomically(source_path, path):
+    '''copy `source_path` to a temporary file and move it to `path` afterwards'''
+    _fd, _tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix='.tmp_')
+    os.close(_fd)
+    try:
+        shutil.copyfile(source_path, _tmp_path)
+        os.rename(_tmp_path, path)
+    finally:
+        if os.path.exists(_tmp_path):
+            os.remove(_tmp_path)
+
+
+def get_input_file_identity(path):
+    """Tuple identifying the current state of an input file (absolute path, size and modification time)."""
+    _stat = os.stat(path)
+    return (os.path.abspath(path), _stat.st_size, int(_stat.st_mtime))
+
+
+def _to_json_compatible(obj):
+    '''convert objects appearing in analysis configurations to JSON-compatible types'''
+    if isinstance(obj, Quantity):
+        return dict(name=obj.name, expression=obj.expression, binning=obj.binning, named_binnings=obj.named_binnings)
+    if isinstance(obj, (set, frozenset)):
+        return sorted(obj)
+    if hasattr(obj, 'tolist'):
+        return obj.tolist()  # numpy arrays and scalars
+    raise TypeError("Cannot convert object of type '{}' for hashing: {}".format(type(obj).__name__, repr(obj)))
+
+
+def _get_description_key(description):
+    '''hash of a normalized (JSON) representation of `description`'''
+    _hash = hashlib.md5()
+    _hash.update(json.dumps(description, sort_keys=True, default=_to_json_compatible).encode('utf-8'))
+    return _hash.hexdigest()
+
+
+def _get_input_dependent_key(input_files, description):
+    '''hash of the identity of the input files and a normalized (JSON) representation of `description`'''
+    _hash = hashlib.md5()
+    _hash.update(json.dumps(
+        dict(
+            input_files=[get_input_file_identity(_input_file) for _input_file in input_files],
+            description=description,
+        ),
+        sort_keys=True,
+        default=_to_json_compatible,
+    ).encode('utf-8'))
+    return _hash.hexdigest()
+
+
+class CompiledCodeCache(object):
+    """Cache of C++ code compiled into shared libraries with ACLiC.
+
+    Each piece of code is identified by a hash of its content, the ROOT version
+    and the command used for building shared libraries. The first time a piece
+    of code is requested, it is compiled in a temporary directory and the
+    resulting files are moved into the cache directory. Later requests (also
+    from other processes) only need to load the library.
+
+    The source file is kept next to the library, since the interpreter reads
+    the declarations from it when the library is loaded. Code can include the
+    sources of previously loaded code (e.g. the analysis macros) by passing
+    them as `dependencies`.
+    """
+
+    def __init__(self, cache_dir=None):
+        self._cache_dir = os.path.abspath(cache_dir or get_default_cache_dir())
+        self._loaded_sources = {}
+
+    @property
+    def cache_dir(self):
+        return self._cache_dir
+
+    @staticmethod
+    def _get_build_environment_string():
+        '''string identifying the ROOT version and the compiler setup'''
+        import ROOT
+        return "{}\n{}".format(ROOT.gROOT.GetVersion(), ROOT.gSystem.GetMakeSharedLib())
+
+    def get_key(self, code, dependencies=()):
+        """Content hash identifying a piece of code (and the sources it depends on) for the current build environment."""
+        _hash = hashlib.md5()
+        for _s in [self._get_build_environment_string()] + list(dependencies) + [code]:
+            _hash.update(_s.encode('utf-8'))
+            _hash.update(b'\0')
+        return _hash.hexdigest()
+
+    def _compile(self, source_path, entry_dir):
+        '''compile `source_path` with ACLiC in a temporary directory and move the results to `entry_dir`'''
+        import ROOT
+
+        _build_dir = tempfile.mkdtemp(dir=entry_dir, prefix='.build_')
+        try:
+            if not ROOT.gSystem.CompileMacro(source_path, "kO", "", _build_dir):
+                return False
+
+            # ACLiC may place the files in a subdirectory of the build directory
+            _built_files = [
+                os.path.join(_dirpath, _filename)
+                for _dirpath, _, _filenames in os.walk(_build_dir)
+                for _filename in _filenames
+            ]
+
+            # move the library last, so that its existence implies a complete entry
+            _so_ext = '.' + ROOT.gSystem.GetSoExt()
+            _built_files.sort(key=lambda _path: _path.endswith(_so_ext))
+            for _path in _built_files:
+                os.rename(_path, os.path.join(entry_dir, os.path.basename(_path)))
+        finally:
+            shutil.rmtree(_build_dir, ignore_errors=True)
+
+        return True
+
+    def load(self, code, name, dependencies=()):
+        """Load the library compiled from `code`, compiling it first if it is not in the cache.
+
+        `dependencies` is a list of source file paths (as returned by earlier
+        calls) to include before `code`. Returns the path of the cached source
+        file, or `None` if the code could not be compiled or loaded.
+        """
+        import ROOT
+
+        _key = self.get_key(code, dependencies)
+        if _key in self._loaded_sources:
+            return self._loaded_sources[_key]
+
+        _entry_dir = os.path.join(self._cache_dir, "{}_{}".format(name, _key))
+        _source_path = os.path.join(_entry_dir, "{}.C".format(name))
+        _library_path = os.path.join(_entry_dir, "{}_C.{}".format(name, ROOT.gSystem.GetSoExt()))
+
+        _makedirs(_entry_dir)
+
+        if os.path.exists(_library_path):
+            print("[INFO] Loading compiled code '{}' from cache: {}".format(name, _library_path))
+        else:
+            print("[INFO] Compiling code '{}' into cache directory: {}".format(name, _entry_dir))
+
+            # include guard, so that the source can be included by dependent code
+            _guard = "LUMBERJACK_CACHE_{}".format(_key.upper())
+            _write_file_atomically(_source_path, "\n".join(
+                ["#ifndef {}".format(_guard), "#define {}".format(_guard)]
+                + ['#include "{}"'.format(_dependency) for _dependency in dependencies]
+                + [code, "#endif  // {}".format(_guard), ""]
+            ))
+
+            # ACLiC loads the library after compiling it
+            if not self._compile(_source_path, _entry_dir):
+                print("[WARNING] Failed to compile code '{}'!".format(name))
+                return None
+
+            self._loaded_sources[_key] = _source_path
+            return _source_path
+
+        if ROOT.gSystem.Load(_library_path) < 0:
+            print("[WARNING] Failed to load library for code '{}': {}".format(name, _library_path))
+            return None
+
+        self._loaded_sources[_key] = _source_path
+        return _source_path
+
+
+class ResultCache(object):
+    """Cache of task output files, identified by the inputs and configuration they were produced from.
+
+    The key of a task output is a hash of the identity of the input files
+    (see :py:func:`get_input_file_identity`) and of an arbitrary (nested)
+    structure describing the task, which should contain everything the output
+    depends on (the resolved task specification, quantities, selections,
+    defines, ROOT macros, etc.). The structure is normalized before hashing,
+    so the order of dictionary keys does not matter.
+
+    Outputs are stored under `cache_dir/results`, together with their log
+    files (if any).
+    """
+
+    def __init__(self, cache_dir=None):
+        self._results_dir = os.path.join(os.path.abspath(cache_dir or get_default_cache_dir()), 'results')
+
+    @property
+    def results_dir(self):
+        return self._results_dir
+
+    @staticmethod
+    def get_key(input_files, task_description):
+        """Hash identifying the output of a task described by `task_description`, run on `input_files`."""
+        return _get_input_dependent_key(input_files, task_description)
+
+    def _get_entry_paths(self, key):
+        '''paths of the cached output and log file for `key`'''
+        return (
+            os.path.join(self._results_dir, "{}.root".format(key)),
+            os.path.join(self._results_dir, "{}.log".format(key)),
+        )
+
+    def fetch(self, key, output_file, log_file=None):
+        """Copy the cached output (and log) for `key` to the given paths.
+
+        Returns `True` if the output was found in the cache, and `False` otherwise.
+        """
+        _cached_output_file, _cached_log_file = self._get_entry_paths(key)
+        if not os.path.exists(_cached_output_file):
+            return False
+
+        _copy_file_atomically(_cached_output_file, output_file)
+        if log_file is not None and os.path.exists(_cached_log_file):
+            _copy_file_atomically(_cached_log_file, log_file)
+
+        return True
+
+    def store(self, key, output_file, log_file=None):
+        """Copy an output file (and its log file) into the cache under `key`."""
+        _makedirs(self._results_dir)
+
+        _cached_output_file, _cached_log_file = self._get_entry_paths(key)
+
+        # store the log first, so that the existence of the output implies a complete entry
+        if log_file is not None and os.path.exists(log_file):
+            _copy_file_atomically(log_file, _cached_log_file)
+        _copy_file_atomically(output_file, _cached_output_file)
+
+
+class SnapshotCache(object):
+    """Cache of slim ntuples containing only the entries passing a selection and the columns needed later on.
+
+    Snapshots are identified by the input files (see
+    :py:func:`get_input_file_identity`) and a description of the selection
+    and the stored columns, in the same way as for :py:class:`ResultCache`.
+    They are stored under `cache_dir/snapshots`, with the tree name given by
+    `TREE_NAME`.
+    """
+
+    TREE_NAME = 'Events'
+
+    def __init__(self, cache_dir=None):
+        self._snapshots_dir = os.path.join(os.path.abspath(cache_dir or get_default_cache_dir()), 'snapshots')
+
+    @property
+    def snapshots_dir(self):
+        return self._snapshots_dir
+
+    @staticmethod
+    def get_key(input_files, description):
+        """Hash identifying the snapshot described by `description`, taken from `input_files`."""
+        return _get_input_dependent_key(input_files, description)
+
+    def get_path(self, key):
+        """Path of the snapshot file for `key` (which may not exist yet)."""
+        return os.path.join(self._snapshots_dir, "{}.root".format(key))
+
+    def create(self, key, data_frame, columns):
+        """Write `columns` of all entries of `data_frame` to the snapshot file for `key` (triggers the event loop).
+
+        Returns the path of the snapshot file.
+        """
+        import ROOT
+
+        _makedirs(self._snapshots_dir)
+
+        _path = self.get_path(key)
+        _fd, _tmp_path = tempfile.mkstemp(dir=self._snapshots_dir, prefix='.tmp_', suffix='.root')
+        os.close(_fd)
+        try:
+            _column_names = ROOT.std.vector('string')()
+            for _column in columns:
+                _column_names.push_back(_column)
+            data_frame.Snapshot(self.TREE_NAME, _tmp_path, _column_names)
+            os.rename(_tmp_path, _path)
+        finally:
+            if os.path.exists(_tmp_path):
+                os.remove(_tmp_path)
+
+        return _path
+
+
+class EntryRangeCache(object):
+    """Cache of the entry ranges passing a selection.
+
+    Entry ranges are tuples `(i_file, begin, end)` (see
+    :py:func:`~Lumberjack.entry_numbers_to_ranges`), i.e. the selected entry
+    numbers in run-length encoded form. They are identified in the same way
+    as for :py:class:`ResultCache` and stored as NumPy arrays under
+    `cache_dir/entry_ranges`.
+    """
+
+    def __init__(self, cache_dir=None):
+        self._entry_ranges_dir = os.path.join(os.path.abspath(cache_dir or get_default_cache_dir()), 'entry_ranges')
+
+    @property
+    def entry_ranges_dir(self):
+        return self._entry_ranges_dir
+
+    @staticmethod
+    def get_key(input_files, description):
+        """Hash identifying the entry ranges passing the selection described by `description`, for `input_files`."""
+        return _get_input_dependent_key(input_files, description)
+
+    def get_path(self, key):
+        """Path of the file storing the entry ranges for `key` (which may not exist yet)."""
+        return os.path.join(self._entry_ranges_dir, "{}.npz".format(key))
+
+    def load(self, key):
+        """List of cached entry ranges for `key`, or `None` if they are not in the cache."""
+        _path = self.get_path(key)
+        if not os.path.exists(_path):
+            return None
+
+        with np.load(_path) as _data:
+            return [tuple([int(_x) for _x in _range]) for _range in _data['entry_ranges']]
+
+    def store(self, key, entry_ranges):
+        """Store a list of entry ranges in the cache under `key`."""
+        _makedirs(self._entry_ranges_dir)
+
+        _fd, _tmp_path = tempfile.mkstemp(dir=self._entry_ranges_dir, prefix='.tmp_', suffix='.npz')
+        try:
+            with os.fdopen(_fd, 'wb') as _f:
+                np.savez_compressed(_f, entry_ranges=np.array(entry_ranges, dtype=np.int64).reshape(-1, 3))
+            os.rename(_tmp_path, self.get_path(key))
+        finally:
+            if os.path.exists(_tmp_path):
+                os.remove(_tmp_path)
+
+
+class BookingPlanCache(object):
+    """Cache of booking plans (see :py:class:`~Lumberjack.BookingPlan`).
+
+    Booking plans only depend on the task configuration (splittings,
+    quantities and requested objects), not on the input files. They are
+    identified by a hash of a structure describing the task and stored as
+    JSON files under `cache_dir/booking_plans`.
+    """
+
+    def __init__(self, cache_dir=None):
+        self._booking_plans_dir = os.path.join(os.path.abspath(cache_dir or get_default_cache_dir()), 'booking_plans')
+
+    @property
+    def booking_plans_dir(self):
+        return self._booking_plans_dir
+
+    @staticmethod
+    def get_key(description):
+        """Hash identifying the booking plan of the task described by `description`."""
+        return _get_description_key(description)
+
+    def get_path(self, key):
+        """Path of the file storing the booking plan for `key` (which may not exist yet)."""
+        return os.path.join(self._booking_plans_dir, "{}.json".format(key))
+
+    def load(self, key):
+        """Cached list of booking plan entries for `key`, or `None` if the plan is not in the cache."""
+        _path = self.get_path(key)
+        if not os.path.exists(_path):
+            return None
+
+        with open(_path) as _f:
+            return json.load(_f)
+
+    def store(self, key, entries):
+        """Store the entries of a booking plan in the cache under `key`."""
+        _makedirs(self._booking_plans_dir)
+        _write_file_atomically(self.get_path(key), json.dumps(entries, sort_keys=True))
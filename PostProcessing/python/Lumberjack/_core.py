@@ -5,7 +5,7 @@ import numpy as np
 from copy import deepcopy
 
 
-__all__ = ['Quantity', 'apply_defines', 'apply_filters', 'define_quantities']
+__all__ = ['Quantity', 'apply_defines', 'apply_filters', 'define_quantities', 'get_quantity_defines']
 
 class Quantity(object):
 
@@ -109,8 +109,8 @@ def apply_filters(data_frame, filters):
     return _df
 
 
-def define_quantities(data_frame, quantities):
-    """Define aliases for quantity expressions as specified in dictionary `quantities`."""
+def get_quantity_defines(quantities):
+    """Return a dictionary mapping quantity names to expressions, for all quantities in `quantities` which need a 'Define'."""
     _define_dict = {}  # map of quantities by unique name
     for _q_key, _q in quantities.iteritems():
 
@@ -125,6 +125,11 @@ def define_quantities(data_frame, quantities):
 
         _define_dict[_q.name] = _q.expression
 
-    _df = apply_defines(data_frame, _define_dict)
+    return _define_dict
+
+
+def define_quantities(data_frame, quantities):
+    """Define aliases for quantity expressions as specified in dictionary `quantities`."""
+    _df = apply_defines(data_frame, get_quantity_defines(quantities))
 
     return _df
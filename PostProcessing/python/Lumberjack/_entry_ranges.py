@@ -0,0 +1,161 @@
+from __future__ import print_function
+
+import numpy as np
+
+from ._splitting import _declare_once
+
+
+__all__ = ['entry_numbers_to_ranges', 'get_cluster_ranges', 'intersect_entry_ranges', 'limit_entry_ranges', 'make_entry_list_chain', 'sample_entry_ranges']
+
+
+_ENTRY_RANGES_CODE = r"""
+#include "TEntryList.h"
+
+namespace lumberjack {
+namespace entry_ranges {
+
+inline void EnterRange(TEntryList& entryList, Long64_t begin, Long64_t end) {
+    for (Long64_t entry = begin; entry < end; ++entry)
+        entryList.Enter(entry);
+}
+
+}  // namespace entry_ranges
+}  // namespace lumberjack
+"""
+
+
+def get_cluster_ranges(tree):
+    """List of `(begin, end)` entry ranges of the clusters of a TTree."""
+    _n_entries = tree.GetEntries()
+    _ranges = []
+
+    _cluster_iterator = tree.GetClusterIterator(0)
+    _begin = _cluster_iterator()
+    while _begin < _n_entries:
+        _end = min(_cluster_iterator.GetNextEntry(), _n_entries)
+        if _end <= _begin:
+            # should not happen: treat the rest of the tree as one cluster
+            _end = _n_entries
+        _ranges.append((_begin, _end))
+        _begin = _cluster_iterator()
+
+    return _ranges
+
+
+def sample_entry_ranges(entry_ranges, fraction):
+    """Select a subset of `entry_ranges` covering approximately `fraction` of the entries.
+
+    Entry ranges are tuples ending in `(begin, end)`, e.g. `(i_file, begin, end)`.
+    The selected ranges are spread evenly over the list, so that the sample
+    is representative of the whole input (e.g. for different run periods).
+    """
+    _selected_ranges = []
+    _n_seen, _n_selected = 0, 0
+    for _range in entry_ranges:
+        _size = _range[-1] - _range[-2]
+        _n_seen += _size
+        # select range if this brings the selected fraction closer to the target
+        if _n_selected + 0.5 * _size <= fraction * _n_seen:
+            _selected_ranges.append(_range)
+            _n_selected += _size
+
+    return _selected_ranges
+
+
+def limit_entry_ranges(entry_ranges, n_entries):
+    """Leading entry ranges containing at most `n_entries` entries (the last range is shortened if needed)."""
+    _limited_ranges = []
+    _n_left = n_entries
+    for _range in entry_ranges:
+        if _n_left <= 0:
+            break
+        _size = _range[-1] - _range[-2]
+        if _size > _n_left:
+            _range = tuple(_range[:-1]) + (_range[-2] + _n_left,)
+            _size = _n_left
+        _limited_ranges.append(_range)
+        _n_left -= _size
+
+    return _limited_ranges
+
+
+def make_entry_list_chain(tree_name, files, entry_ranges):
+    """Create a TChain over `files` which only contains the entries in `entry_ranges`.
+
+    Entry ranges are tuples `(i_file, begin, end)`, with `begin` and `end`
+    referring to the entries of the tree in file `files[i_file]`. The entries
+    are selected with a TEntryList, which is also respected by multithreaded
+    event loops. Only files with selected entries are added to the chain.
+
+    Returns the chain and the entry list (both need to be kept alive while
+    the chain is used).
+    """
+    import ROOT
+
+    if not _declare_once(_ENTRY_RANGES_CODE):
+        raise RuntimeError("Failed to declare C++ helpers for entry ranges!")
+
+    _chain = ROOT.TChain(tree_name)
+    _entry_list = ROOT.TEntryList("lumberjack_entry_list", "Entry ranges selected by Lumberjack")
+
+    for _i_file, _file in enumerate(files):
+        _file_ranges = [(_begin, _end) for (_i, _begin, _end) in entry_ranges if _i == _i_file]
+        if not _file_ranges:
+            continue
+
+        _chain.Add(_file)
+
+        _file_entry_list = ROOT.TEntryList("", "", tree_name, _file)
+        for _begin, _end in _file_ranges:
+            ROOT.lumberjack.entry_ranges.EnterRange(_file_entry_list, _begin, _end)
+        _entry_list.Add(_file_entry_list)
+
+    _chain.SetEntryList(_entry_list)
+
+    return _chain, _entry_list
+
+
+def entry_numbers_to_ranges(entry_numbers, file_sizes):
+    """Convert entry numbers of a chain of files to a list of entry ranges `(i_file, begin, end)`.
+
+    `file_sizes` gives the number of entries of the tree in each file.
+    Consecutive entry numbers are merged into a single range, so that the
+    result is a compact (run-length) encoding of the entry numbers.
+    """
+    _entry_numbers = np.unique(np.asarray(entry_numbers, dtype=np.int64))
+    _offsets = np.concatenate([[0], np.cumsum(file_sizes, dtype=np.int64)])
+
+    _ranges = []
+    for _i_file in range(len(file_sizes)):
+        _file_entries = _entry_numbers[(_entry_numbers >= _offsets[_i_file]) & (_entry_numbers < _offsets[_i_file + 1])] - _offsets[_i_file]
+        if not len(_file_entries):
+            continue
+        # indices at which a new range starts
+        _range_starts = np.concatenate([[0], np.flatnonzero(np.diff(_file_entries) != 1) + 1])
+        _range_ends = np.concatenate([_range_starts[1:], [len(_file_entries)]])
+        _ranges += [
+            (_i_file, int(_file_entries[_start]), int(_file_entries[_end - 1]) + 1)
+            for _start, _end in zip(_range_starts, _range_ends)
+        ]
+
+    return _ranges
+
+
+def intersect_entry_ranges(entry_ranges_1, entry_ranges_2):
+    """Entry ranges `(i_file, begin, end)` contained in both lists of (sorted, non-overlapping) entry ranges."""
+    _ranges = []
+    _i_1, _i_2 = 0, 0
+    while _i_1 < len(entry_ranges_1) and _i_2 < len(entry_ranges_2):
+        _file_1, _begin_1, _end_1 = entry_ranges_1[_i_1]
+        _file_2, _begin_2, _end_2 = entry_ranges_2[_i_2]
+        if _file_1 == _file_2:
+            _begin, _end = max(_begin_1, _begin_2), min(_end_1, _end_2)
+            if _begin < _end:
+                _ranges.append((_file_1, _begin, _end))
+        # advance the range which ends first
+        if (_file_1, _end_1) <= (_file_2, _end_2):
+            _i_1 += 1
+        else:
+            _i_2 += 1
+
+    return _ranges
@@ -0,0 +1,54 @@
+from __future__ import print_function
+
+import re
+
+
+__all__ = ['get_identifiers', 'get_object_spec_columns', 'get_required_defines']
+
+
+# string and character literals (may contain anything resembling an identifier)
+_RE_LITERAL = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'')
+
+# identifiers not preceded by a member access (`.`, `->`), a scope operator (`::`)
+# or a digit/letter (e.g. exponents or suffixes of numeric literals like `1e5`, `0x1F`)
+_RE_IDENTIFIER = re.compile(r'(?<![\w.:])(?<!->)([A-Za-z_]\w*)\b(?!\s*::)')
+
+
+def get_identifiers(expression):
+    """Return the set of (unqualified) identifiers appearing in a C++ expression.
+
+    Besides the column names, this also contains the names of any functions
+    called in the expression. This does not matter for determining which
+    columns an expression depends on, since the identifiers are only compared
+    against known column names.
+    """
+    return set(_RE_IDENTIFIER.findall(_RE_LITERAL.sub(' ', str(expression))))
+
+
+def get_object_spec_columns(object_spec):
+    """Return the names of the columns referenced by a histogram or profile specification `x[:y[:z]][@weight]` or `x[:y[:z]]@[weight1,weight2,...]`."""
+    return [_column.strip() for _column in re.split(r'[:@\[\],]', object_spec) if _column.strip()]
+
+
+def get_required_defines(define_groups, expressions):
+    """Return the names of all defines needed to evaluate `expressions`.
+
+    `define_groups` is a list of dictionaries mapping column names to the
+    expressions defining them. Dependencies between defines are followed
+    recursively, so that the result also contains the defines needed by other
+    required defines.
+    """
+    _define_expressions = {}
+    for _defines in define_groups:
+        for _name, _expression in _defines.items():
+            _define_expressions.setdefault(_name, []).append(_expression)
+
+    _required_defines = set()
+    _unresolved_expressions = list(expressions)
+    while _unresolved_expressions:
+        for _identifier in get_identifiers(_unresolved_expressions.pop()):
+            if _identifier in _define_expressions and _identifier not in _required_defines:
+                _required_defines.add(_identifier)
+                _unresolved_expressions += _define_expressions[_identifier]
+
+    return _required_defines
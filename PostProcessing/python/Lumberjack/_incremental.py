@@ -0,0 +1,147 @@
+from __future__ import print_function
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+from ._cache import _get_description_key
+from ._parallel import _merge_files
+
+
+__all__ = ['ProcessedFilesManifest', 'add_to_output_file', 'get_file_checksum', 'get_task_key']
+
+
+# name of the object holding the processed files manifest in an output file
+_MANIFEST_OBJECT_NAME = '_lumberjack_processed_files'
+
+
+def get_file_checksum(path, block_size=4 * 1024**2):
+    """MD5 checksum of the content of a file."""
+    _hash = hashlib.md5()
+    with open(path, 'rb') as _f:
+        for _block in iter(lambda: _f.read(block_size), b''):
+            _hash.update(_block)
+    return _hash.hexdigest()
+
+
+def get_task_key(task_description):
+    """Hash of the description of a task (everything its output depends on, apart from the input files)."""
+    return _get_description_key(task_description)
+
+
+class ProcessedFilesManifest(object):
+    """Record of the input files whose events have been added to an output file.
+
+    The manifest identifies each input file by its absolute path, size,
+    modification time and checksum, and holds a hash of the task
+    configuration (`task_key`) the output was produced with. It is stored
+    as a `TNamed` inside the output file, so that it is always consistent
+    with the contents of the file.
+
+    Checksums are only computed for input files which are not in the
+    manifest with the same path, size and modification time. An input file
+    with a known checksum (e.g. a processed file that has been moved) is
+    not processed again.
+    """
+
+    def __init__(self, task_key, entries=None):
+        self._task_key = task_key
+        self._entries = list(entries or [])
+
+    @property
+    def task_key(self):
+        return self._task_key
+
+    @property
+    def entries(self):
+        return list(self._entries)
+
+    @classmethod
+    def read(cls, output_file_path):
+        """Read the manifest stored in an output file. Returns `None` if the file has no manifest."""
+        import ROOT
+
+        _file = ROOT.TFile(output_file_path, "READ")
+        if not _file or _file.IsZombie():
+            raise IOError("Cannot open output file: '{}'".format(output_file_path))
+        try:
+            _object = _file.Get(_MANIFEST_OBJECT_NAME)
+            if not _object:
+                return None
+            _manifest = json.loads(_object.GetTitle())
+        finally:
+            _file.Close()
+
+        return cls(_manifest['task_key'], _manifest['files'])
+
+    def write(self, output_file_path):
+        """Store the manifest in an output file, replacing any previous one."""
+        import ROOT
+
+        _file = ROOT.TFile(output_file_path, "UPDATE")
+        if not _file or _file.IsZombie():
+            raise IOError("Cannot open output file for updating: '{}'".format(output_file_path))
+        try:
+            _file.cd()
+            _object = ROOT.TNamed(_MANIFEST_OBJECT_NAME, json.dumps(dict(task_key=self._task_key, files=self._entries), sort_keys=True))
+            _object.Write(_MANIFEST_OBJECT_NAME, ROOT.TObject.kOverwrite)
+        finally:
+            _file.Close()
+
+    def get_new_files(self, input_files):
+        """Return the manifest entries of the input files which have not been processed yet.
+
+        Raises `ValueError` if a processed file has changed since, since its
+        events cannot be removed from the output again.
+        """
+        _entries_by_path = {_entry['path']: _entry for _entry in self._entries}
+        _checksums = set([_entry['checksum'] for _entry in self._entries])
+
+        _new_entries = []
+        for _input_file in input_files:
+            _stat = os.stat(_input_file)
+            _entry = dict(path=os.path.abspath(_input_file), size=_stat.st_size, mtime=int(_stat.st_mtime))
+
+            _known_entry = _entries_by_path.get(_entry['path'], None)
+            if _known_entry is not None and (_known_entry['size'], _known_entry['mtime']) == (_entry['size'], _entry['mtime']):
+                continue
+
+            _entry['checksum'] = get_file_checksum(_input_file)
+            if _known_entry is not None and _known_entry['checksum'] != _entry['checksum']:
+                raise ValueError("Input file '{}' has changed since it was processed".format(_input_file))
+            if _entry['checksum'] in _checksums:
+                continue
+
+            _checksums.add(_entry['checksum'])
+            _new_entries.append(_entry)
+
+        return _new_entries
+
+    def add(self, entries):
+        """Add the entries of newly processed input files (see :py:meth:`get_new_files`)."""
+        self._entries += entries
+
+
+def add_to_output_file(output_file_path, increment_file_path, manifest, overwrite=False):
+    """Add the objects in `increment_file_path` to those in an output file and store the updated `manifest` in it.
+
+    The histograms and profiles of both files are merged into a temporary
+    file next to the output file, which then replaces the output file, so
+    that the output file is never left in a partially updated state. If the
+    output file does not exist yet (or `overwrite` is set), it is replaced by
+    a copy of the increment file.
+    """
+    _fd, _tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(output_file_path)), prefix='.tmp_', suffix='.root')
+    os.close(_fd)
+    try:
+        if os.path.exists(output_file_path) and not overwrite:
+            _merge_files(_tmp_path, [output_file_path, increment_file_path])
+        else:
+            shutil.copyfile(increment_file_path, _tmp_path)
+        manifest.write(_tmp_path)
+        os.rename(_tmp_path, output_file_path)
+    finally:
+        if os.path.exists(_tmp_path):
+            os.remove(_tmp_path)
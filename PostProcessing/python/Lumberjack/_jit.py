@@ -0,0 +1,200 @@
+from __future__ import print_function
+
+import hashlib
+
+from ._expressions import get_identifiers
+from ._splitting import _declare_once
+
+
+__all__ = ['ExpressionCompiler']
+
+
+class ExpressionCompiler(object):
+    """Compile chains of `Define` and `Filter` operations on a data frame in a single C++ translation unit.
+
+    Passing expression strings to `Define` and `Filter` causes each expression to
+    be jitted separately by the ROOT interpreter. Instead, this class generates
+    one C++ source containing a typed lambda for every operation, together with
+    a function which applies all operations to the root data frame and returns
+    the resulting nodes. The source is passed to the interpreter in a single
+    `Declare` call.
+
+    The argument types of the lambdas are taken from the column types of the
+    root data frame. For columns defined by earlier operations, the return type
+    of the lambda defining them is used.
+
+    Operations are tuples of the form ``('Filter', expression)`` or
+    ``('Define', column_name, expression)``, as for
+    :py:class:`~Lumberjack.DataFrameNodeCache`.
+    """
+
+    # columns provided by the data frame itself (not listed by `GetColumnNames`)
+    SPECIAL_COLUMN_TYPES = {
+        'rdfentry_': 'ULong64_t',
+        'rdfslot_': 'unsigned int',
+    }
+
+    def __init__(self, root_data_frame, column_types=None):
+        self._root = root_data_frame
+
+        # types of the columns of the root data frame (retrieved on demand if not given)
+        self._column_types = column_types
+        self._column_names = set(column_types.keys()) if column_types is not None else None
+
+        self._operation_chains = []
+        self._operation_chain_indices = {(): -1}
+
+        # keep compiled nodes alive
+        self._compiled_nodes = None
+
+    def _get_column_type(self, column_name):
+        '''type of a column of the root data frame, or `None` if there is no such column'''
+        if column_name in self.SPECIAL_COLUMN_TYPES:
+            return self.SPECIAL_COLUMN_TYPES[column_name]
+
+        if self._column_names is None:
+            self._column_names = set([str(_c) for _c in self._root.GetColumnNames()])
+            self._column_types = {}
+
+        if column_name not in self._column_names:
+            return None
+
+        if column_name not in self._column_types:
+            self._column_types[column_name] = str(self._root.GetColumnType(column_name))
+
+        return self._column_types[column_name]
+
+    def add_operations(self, operations):
+        """Register a chain of operations to be compiled (including all its leading subchains)."""
+        operations = tuple(operations)
+        for _i in range(1, len(operations) + 1):
+            _chain = operations[:_i]
+            if _chain not in self._operation_chain_indices:
+                self._operation_chain_indices[_chain] = len(self._operation_chains)
+                self._operation_chains.append(_chain)
+
+    @property
+    def n_operations(self):
+        """Number of operations registered so far."""
+        return len(self._operation_chains)
+
+    def get_cpp_code(self, namespace):
+        """C++ code for the function `namespace::build`, which returns the nodes for all operation chains.
+
+        The lambdas are local to the function, so that the code can also be
+        compiled into a library with ACLiC.
+        """
+        _lambda_lines = []
+        _build_lines = []
+
+        # map of columns defined by operations to the C++ type of their values
+        _defined_column_types = {(): {}}
+
+        for _i, _chain in enumerate(self._operation_chains):
+            _parent_chain = _chain[:-1]
+            _parent_node = "root" if not _parent_chain else "nodes[{}]".format(self._operation_chain_indices[_parent_chain])
+            _defined_columns = _defined_column_types[_parent_chain]
+
+            _operation = _chain[-1]
+            _expression = _operation[-1]
+
+            # determine lambda arguments (in order of appearance in the sorted list of identifiers)
+            _arg_names, _arg_types = [], []
+            for _identifier in sorted(get_identifiers(_expression)):
+                if _identifier in _defined_columns:
+                    _type = _defined_columns[_identifier]
+                else:
+                    _type = self._get_column_type(_identifier)
+                if _type is not None:
+                    _arg_names.append(_identifier)
+                    _arg_types.append(_type)
+
+            _lambda_args = ", ".join(["const {}& {}".format(_t, _n) for _n, _t in zip(_arg_names, _arg_types)])
+            _columns = "{" + ", ".join(['"{}"'.format(_n) for _n in _arg_names]) + "}"
+
+            if _operation[0] == 'Define':
+                _lambda_lines.append("    // Define '{}': {}".format(_operation[1], _expression))
+            elif _operation[0] == 'Filter':
+                _lambda_lines.append("    // Filter: {}".format(_expression))
+            else:
+                raise ValueError("Unknown data frame operation '{}'!".format(_operation[0]))
+
+            _lambda_lines.append("    auto op{} = []({}) {{ return ({}); }};".format(_i, _lambda_args, _expression))
+
+            if _operation[0] == 'Define':
+                _lambda_lines.append("    using type{} = typename std::decay<decltype(op{}({}))>::type;".format(
+                    _i, _i, ", ".join(["std::declval<const {}&>()".format(_t) for _t in _arg_types])))
+                _defined_column_types[_chain] = dict(_defined_columns, **{_operation[1]: "type{}".format(_i)})
+                _build_lines.append('    nodes.emplace_back({}.Define("{}", op{}, {}));'.format(_parent_node, _operation[1], _i, _columns))
+            else:
+                _defined_column_types[_chain] = _defined_columns
+                _build_lines.append('    nodes.emplace_back({}.Filter(op{}, {}));'.format(_parent_node, _i, _columns))
+
+        _lines = [
+            "#include <type_traits>",
+            "#include <utility>",
+            "#include <vector>",
+            "#include \"ROOT/RDataFrame.hxx\"",
+            "",
+        ]
+        _lines += ["namespace {} {{".format(_ns) for _ns in namespace.split('::')]
+        _lines += [
+            "std::vector<ROOT::RDF::RNode> build(ROOT::RDF::RNode root) {",
+        ]
+        _lines += _lambda_lines
+        _lines += [
+            "",
+            "    std::vector<ROOT::RDF::RNode> nodes;",
+            "    nodes.reserve({});".format(len(self._operation_chains)),
+        ]
+        _lines += _build_lines
+        _lines += [
+            "    return nodes;",
+            "}",
+        ]
+        _lines += ["}}  // namespace {}".format(_ns) for _ns in reversed(namespace.split('::'))]
+
+        return "\n".join(_lines)
+
+    def compile(self, code_cache=None, dependencies=()):
+        """Compile all registered operations and apply them to the root data frame.
+
+        If a :py:class:`~Lumberjack.CompiledCodeCache` is given, the code is
+        compiled into a cached library (including the sources in `dependencies`)
+        instead of being passed to the interpreter.
+
+        Returns a dictionary mapping each operation chain to the corresponding
+        data frame node, or `None` if the compilation failed.
+        """
+        import ROOT
+
+        if not self._operation_chains:
+            return {}
+
+        try:
+            # the code determines the namespace, so that different code never clashes
+            _hash = hashlib.md5(self.get_cpp_code(namespace="lumberjack::jit::batch").encode('utf-8')).hexdigest()[:12]
+            _namespace_basename = "batch_{}".format(_hash)
+            _code = self.get_cpp_code(namespace="lumberjack::jit::" + _namespace_basename)
+        except Exception as _e:
+            print("[WARNING] Failed to generate C++ code for {} operations: {}".format(len(self._operation_chains), _e))
+            return None
+
+        _success = False
+        if code_cache is not None:
+            _success = code_cache.load(_code, name=_namespace_basename, dependencies=dependencies) is not None
+        if not _success:
+            _success = _declare_once(_code)
+
+        if not _success:
+            print("[WARNING] Failed to compile C++ code for {} operations.".format(len(self._operation_chains)))
+            return None
+
+        try:
+            _build = getattr(ROOT.lumberjack.jit, _namespace_basename).build
+            self._compiled_nodes = _build(ROOT.RDF.AsRNode(self._root))
+        except Exception as _e:
+            print("[WARNING] Failed to apply compiled operations to data frame: {}".format(_e))
+            return None
+
+        return {_chain: self._compiled_nodes[_i] for _i, _chain in enumerate(self._operation_chains)}
@@ -0,0 +1,561 @@
+from __future__ import print_function
+
+import numpy as np
+import ROOT
+
+from array import array
+from tqdm import tqdm
+
+from ._postprocessor import PostProcessor
+from ._splitting import SplittingIndex
+from ._vectorize import UnsupportedExpressionError, compile_expression
+
+
+__all__ = ['ChunkedEventLoop', 'NumpyPostProcessor']
+
+
+def _get_uproot():
+    '''import `uproot`, which is only needed by the NumPy backend'''
+    try:
+        import uproot
+    except ImportError:
+        raise ImportError("The NumPy backend needs the `uproot` package for reading the input files: please install it (e.g. `pip install uproot`).")
+    return uproot
+
+
+def _open_tree(input_file, tree_name):
+    '''open a tree with `uproot`'''
+    _file = _get_uproot().open(input_file)
+    try:
+        return _file[tree_name]
+    except KeyError:
+        raise KeyError("Input file '{}' does not contain TTree '{}'".format(input_file, tree_name))
+
+
+def _get_tree_size(tree):
+    '''number of entries of an `uproot` tree'''
+    if hasattr(tree, 'num_entries'):  # uproot >= 4
+        return int(tree.num_entries)
+    return int(tree.numentries)
+
+
+def _iterate_arrays(tree, branches, chunk_size, entry_start, entry_stop):
+    '''dictionaries mapping branch names to arrays of (at most) `chunk_size` consecutive entries'''
+    if hasattr(tree, 'num_entries'):  # uproot >= 4
+        return tree.iterate(branches, step_size=chunk_size, entry_start=entry_start, entry_stop=entry_stop, library='np')
+    return tree.iterate(branches, entrysteps=chunk_size, entrystart=entry_start, entrystop=entry_stop, namedecode='utf-8')
+
+
+class _Columns(object):
+    '''columns of a chunk of entries: input branches and defines, which are evaluated when first needed'''
+
+    def __init__(self, arrays, defines, n_entries):
+        self._arrays = dict(arrays)
+        self._defines = defines
+        self._n_entries = n_entries
+
+    def __len__(self):
+        return self._n_entries
+
+    def __getitem__(self, name):
+        _values = self._arrays.get(name, None)
+        if _values is None:
+            _values = self._defines[name](self)
+            if np.ndim(_values) == 0:
+                # expression does not depend on any column
+                _values = np.full(self._n_entries, _values)
+            self._arrays[name] = _values
+        return _values
+
+    def select(self, mask):
+        """Columns of the entries for which `mask` is true (defines evaluated so far are kept)."""
+        return _Columns({_name: _values[mask] for _name, _values in self._arrays.items()}, self._defines, int(np.count_nonzero(mask)))
+
+
+class ChunkedEventLoop(object):
+    """Event loop over the entries of a tree, read in chunks into NumPy arrays.
+
+    Defines and selections are C++ expressions, which are translated into
+    vectorized NumPy expressions (see :py:class:`VectorizedExpression`), so
+    nothing needs to be compiled by the ROOT interpreter. Only the defines
+    needed by the registered processors or the selections are evaluated, and
+    only for the entries passing the selections (if possible).
+
+    Processors (e.g. :py:class:`NumpyPostProcessor`) have an attribute
+    `required_columns` and a method `process(columns)`, which is called with
+    the selected entries of each chunk. `entry_ranges` restricts the entries
+    read to a list of ranges `(i_file, begin, end)`. Functions and constants
+    of the ROOT macros can be used in expressions if `macros`
+    (:py:class:`RootMacros`) is given. With `use_numexpr`, expressions are
+    evaluated with `numexpr` where possible.
+    """
+
+    def __init__(self, input_files, tree_name, define_groups, selection_exprs, chunk_size=100000, entry_ranges=None, macros=None, use_numexpr=False):
+        self._input_files = list(input_files)
+        self._tree_name = tree_name
+        self._selection_exprs = list(selection_exprs)
+        self._chunk_size = int(chunk_size)
+        self.entry_ranges = entry_ranges
+        self._macros = macros
+        self._use_numexpr = use_numexpr
+
+        # the first definition of a column is used (redefinitions fail on a data frame)
+        self._define_exprs = {}
+        for _defines in define_groups:
+            for _name, _expr in _defines.items():
+                self._define_exprs.setdefault(_name, _expr)
+
+        self._processors = []
+        self._branch_names = None
+        self._defines = None
+        self._branches = None
+        self._selections = None
+
+    @property
+    def branch_names(self):
+        """Names of the branches of the tree (in the first input file)."""
+        if self._branch_names is None:
+            _tree = _open_tree(self._input_files[0], self._tree_name)
+            self._branch_names = [_k.decode('utf-8') if isinstance(_k, bytes) else _k for _k in _tree.keys()]
+        return self._branch_names
+
+    def get_chunk_ranges(self):
+        """Entry ranges `(i_file, begin, end)` of the chunks of all input files."""
+        _ranges = []
+        for _i_file, _input_file in enumerate(self._input_files):
+            _n_entries = _get_tree_size(_open_tree(_input_file, self._tree_name))
+            _ranges += [(_i_file, _begin, min(_begin + self._chunk_size, _n_entries)) for _begin in range(0, _n_entries, self._chunk_size)]
+        return _ranges
+
+    def add_processor(self, processor):
+        """Register a processor, to be called for each chunk of selected entries."""
+        self._processors.append(processor)
+        self._defines = None
+
+    def _compile(self, expression, column_name=None):
+        '''vectorized expression, with the column it defines in the error message'''
+        try:
+            return compile_expression(expression, macros=self._macros, use_numexpr=self._use_numexpr)
+        except UnsupportedExpressionError as _e:
+            if column_name is None:
+                raise
+            raise UnsupportedExpressionError(expression, "{} (needed for column '{}')".format(_e.reason, column_name))
+
+    def prepare(self):
+        """Translate the needed defines and the selections and determine which branches to read.
+
+        Raises :py:class:`UnsupportedExpressionError` if an expression cannot be vectorized.
+        """
+        self._selections = [self._compile(_expr) for _expr in self._selection_exprs]
+
+        _unresolved_columns = set()
+        for _processor in self._processors:
+            _unresolved_columns.update(_processor.required_columns)
+        for _selection in self._selections:
+            _unresolved_columns.update(_selection.columns)
+
+        # branches take precedence over defines with the same name (as on a data frame)
+        _branch_names = set(self.branch_names)
+        self._defines, _branches = {}, set()
+        while _unresolved_columns:
+            _name = _unresolved_columns.pop()
+            if _name in _branch_names:
+                _branches.add(_name)
+            elif _name in self._define_exprs:
+                if _name not in self._defines:
+                    self._defines[_name] = self._compile(self._define_exprs[_name], column_name=_name)
+                    _unresolved_columns.update(self._defines[_name].columns)
+            else:
+                raise KeyError("Column '{}' is neither defined nor a branch of TTree '{}'".format(_name, self._tree_name))
+
+        # at least one branch is needed to determine the size of the chunks
+        self._branches = sorted(_branches) or self.branch_names[:1]
+
+    def _iter_chunks(self):
+        '''columns of all chunks of entries to be processed'''
+        for _i_file, _input_file in enumerate(self._input_files):
+            if self.entry_ranges is None:
+                _file_ranges = [(None, None)]
+            else:
+                _file_ranges = [(_begin, _end) for (_i, _begin, _end) in self.entry_ranges if _i == _i_file]
+                if not _file_ranges:
+                    continue
+
+            _tree = _open_tree(_input_file, self._tree_name)
+            for _begin, _end in _file_ranges:
+                for _arrays in _iterate_arrays(_tree, self._branches, self._chunk_size, _begin, _end):
+                    yield _Columns(_arrays, self._defines, len(_arrays[self._branches[0]]))
+
+    def run(self, progress=False):
+        """Process all entries. Returns the number of processed entries and the number of entries passing the selections."""
+        if self._defines is None:
+            self.prepare()
+
+        print("[INFO] Reading {} branch(es) in chunks of {} entries: {}".format(len(self._branches), self._chunk_size, ", ".join(self._branches)))
+
+        _progress_bar = None
+        if progress:
+            _total = None
+            if self.entry_ranges is not None:
+                _total = sum([_end - _begin for _, _begin, _end in self.entry_ranges])
+            _progress_bar = tqdm(unit=" events", unit_scale=False, dynamic_ncols=True, desc="Event loop progress", total=_total)
+
+        _n_processed, _n_selected = 0, 0
+        for _columns in self._iter_chunks():
+            _n_processed += len(_columns)
+
+            if self._selections:
+                _mask = np.ones(len(_columns), dtype=bool)
+                for _selection in self._selections:
+                    _mask &= np.asarray(_selection(_columns), dtype=bool)
+                _columns = _columns.select(_mask)
+            _n_selected += len(_columns)
+
+            for _processor in self._processors:
+                _processor.process(_columns)
+
+            if _progress_bar is not None:
+                _progress_bar.update(_n_processed - _progress_bar.n)
+
+        if _progress_bar is not None:
+            _progress_bar.close()
+
+        return _n_processed, _n_selected
+
+
+def _accumulate(buffer, indices, weights=None):
+    '''add `weights` (or one) to `buffer` at `indices`, which may contain duplicates'''
+    if len(indices) * 16 >= len(buffer):
+        buffer += np.bincount(indices, weights=weights, minlength=len(buffer))
+    else:
+        # few indices: avoid summing over the whole buffer
+        _unique_indices, _inverse = np.unique(indices, return_inverse=True)
+        buffer[_unique_indices] += np.bincount(_inverse.ravel(), weights=weights)
+
+
+def _cross_join(entries_1, slots_1, entries_2, slots_2, n_slots_2):
+    '''all combinations of the (entry, slot) pairs of two lists with the same entry, with combined slots `slot_1 * n_slots_2 + slot_2`'''
+    # sort the second list by entry, so that the pairs of each entry are contiguous
+    _order = np.argsort(entries_2, kind='mergesort')
+    _slots_2 = slots_2[_order]
+    _n_entries = max(int(entries_1.max()) if len(entries_1) else 0, int(entries_2.max()) if len(entries_2) else 0) + 1
+    _counts_2 = np.bincount(entries_2, minlength=_n_entries)
+    _starts_2 = np.cumsum(_counts_2) - _counts_2
+
+    # repeat each pair of the first list once for each pair of the second list with the same entry
+    _repeats = _counts_2[entries_1]
+    _entries = np.repeat(entries_1, _repeats)
+    _offsets = np.arange(len(_entries)) - np.repeat(np.cumsum(_repeats) - _repeats, _repeats)
+    _slots = np.repeat(slots_1, _repeats) * n_slots_2 + _slots_2[np.repeat(_starts_2[entries_1], _repeats) + _offsets]
+
+    return _entries, _slots
+
+
+class _SplittingKey(object):
+    '''values of a splitting key and the lookup of the values matching each entry'''
+
+    def __init__(self, key, splitting):
+        self.key = key
+        self.values = sorted(splitting.keys())
+        self._splitting = splitting
+
+        self._index = SplittingIndex(key, splitting)
+        self._slots_by_index = None
+        if self._index.is_indexable:
+            self._slots_by_index = np.zeros(len(self.values), dtype=np.int64)
+            for _slot, _value in enumerate(self.values):
+                _index = self._index.get_value_index(_value)
+                if _index is not None:
+                    self._slots_by_index[_index] = _slot
+
+    @property
+    def variables(self):
+        return set([_var for _cuts in self._splitting.values() for _var in _cuts])
+
+    @staticmethod
+    def _get_cut_mask(cuts, columns):
+        _mask = np.ones(len(columns), dtype=bool)
+        for _var, _bin_spec in cuts.items():
+            _values = np.asarray(columns[_var])
+            if isinstance(_bin_spec, tuple):
+                _mask &= (_bin_spec[0] <= _values) & (_values < _bin_spec[1])
+            else:
+                _mask &= (_values == _bin_spec)
+        return _mask
+
+    def get_pairs(self, columns):
+        """Entries and slots (indices in `values`) of all pairs of entries and matching values."""
+        _entries, _slots = [], []
+        for _slot, _value in enumerate(self.values):
+            _cuts = self._splitting[_value]
+            if not _cuts:
+                _entries.append(np.arange(len(columns)))
+            elif self._slots_by_index is None:
+                _entries.append(np.flatnonzero(self._get_cut_mask(_cuts, columns)))
+            else:
+                continue
+            _slots.append(np.full(len(_entries[-1]), _slot, dtype=np.int64))
+
+        if self._slots_by_index is not None and self._index.variables:
+            _indices = self._index.get_indices(*[columns[_var] for _var in self._index.variables])
+            _entries.append(np.flatnonzero(_indices >= 0))
+            _slots.append(self._slots_by_index[_indices[_entries[-1]]])
+
+        if not _entries:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        return np.concatenate(_entries).astype(np.int64), np.concatenate(_slots).astype(np.int64)
+
+
+class _ObjectAccumulator(object):
+    '''sums over the entries in the bins of the objects of one specification for all splits, stored in flat buffers
+
+    The bins of each split are numbered like the (global) bins of the
+    corresponding ROOT object, including under- and overflow bins.
+    '''
+
+    # ROOT classes by object type (profile or not) and number of variables
+    _ROOT_CLASS_NAMES = {
+        (False, 1): 'TH1D',
+        (False, 2): 'TH2D',
+        (False, 3): 'TH3D',
+        (True, 2): 'TProfile',
+        (True, 3): 'TProfile2D',
+    }
+
+    # statistics of the ROOT objects (see `TH1::GetStats`) as (power of weight, indices of the variables in the product)
+    _STATS_TERMS = {
+        (False, 1): [(1, ()), (2, ()), (1, (0,)), (1, (0, 0))],
+        (False, 2): [(1, ()), (2, ()), (1, (0,)), (1, (0, 0)), (1, (1,)), (1, (1, 1)), (1, (0, 1))],
+        (False, 3): [(1, ()), (2, ()), (1, (0,)), (1, (0, 0)), (1, (1,)), (1, (1, 1)), (1, (0, 1)),
+                     (1, (2,)), (1, (2, 2)), (1, (0, 2)), (1, (1, 2))],
+        (True, 2): [(1, ()), (2, ()), (1, (0,)), (1, (0, 0)), (1, (1,)), (1, (1, 1))],
+        (True, 3): [(1, ()), (2, ()), (1, (0,)), (1, (0, 0)), (1, (1,)), (1, (1, 1)), (1, (0, 1)), (1, (2,)), (1, (2, 2))],
+    }
+
+    def __init__(self, is_profile, variables, weight, binnings):
+        self._is_profile = is_profile
+        self._variables = variables
+        self._weight = weight
+        self._stats_terms = self._STATS_TERMS[(is_profile, len(variables))]
+
+        # group the splits by binning, so that the entries of each group are binned at once
+        _group_indices = {}
+        self._group_edges = []
+        self._slot_groups = np.zeros(len(binnings), dtype=np.int64)
+        for _slot, _binning in enumerate(binnings):
+            _key = tuple([tuple(_edges) for _edges in _binning])
+            if _key not in _group_indices:
+                _group_indices[_key] = len(self._group_edges)
+                # edges are passed to the data frame models as single precision floats
+                self._group_edges.append([np.asarray(_edges, dtype=np.float32).astype(np.float64) for _edges in _binning])
+            self._slot_groups[_slot] = _group_indices[_key]
+
+        _slot_sizes = np.array([np.prod([len(_edges) + 1 for _edges in self._group_edges[_g]]) for _g in self._slot_groups], dtype=np.int64)
+        self._slot_offsets = np.cumsum(_slot_sizes) - _slot_sizes
+        self._slot_sizes = _slot_sizes
+        _size = int(_slot_sizes.sum())
+
+        # histograms: sum of weights (and squared weights) -- profiles: sum of weights, of w*y and of w*y^2 (and squared weights)
+        self._sumw = np.zeros(_size)
+        self._sumw2 = np.zeros(_size) if weight is not None else None
+        self._sumwy = np.zeros(_size) if is_profile else None
+        self._sumwy2 = np.zeros(_size) if is_profile else None
+
+        self._stats = np.zeros((len(binnings), len(self._stats_terms)))
+        self._entries = np.zeros(len(binnings), dtype=np.int64)
+
+    @property
+    def columns(self):
+        return [_v for _v in self._variables + [self._weight] if _v is not None]
+
+    def fill(self, columns, entries, slots):
+        """Fill the pairs of entries and splits (given by their slots)."""
+        _values = [np.asarray(columns[_var], dtype=np.float64)[entries] for _var in self._variables]
+        _weights = None
+        if self._weight is not None:
+            _weights = np.asarray(columns[self._weight], dtype=np.float64)[entries]
+
+        # -- global bin numbers and whether the entries are inside the axis ranges
+        _n_binned = len(self._group_edges[0])
+        _bins = np.zeros(len(entries), dtype=np.int64)
+        _in_range = np.ones(len(entries), dtype=bool)
+        _groups = self._slot_groups[slots]
+        for _i_group, _edges in enumerate(self._group_edges):
+            _selected = np.flatnonzero(_groups == _i_group) if len(self._group_edges) > 1 else slice(None)
+            _stride = 1
+            for _i_axis in range(_n_binned):
+                # underflow: 0, overflow: number of edges (like `TAxis::FindBin`)
+                _axis_bins = np.searchsorted(_edges[_i_axis], _values[_i_axis][_selected], side='right')
+                _in_range[_selected] &= (_axis_bins > 0) & (_axis_bins < len(_edges[_i_axis]))
+                _bins[_selected] += _axis_bins * _stride
+                _stride *= len(_edges[_i_axis]) + 1
+        _indices = self._slot_offsets[slots] + _bins
+
+        # -- bin contents
+        _accumulate(self._sumw, _indices, _weights)
+        if _weights is not None:
+            _accumulate(self._sumw2, _indices, _weights ** 2)
+        if self._is_profile:
+            _wy = _values[-1] if _weights is None else _weights * _values[-1]
+            _accumulate(self._sumwy, _indices, _wy)
+            _accumulate(self._sumwy2, _indices, _wy * _values[-1])
+
+        # -- statistics (only entries inside the axis ranges)
+        self._entries += np.bincount(slots, minlength=len(self._entries))
+        _slots_in_range = slots[_in_range]
+        _weights_in_range = _weights[_in_range] if _weights is not None else np.ones(len(_slots_in_range))
+        _values_in_range = [_v[_in_range] for _v in _values]
+        for _i_term, (_weight_power, _var_indices) in enumerate(self._stats_terms):
+            _term = _weights_in_range ** _weight_power
+            for _i_var in _var_indices:
+                _term = _term * _values_in_range[_i_var]
+            self._stats[:, _i_term] += np.bincount(_slots_in_range, weights=_term, minlength=len(self._entries))
+
+    def make_root_object(self, slot, name, title):
+        """Create the ROOT object for a split."""
+        _edges = self._group_edges[self._slot_groups[slot]]
+        _args = [name, title]
+        for _axis_edges in _edges:
+            _args += [len(_axis_edges) - 1, array('d', _axis_edges)]
+        _obj = getattr(ROOT, self._ROOT_CLASS_NAMES[(self._is_profile, len(self._variables))])(*_args)
+        _obj.SetDirectory(0)
+        if self._weight is not None:
+            _obj.Sumw2()
+
+        _begin, _end = self._slot_offsets[slot], self._slot_offsets[slot] + self._slot_sizes[slot]
+        _n_cells = int(self._slot_sizes[slot])
+        if self._is_profile:
+            _obj.Set(_n_cells, np.ascontiguousarray(self._sumwy[_begin:_end]))
+            _obj.GetSumw2().Set(_n_cells, np.ascontiguousarray(self._sumwy2[_begin:_end]))
+            _bin_entries = self._sumw[_begin:_end]
+            for _bin in np.flatnonzero(_bin_entries):
+                _obj.SetBinEntries(int(_bin), float(_bin_entries[_bin]))
+            if self._weight is not None:
+                _obj.GetBinSumw2().Set(_n_cells, np.ascontiguousarray(self._sumw2[_begin:_end]))
+        else:
+            _obj.Set(_n_cells, np.ascontiguousarray(self._sumw[_begin:_end]))
+            if self._weight is not None:
+                _obj.GetSumw2().Set(_n_cells, np.ascontiguousarray(self._sumw2[_begin:_end]))
+
+        _obj.PutStats(array('d', self._stats[slot]))
+        _obj.SetEntries(int(self._entries[slot]))
+
+        return _obj
+
+
+class _NumpyObject(object):
+    '''object of a split, created from the sums in its accumulator when it is written'''
+
+    def __init__(self, accumulator, slot, name, title):
+        self._accumulator = accumulator
+        self._slot = slot
+        self._name = name
+        self._title = title
+
+    def get_root_object(self):
+        return self._accumulator.make_root_object(self._slot, self._name, self._title)
+
+    def Write(self):
+        self.get_root_object().Write()
+
+
+class NumpyPostProcessor(PostProcessor):
+    """PostProcessor filling its objects from the chunks of NumPy arrays of a :py:class:`ChunkedEventLoop`.
+
+    The objects are written with the same names, titles, binnings and directory
+    layout as by :py:class:`PostProcessor`. Instead of filtering the entries
+    separately for each split, the splits matching each entry are determined
+    once per chunk (using a :py:class:`SplittingIndex` where possible). All
+    objects of a specification are then filled for all splits at once, by
+    binning the values with `np.searchsorted` and summing the weights in flat
+    arrays with `np.bincount`.
+    """
+
+    def __init__(self, event_loop, splitting_spec, quantities, splittings=None):
+        super(NumpyPostProcessor, self).__init__(None, splitting_spec, quantities, splittings=splittings)
+        self._event_loop = event_loop
+        self._splitting_keys = None
+        self._split_slots = None
+        self._accumulators = []
+
+    def _set_up_splitting_keys(self):
+        '''splitting keys (in the order of the split names) and the slot of each split'''
+        if self._splittings is None:
+            # individual splittings not known -> treat the combined splits as values of a single key
+            self._splitting_keys = [_SplittingKey(None, self._splitting_spec)]
+            self._split_slots = {_split_name: _slot for _slot, _split_name in enumerate(self._splitting_keys[0].values)}
+            return
+
+        _keys = [_path_element.split(':', 1)[0] for _path_element in sorted(self._splitting_spec)[0].split('/')]
+        self._splitting_keys = [_SplittingKey(_key, self._splittings[_key]) for _key in _keys]
+
+        self._split_slots = {}
+        for _split_name in self._splitting_spec:
+            _slot = 0
+            for _splitting_key, _path_element in zip(self._splitting_keys, _split_name.split('/')):
+                _slot = _slot * len(_splitting_key.values) + _splitting_key.values.index(_path_element.split(':', 1)[1])
+            self._split_slots[_split_name] = _slot
+
+    def _create_objects(self):
+        self._root_objects = {}
+        self._accumulators = []
+
+        for _obj_type, _vars_xyz, _weight in self._specs:
+            _binnings = [None] * len(self._split_slots)
+            _layouts = {}
+            for _split_name in self._splitting_spec:
+                _split_dict = dict([_path_element.split(':', 1) for _path_element in _split_name.split('/')])
+                _layouts[_split_name] = self._get_object_layout(_split_name, _split_dict, _obj_type, _vars_xyz, _weight)
+                _binnings[self._split_slots[_split_name]] = _layouts[_split_name][2]
+
+            _accumulator = _ObjectAccumulator(
+                is_profile=(_obj_type == self.__class__.ObjectType.profile),
+                variables=[_v for _v in _vars_xyz if _v is not None],
+                weight=_weight,
+                binnings=_binnings,
+            )
+            self._accumulators.append(_accumulator)
+
+            for _split_name, (_obj_name, _title, _, _subdirectory_keys) in _layouts.items():
+                self._get_object_dict(_split_name, _subdirectory_keys)[_obj_name] = _NumpyObject(_accumulator, self._split_slots[_split_name], _obj_name, _title)
+
+    @property
+    def required_columns(self):
+        """Columns needed for filling the objects and determining the splits."""
+        _columns = set()
+        for _splitting_key in self._splitting_keys:
+            _columns.update(_splitting_key.variables)
+        for _accumulator in self._accumulators:
+            _columns.update(_accumulator.columns)
+        return _columns
+
+    def _get_split_pairs(self, columns):
+        '''entries and split slots of all pairs of entries and matching splits'''
+        _entries, _slots = self._splitting_keys[0].get_pairs(columns)
+        for _splitting_key in self._splitting_keys[1:]:
+            _key_entries, _key_slots = _splitting_key.get_pairs(columns)
+            _entries, _slots = _cross_join(_entries, _slots, _key_entries, _key_slots, len(_splitting_key.values))
+        return _entries, _slots
+
+    def process(self, columns):
+        """Fill the objects of all splits with a chunk of (selected) entries."""
+        if not len(columns):
+            return
+        _entries, _slots = self._get_split_pairs(columns)
+        if not len(_entries):
+            return
+        for _accumulator in self._accumulators:
+            _accumulator.fill(columns, _entries, _slots)
+
+    def book(self):
+        """Set up the objects for all splits and register with the event loop. Does not run the event loop."""
+        if not self._specs:
+            return False
+
+        self._set_up_splitting_keys()
+        self._create_objects()
+        self._event_loop.add_processor(self)
+
+        print("[INFO] Filling {} object(s) in {} splits from NumPy arrays".format(len(self._specs) * len(self._split_slots), len(self._split_slots)))
+
+        return True
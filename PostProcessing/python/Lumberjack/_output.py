@@ -0,0 +1,180 @@
+from __future__ import print_function
+
+import json
+import os
+import time
+
+
+__all__ = ['OutputWriter', 'get_compression_settings', 'get_manifest_path', 'write_manifest']
+
+
+# ROOT compression algorithms (see `ROOT::RCompressionSetting::EAlgorithm`)
+_COMPRESSION_ALGORITHMS = {
+    'ZLIB': 1,
+    'LZMA': 2,
+    'LZ4': 4,
+    'ZSTD': 5,
+}
+
+
+def get_compression_settings(compression_spec):
+    """Return the ROOT compression settings (`100 * algorithm + level`) for a specification `ALGORITHM:LEVEL`, e.g. 'LZ4:4' or 'ZSTD:5'."""
+    try:
+        _algorithm, _level = compression_spec.split(':', 1)
+        _level = int(_level)
+    except ValueError:
+        raise ValueError("Invalid compression '{}': expected 'ALGORITHM:LEVEL', e.g. 'LZ4:4'".format(compression_spec))
+
+    _algorithm = _algorithm.strip().upper()
+    if _algorithm not in _COMPRESSION_ALGORITHMS:
+        raise ValueError("Invalid compression '{}': unknown algorithm '{}' (available: {})".format(
+            compression_spec, _algorithm, ", ".join(sorted(_COMPRESSION_ALGORITHMS))))
+    if not 0 <= _level <= 9:
+        raise ValueError("Invalid compression '{}': level must be between 0 and 9".format(compression_spec))
+
+    return 100 * _COMPRESSION_ALGORITHMS[_algorithm] + _level
+
+
+def get_manifest_path(output_file_path):
+    """Path of the manifest written next to an output file (`<output>.manifest.json`)."""
+    return os.path.splitext(output_file_path)[0] + '.manifest.json'
+
+
+def _get_key_entries(directory, path):
+    '''manifest entries of all objects in a ROOT directory and its subdirectories'''
+    import ROOT
+
+    _entries = []
+    for _key in directory.GetListOfKeys():
+        _path = "{}/{}".format(path, _key.GetName()) if path else _key.GetName()
+        if ROOT.TClass.GetClass(_key.GetClassName()).InheritsFrom('TDirectory'):
+            _entries += _get_key_entries(directory.Get(_key.GetName()), _path)
+        else:
+            _entries.append(dict(
+                path=_path,
+                class_name=_key.GetClassName(),
+                bytes=_key.GetNbytes(),
+                uncompressed_bytes=_key.GetObjlen(),
+            ))
+    return _entries
+
+
+def write_manifest(output_file_path):
+    """Write a JSON index of the objects in a ROOT file (path, class and sizes of each object) next to it. Returns the path of the manifest."""
+    import ROOT
+
+    _file = ROOT.TFile(output_file_path, "READ")
+    try:
+        _entries = sorted(_get_key_entries(_file, ''), key=lambda _entry: _entry['path'])
+        _compression = _file.GetCompressionSettings()
+    finally:
+        _file.Close()
+
+    _manifest_path = get_manifest_path(output_file_path)
+    with open(_manifest_path, 'w') as _f:
+        json.dump(
+            dict(
+                file=os.path.basename(output_file_path),
+                bytes=os.path.getsize(output_file_path),
+                compression=_compression,
+                n_objects=len(_entries),
+                objects=_entries,
+            ),
+            _f,
+            indent=1,
+            sort_keys=True,
+        )
+    return _manifest_path
+
+
+class OutputWriter(object):
+    """Writes nested dictionaries of ROOT objects to a ROOT file.
+
+    The keys of the dictionaries are the names of the subdirectories and
+    objects. All directories are created before any object is written, and
+    the objects are written directory by directory, so that each directory
+    is only looked up and entered once. Objects which are not ROOT objects
+    themselves (data frame results, or objects providing `get_root_object`)
+    are converted first.
+
+    If `compression` is given (see :py:func:`get_compression_settings`), the
+    output file uses these compression settings. If `skip_empty` is set,
+    objects without entries are not written. If `manifest` is set, an index
+    of the objects in the file is written next to it (see
+    :py:func:`write_manifest`).
+    """
+
+    def __init__(self, compression=None, skip_empty=False, manifest=False):
+        self._compression = compression
+        self._skip_empty = skip_empty
+        self._manifest = manifest
+
+    @staticmethod
+    def get_objects_by_directory(objects, path=''):
+        """Return a dictionary mapping the directory paths in a nested dictionary of objects to lists of `(name, object)` pairs."""
+        _objects_by_directory = {path: []}
+        for _key, _object_or_dict in sorted(objects.items()):
+            if isinstance(_object_or_dict, dict):
+                _subpath = "{}/{}".format(path, _key) if path else _key
+                _objects_by_directory.update(OutputWriter.get_objects_by_directory(_object_or_dict, _subpath))
+            else:
+                _objects_by_directory[path].append((_key, _object_or_dict))
+        return _objects_by_directory
+
+    @staticmethod
+    def _get_root_object(obj):
+        '''ROOT object for an object in the output dictionaries'''
+        if hasattr(obj, 'get_root_object'):
+            return obj.get_root_object()
+        if hasattr(obj, 'GetValue'):
+            return obj.GetValue()
+        return obj
+
+    def write(self, objects, output_file_path):
+        """Write a nested dictionary of objects to a (new) ROOT file."""
+        import ROOT
+
+        _start = time.time()
+
+        _objects_by_directory = self.get_objects_by_directory(objects)
+
+        if self._compression is None:
+            _file = ROOT.TFile(output_file_path, "RECREATE")
+        else:
+            _file = ROOT.TFile(output_file_path, "RECREATE", "", self._compression)
+
+        # -- create the directory tree
+        _directories = {'': _file}
+        for _path in sorted(_objects_by_directory):
+            _parent = ''
+            for _name in _path.split('/') if _path else []:
+                _subpath = "{}/{}".format(_parent, _name) if _parent else _name
+                if _subpath not in _directories:
+                    _directories[_subpath] = _directories[_parent].mkdir(_name)
+                _parent = _subpath
+
+        # -- write the objects, directory by directory
+        _n_written, _n_skipped = 0, 0
+        for _path in sorted(_objects_by_directory):
+            if not _objects_by_directory[_path]:
+                continue
+            _directories[_path].cd()
+            for _name, _obj in _objects_by_directory[_path]:
+                _root_object = self._get_root_object(_obj)
+                if self._skip_empty and _root_object.GetEntries() == 0:
+                    _n_skipped += 1
+                    continue
+                _root_object.Write()
+                _n_written += 1
+
+        _file.Close()
+
+        _duration = max(time.time() - _start, 1e-6)
+        _bytes = os.path.getsize(output_file_path)
+        print("[INFO] Wrote {} object(s) in {} directories to file: {} ({:.1f} MB in {:.1f} s, {:.0f} objects/s, {:.1f} MB/s)".format(
+            _n_written, len(_directories) - 1, output_file_path, _bytes / 1024.0**2, _duration, _n_written / _duration, _bytes / 1024.0**2 / _duration))
+        if _n_skipped:
+            print("[INFO] Skipped {} empty object(s)".format(_n_skipped))
+
+        if self._manifest:
+            print("[INFO] Wrote manifest: {}".format(write_manifest(output_file_path)))
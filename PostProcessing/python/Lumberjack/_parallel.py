@@ -0,0 +1,156 @@
+from __future__ import print_function
+
+import glob
+import multiprocessing
+import os
+import shutil
+
+
+__all__ = ['expand_input_files', 'merge_root_files', 'partition_files', 'run_in_process_pool']
+
+
+def expand_input_files(file_specs):
+    """Resolve a list of input file specifications to a list of file paths.
+
+    Each specification can be a file path, a glob pattern or a string of the
+    form ``@FILE``, where ``FILE`` is a text file containing one specification
+    per line (empty lines and lines starting with ``#`` are ignored).
+    Patterns not matching any file are kept, so that they can be reported as
+    missing later on.
+    """
+    if isinstance(file_specs, str):
+        file_specs = [file_specs]
+
+    _files = []
+    for _spec in file_specs:
+        if _spec.startswith('@'):
+            with open(_spec[1:], 'r') as _file_list:
+                _listed_specs = [_line.strip() for _line in _file_list]
+            _files += expand_input_files([_s for _s in _listed_specs if _s and not _s.startswith('#')])
+        elif glob.has_magic(_spec):
+            _files += sorted(glob.glob(_spec)) or [_spec]
+        else:
+            _files.append(_spec)
+
+    # remove duplicates, keeping order
+    _unique_files = []
+    for _file in _files:
+        if _file not in _unique_files:
+            _unique_files.append(_file)
+
+    return _unique_files
+
+
+def partition_files(files, n_groups, sizes=None):
+    """Distribute `files` among at most `n_groups` groups of approximately equal total size.
+
+    Sizes are given by `sizes` (a list of numbers, one per file) or taken from
+    the file system. The files in each group keep their original order.
+    """
+    if sizes is None:
+        sizes = [os.path.getsize(_file) if os.path.exists(_file) else 0 for _file in files]
+
+    _groups = [[] for _ in range(min(n_groups, len(files)))]
+    _group_sizes = [0] * len(_groups)
+
+    # assign largest files first, always to the currently smallest group
+    for _i_file in sorted(range(len(files)), key=lambda _i: -sizes[_i]):
+        _i_group = _group_sizes.index(min(_group_sizes))
+        _groups[_i_group].append(_i_file)
+        _group_sizes[_i_group] += sizes[_i_file]
+
+    return [[files[_i] for _i in sorted(_group)] for _group in _groups]
+
+
+# function executed by the worker processes (set before forking)
+_worker_function = None
+
+
+def _call_worker_function(indexed_args):
+    _index, _args = indexed_args
+    return _index, _worker_function(*_args)
+
+
+def run_in_process_pool(function, args_list, n_processes, max_tasks_per_child=None, callback=None):
+    """Call `function` for each tuple of arguments in `args_list` in a pool of `n_processes` worker processes.
+
+    The worker processes are forked from the current process, so `function`
+    does not need to be picklable. If `max_tasks_per_child` is given, worker
+    processes are replaced after this many calls. If `callback` is given, it
+    is called in the current process with each return value as soon as it is
+    available. Returns the list of return values (in the order of `args_list`).
+    """
+    global _worker_function
+    _worker_function = function
+    _pool = multiprocessing.Pool(n_processes, maxtasksperchild=max_tasks_per_child)
+    try:
+        _results = [None] * len(args_list)
+        for _index, _result in _pool.imap_unordered(_call_worker_function, enumerate(args_list), chunksize=1):
+            _results[_index] = _result
+            if callback is not None:
+                callback(_result)
+        return _results
+    finally:
+        _pool.close()
+        _pool.join()
+        _worker_function = None
+
+
+def _merge_files(output_file, input_files):
+    '''merge the contents of several ROOT files into one file'''
+    import ROOT
+
+    _merger = ROOT.TFileMerger(False, False)
+    _merger.SetPrintLevel(0)
+    if not _merger.OutputFile(output_file, "RECREATE"):
+        raise IOError("Cannot open output file for merging: '{}'".format(output_file))
+    for _input_file in input_files:
+        if not _merger.AddFile(_input_file, False):
+            raise IOError("Cannot add file for merging: '{}'".format(_input_file))
+    if not _merger.Merge():
+        raise RuntimeError("Failed to merge files into '{}'".format(output_file))
+
+    return output_file
+
+
+def merge_root_files(file_groups, work_dir, n_processes=1, fan_in=2):
+    """Merge groups of ROOT files in a tree reduction.
+
+    `file_groups` is a dictionary mapping output file paths to the list of
+    files to be merged into them. In each round, batches of up to `fan_in`
+    files are merged into intermediate files in `work_dir`, using a pool of
+    `n_processes` worker processes for all groups. The final result of each
+    group is moved to the output path. The input files are left unchanged.
+    """
+    _remaining = {_output_file: list(_input_files) for _output_file, _input_files in file_groups.items() if _input_files}
+    _intermediate_files = set()
+
+    _i_round = 0
+    while any(len(_input_files) > 1 for _input_files in _remaining.values()):
+        _merge_jobs = []
+        for _i_output, (_output_file, _input_files) in enumerate(sorted(_remaining.items())):
+            _batches = [_input_files[_i:_i + fan_in] for _i in range(0, len(_input_files), fan_in)]
+            _remaining[_output_file] = []
+            for _i_batch, _batch in enumerate(_batches):
+                if len(_batch) == 1:
+                    _remaining[_output_file].append(_batch[0])
+                    continue
+                _merged_file = os.path.join(work_dir, "merge_{}_{}_{}.root".format(_i_round, _i_output, _i_batch))
+                _merge_jobs.append((_merged_file, _batch))
+                _remaining[_output_file].append(_merged_file)
+                _intermediate_files.add(_merged_file)
+
+        print("[INFO] Merging round {}: {} merge operation(s)...".format(_i_round, len(_merge_jobs)))
+        if n_processes > 1 and len(_merge_jobs) > 1:
+            run_in_process_pool(_merge_files, _merge_jobs, min(n_processes, len(_merge_jobs)))
+        else:
+            for _merge_job in _merge_jobs:
+                _merge_files(*_merge_job)
+
+        _i_round += 1
+
+    for _output_file, _input_files in _remaining.items():
+        if _input_files[0] in _intermediate_files:
+            shutil.move(_input_files[0], _output_file)
+        else:
+            shutil.copy(_input_files[0], _output_file)
@@ -1,6 +1,7 @@
 from __future__ import print_function
 
 import argparse
+import hashlib
 import numpy as np
 import os
 import ROOT
@@ -9,6 +10,12 @@ import time
 from array import array
 from enum import Enum
 
+from ._batching import BatchedObject, FillStatistics, RaggedBinnings, SplitSlots, WeightVariants
+from ._bitmask import get_bit_expressions
+from ._booking_plan import BookingPlan
+from ._output import OutputWriter
+from ._splitting import DataFrameNodeCache, SplittingIndex, get_cut_expressions
+
 
 __all__ = ["PostProcessor", "Timer"]
 
@@ -55,12 +62,72 @@ class PostProcessor(object):
         histogram = 1
         profile = 2
 
-    def __init__(self, data_frame, splitting_spec, quantities):
+    # object name prefixes by type and number of variables
+    _OBJECT_NAME_PREFIXES = {
+        (ObjectType.histogram, 1): 'h_',
+        (ObjectType.histogram, 2): 'h2d_',
+        (ObjectType.histogram, 3): 'h3d_',
+        (ObjectType.profile, 2): 'p_',
+        (ObjectType.profile, 3): 'p2d_',
+    }
+
+    # data frame model classes and actions by object type and number of variables
+    _DATA_FRAME_ACTIONS = {
+        (ObjectType.histogram, 1): ('TH1DModel', 'Histo1D'),
+        (ObjectType.histogram, 2): ('TH2DModel', 'Histo2D'),
+        (ObjectType.histogram, 3): ('TH3DModel', 'Histo3D'),
+        (ObjectType.profile, 2): ('TProfile1DModel', 'Profile1D'),
+        (ObjectType.profile, 3): ('TProfile2DModel', 'Profile2D'),
+    }
+
+    # data frame model classes and actions for filling objects of all splits at once (with an additional axis for the splits)
+    _BATCHED_DATA_FRAME_ACTIONS = {
+        (ObjectType.histogram, 1): ('TH2DModel', 'Histo2D'),
+        (ObjectType.histogram, 2): ('TH3DModel', 'Histo3D'),
+        (ObjectType.profile, 2): ('TProfile2DModel', 'Profile2D'),
+    }
+
+    # data frame model classes and actions for filling objects of all splits at once if their binnings differ (one bin per cell)
+    _RAGGED_DATA_FRAME_ACTIONS = {
+        ObjectType.histogram: ('TH1DModel', 'Histo1D'),
+        ObjectType.profile: ('TProfile1DModel', 'Profile1D'),
+    }
+
+    def __init__(self, data_frame, splitting_spec, quantities, splittings=None, use_split_index=False, node_cache=None, base_operations=(), bitmasks=(), batch_fills=False):
         self._df_bare = data_frame
+        # operations applied to the data frame before splitting (e.g. defines and selections)
+        self._base_operations = tuple(base_operations)
         self._splitting_spec = splitting_spec
         self._qs = quantities
 
+        # individual splittings (before cross product), needed for split index lookup
+        self._splittings = splittings
+        self._use_split_index = use_split_index
+        if self._use_split_index and self._splittings is None:
+            raise ValueError("Cannot use split index lookup: individual `splittings` not provided!")
+        self._split_indices = {}
+
+        # cuts on bits of bitmasks are tested directly on the integer columns
+        self._bit_expressions = get_bit_expressions(bitmasks)
+
+        # fill the objects of all splits at once, where possible (the matching splits
+        # are then looked up once per event, so this is also how objects are filled by index)
+        self._batch_fills = batch_fills or use_split_index
+
+        # data frame nodes can be shared with other PostProcessors using the same cache
+        if node_cache is None:
+            node_cache = DataFrameNodeCache(self._df_bare)
+        elif node_cache.root is not self._df_bare:
+            raise ValueError("Cannot use node cache: root node does not coincide with data frame!")
+        self._node_cache = node_cache
+
+        self._split_operations = None
         self._specs = []
+        self._root_objects = {}
+
+        # specifications filled with several weights at once, as tuples `(obj_type, vars_xyz, weight_variants)`
+        self._weight_variants = []
+        self._weight_variant_layouts = None
 
     @staticmethod
     def _get_directory_from_split_name(split_name):
@@ -70,16 +137,72 @@ class PostProcessor(object):
         _path_elements = [_pe.split(':', 1)[-1] for _pe in _path_elements]
         return '/'.join(_path_elements)
 
+    def _get_cut_filter_expressions(self, split_dict):
+        '''filter expressions for the cuts in a splitting dictionary'''
+        return get_cut_expressions(split_dict, self._bit_expressions)
+
+    def _define_split_indices(self):
+        '''set up the lookup of the index of the matching value for each splitting key (if possible)'''
+        self._split_indices = {}
+        for _key, _splitting in self._splittings.items():
+            _split_index = SplittingIndex(_key, _splitting, variable_expressions=self._bit_expressions)
+            if not _split_index.is_indexable:
+                print("[INFO] Splitting '{}' cannot be looked up by index ({}): using filters.".format(_key, _split_index.reason))
+                continue
+            if _split_index.variables:
+                print("[INFO] Splitting '{}': looking up index from variable(s) {}".format(_key, ", ".join(_split_index.variables)))
+                _split_index.declare()
+            self._split_indices[_key] = _split_index
+
+    def _get_split_operations(self, split_name, split_dict):
+        '''sequence of data frame operations (`Define`s and `Filter`s) needed to select the events for a split'''
+        if self._splittings is None:
+            # individual splittings not known -> filter on combined cuts
+            return [('Filter', _filter_expr) for _filter_expr in sorted(self._get_cut_filter_expressions(split_dict))]
+
+        # apply cuts for one splitting key after the other, so that splits
+        # sharing the values of the leading keys share the same filter nodes
+        _operations = []
+        for _path_element in split_name.split('/'):
+            _key, _value = _path_element.split(':', 1)
+            if _key in self._split_indices:
+                _split_index = self._split_indices[_key]
+                _filter_expr = _split_index.get_filter_expression(_value)
+                if _filter_expr is not None:
+                    _operations.append(('Define', _split_index.column_name, _split_index.expression))
+                    _operations.append(('Filter', _filter_expr))
+            else:
+                _operations += [
+                    ('Filter', _filter_expr)
+                    for _filter_expr in sorted(self._get_cut_filter_expressions(self._splittings[_key][_value]))
+                ]
+        return _operations
+
+    def get_split_operations(self):
+        """Return a dictionary mapping the split names to the sequence of data frame operations selecting the split."""
+        if self._split_operations is None:
+            if self._use_split_index:
+                self._define_split_indices()
+
+            # columns for filling objects with several weights are defined before splitting (and only computed for events which are used)
+            _weight_variant_operations = tuple(self._get_weight_variant_layouts()[0])
+
+            self._split_operations = {
+                _split_name: self._base_operations + _weight_variant_operations + tuple(self._get_split_operations(_split_name, _split_dict))
+                for _split_name, _split_dict in self._splitting_spec.items()
+            }
+
+        return self._split_operations
+
     def _split_df(self):
         # -- create splits
+        _n_nodes_before = self._node_cache.n_nodes
         self._split_dfs = {}
-        for _split_name, _split_dict in self._splitting_spec.iteritems():
-            self._split_dfs[_split_name] = self._df_bare
-            for _var, _bin_spec in _split_dict.iteritems():
-                if isinstance(_bin_spec, tuple):
-                    self._split_dfs[_split_name] = self._split_dfs[_split_name].Filter("{lo}<={var}&&{var}<{hi}".format(lo=_bin_spec[0], hi=_bin_spec[1], var=_var))
-                else:
-                    self._split_dfs[_split_name] = self._split_dfs[_split_name].Filter("{var}=={value}".format(value=_bin_spec, var=_var))
+        for _split_name, _operations in self.get_split_operations().items():
+            self._split_dfs[_split_name] = self._node_cache.get_node(_operations)
+
+        print("[INFO] Created {} data frame nodes for {} splits ({} nodes in total)".format(
+            self._node_cache.n_nodes - _n_nodes_before, len(self._split_dfs), self._node_cache.n_nodes))
 
     def _get_quantity_binning(self, quantity_name, split_dict):
         '''retrieve the binning for a quantity, taking named binnings into consideration.'''
@@ -104,89 +227,319 @@ class PostProcessor(object):
         else:
             return self._qs[quantity_name].binning
 
-    def _create_objects(self):
-        # -- create quantity shape histograms for each split
-        self._root_objects = {}  # keys are paths of the form 'splitting_key1:splitting_value1/.../splitting_keyN:splitting_valueN'
+    def _get_object_layout(self, split_name, split_dict, obj_type, vars_xyz, weight):
+        '''name, title, binnings (one per binned axis) and subdirectory keys of the object for a specification in a split'''
+        _var_x, _var_y, _var_z = vars_xyz
+        _vars = [_v for _v in vars_xyz if _v is not None]
+
+        _var_string_for_title = '_'.join(_vars)
+        _name_suffix = '_'.join([_s for _s in (_var_x, weight) if _s is not None])
+        _title = '_'.join([_s for _s in (_var_string_for_title, weight, split_name) if _s is not None])
+
+        if _var_z is not None:
+            assert(_var_y is not None)  # cannot have 'z' without 'y'
+
+        # -- histograms are binned in all variables, profiles in all but the last one
+        if obj_type == self.__class__.ObjectType.profile:
+            assert _var_y is not None
+            _binned_vars = _vars[:-1]
+        else:
+            _binned_vars = _vars
+        _binnings = [self._get_quantity_binning(quantity_name=_var, split_dict=split_dict) for _var in _binned_vars]
+
+        _obj_name = self._OBJECT_NAME_PREFIXES[(obj_type, len(_vars))] + _name_suffix
+
+        # objects with 'y' (and 'z') are stored in the subdirectory '[z/]y'
+        _subdirectory_keys = [_v for _v in (_var_z, _var_y) if _v is not None]
+
+        return _obj_name, _title, _binnings, _subdirectory_keys
 
+    def _get_object_dict(self, split_name, subdirectory_keys):
+        '''dictionary holding the objects of a split in the given subdirectory (created if needed)'''
+        _object_dict = self._root_objects.setdefault(split_name, {})
+        for _key in subdirectory_keys:
+            _object_dict = _object_dict.setdefault(_key, {})
+        return _object_dict
+
+    def _create_objects(self, specs):
+        # -- objects filled with several weights are booked together
+        _weight_variant_specs = self._get_weight_variant_specs()
+        specs = [_spec for _spec in specs if _spec not in _weight_variant_specs]
+
+        # -- create quantity shape histograms for each split
+        # (keys of `_root_objects` are paths of the form 'splitting_key1:splitting_value1/.../splitting_keyN:splitting_valueN')
         for _split_name, _split_df in self._split_dfs.iteritems():
-            self._root_objects[_split_name] = {}
+            self._root_objects.setdefault(_split_name, {})
 
             _split_dict = dict([_path_element.split(':', 1) for _path_element in _split_name.split('/')])
 
-            for _obj_type, _vars_xyz, _weight in self._specs:
-                _var_x, _var_y, _var_z = _vars_xyz
-
-                _var_string_for_title = '_'.join([_v for _v in _vars_xyz if _v is not None])
-                _name_suffix = '_'.join([_s for _s in (_var_x, _weight) if _s is not None])
-                _title = '_'.join([_s for _s in (_var_string_for_title, _weight, _split_name) if _s is not None])
-
-                # -- determing binnings in 'x' (and 'y' and 'z', if specified)
-
-                _x_binning = self._get_quantity_binning(quantity_name=_var_x, split_dict=_split_dict)
-
-                if _var_z is not None:
-                    # Case 1: var 'z' specified -> 3D histogram/2D profile requested
-                    assert(_var_y is not None)  # cannot have 'z' without 'y'
-                    _y_binning = self._get_quantity_binning(quantity_name=_var_y, split_dict=_split_dict)
-                    _z_binning = self._get_quantity_binning(quantity_name=_var_z, split_dict=_split_dict)
-
-                    _var_z_subdict = self._root_objects[_split_name].setdefault(_var_z, {})  # ensure '_var_z' subdict exists
-                    _var_y_subdict = _var_z_subdict.setdefault(_var_y, {})  # ensure '_var_y' subdict exists
-                elif _var_y is not None:
-                    # Case 2: no var 'z' specified, but var 'y' specified -> 2D histogram/profile requested
-                    _y_binning = self._get_quantity_binning(quantity_name=_var_y, split_dict=_split_dict)
-                    _var_z_subdict = self._root_objects[_split_name].setdefault(_var_z, {})  # ensure '_var_z' subdict exists
-
-                if _obj_type == self.__class__.ObjectType.histogram:
-                    if _var_z is not None:
-                        # implied -> _var_y is also not `None`
-                        _obj_name = 'h3d_' + _name_suffix
-                        _obj_model = ROOT.RDF.TH3DModel(_obj_name, _title,
-                            len(_x_binning)-1, array('f', _x_binning),
-                            len(_y_binning)-1, array('f', _y_binning),
-                            len(_z_binning)-1, array('f', _z_binning))
-                        if _weight is None:
-                            self._root_objects[_split_name][_var_z][_var_y][_obj_name] = _split_df.Histo3D(_obj_model, _var_x, _var_y, _var_z)
-                        else:
-                            self._root_objects[_split_name][_var_z][_var_y][_obj_name] = _split_df.Histo3D(_obj_model, _var_x, _var_y, _var_z, _weight)
-                    elif _var_y is not None:
-                        _obj_name = 'h2d_' + _name_suffix
-                        _obj_model = ROOT.RDF.TH2DModel(_obj_name, _title,
-                            len(_x_binning)-1, array('f', _x_binning),
-                            len(_y_binning)-1, array('f', _y_binning))
-                        if _weight is None:
-                            self._root_objects[_split_name][_var_y][_obj_name] = _split_df.Histo2D(_obj_model, _var_x, _var_y)
-                        else:
-                            self._root_objects[_split_name][_var_y][_obj_name] = _split_df.Histo2D(_obj_model, _var_x, _var_y, _weight)
-                    else:
-                        _obj_name = 'h_' + _name_suffix
-                        _obj_model = ROOT.RDF.TH1DModel(_obj_name, _title,
-                            len(_x_binning)-1, array('f', _x_binning))
-                        if _weight is None:
-                            self._root_objects[_split_name][_obj_name] = _split_df.Histo1D(_obj_model, _var_x)
-                        else:
-                            self._root_objects[_split_name][_obj_name] = _split_df.Histo1D(_obj_model, _var_x, _weight)
-
-                elif _obj_type == self.__class__.ObjectType.profile:
-                    assert _var_y is not None
-                    if _var_z is not None:
-                        _obj_name = 'p2d_' + _name_suffix
-                        _obj_model = ROOT.RDF.TProfile2DModel(_obj_name, _title,
-                            len(_x_binning)-1, array('f', _x_binning),
-                            len(_y_binning)-1, array('f', _y_binning))
-                        if _weight is None:
-                            self._root_objects[_split_name][_var_z][_var_y][_obj_name] = _split_df.Profile2D(_obj_model, _var_x, _var_y, _var_z)
-                        else:
-                            self._root_objects[_split_name][_var_z][_var_y][_obj_name] = _split_df.Profile2D(_obj_model, _var_x, _var_y, _var_z, _weight)
-                    else:
-                        _obj_name = 'p_' + _name_suffix
-                        _obj_model = ROOT.RDF.TProfile1DModel(_obj_name, _title,
-                            len(_x_binning)-1, array('f', _x_binning))
-                        if _weight is None:
-                            self._root_objects[_split_name][_var_y][_obj_name] = _split_df.Profile1D(_obj_model, _var_x, _var_y)
-                        else:
-                            self._root_objects[_split_name][_var_y][_obj_name] = _split_df.Profile1D(_obj_model, _var_x, _var_y, _weight)
+            for _obj_type, _vars_xyz, _weight in specs:
+                _obj_name, _title, _binnings, _subdirectory_keys = self._get_object_layout(_split_name, _split_dict, _obj_type, _vars_xyz, _weight)
+
+                _n_vars = len([_v for _v in _vars_xyz if _v is not None])
+                _model_class_name, _action_name = self._DATA_FRAME_ACTIONS[(_obj_type, _n_vars)]
+
+                _model_args = [_obj_name, _title]
+                for _binning in _binnings:
+                    _model_args += [len(_binning)-1, array('f', _binning)]
+                _obj_model = getattr(ROOT.RDF, _model_class_name)(*_model_args)
+
+                _columns = [_v for _v in _vars_xyz if _v is not None]
+                if _weight is not None:
+                    _columns.append(_weight)
+
+                self._get_object_dict(_split_name, _subdirectory_keys)[_obj_name] = getattr(_split_df, _action_name)(_obj_model, *_columns)
+
+        self._create_weight_variant_objects()
+
+    def _get_weight_variant_specs(self):
+        '''set of the specifications filled together with other weight variants'''
+        return set([
+            (_obj_type, _vars_xyz, _weight)
+            for _obj_type, _vars_xyz, _weight_variants in self._weight_variants
+            for _weight in _weight_variants.weights
+        ])
+
+    def _get_weight_variant_layouts(self):
+        '''data frame operations defining the columns for filling objects with several weights, and the layout of these objects in each split'''
+        if self._weight_variant_layouts is not None:
+            return self._weight_variant_layouts
+
+        _operations = []
+        _defined_columns = set()
+
+        def _define(column_name, expression):
+            if column_name not in _defined_columns:
+                _operations.append(('Define', column_name, expression))
+                _defined_columns.add(column_name)
+            return column_name
+
+        if self._weight_variants:
+            WeightVariants.declare()
+            FillStatistics.declare()
+
+        _layouts = {}
+        for _i_group, (_obj_type, _vars_xyz, _weight_variants) in enumerate(self._weight_variants):
+            _vars = [_v for _v in _vars_xyz if _v is not None]
+            _weights_expression = _weight_variants.weights_expression
+            _weights_column = _define("lumberjackVariantWeights_{}".format(hashlib.md5(_weights_expression.encode('utf-8')).hexdigest()[:12]), _weights_expression)
+
+            for _split_name in self._splitting_spec:
+                _split_dict = dict([_path_element.split(':', 1) for _path_element in _split_name.split('/')])
+                _object_layouts = [
+                    self._get_object_layout(_split_name, _split_dict, _obj_type, _vars_xyz, _weight)
+                    for _weight in _weight_variants.weights
+                ]
+                # bin edges are stored with single precision, as for the unbatched objects
+                _binnings = tuple([tuple([float(np.float32(_edge)) for _edge in _binning]) for _binning in _object_layouts[0][2]])
+                _n_binned = len(_binnings)
+
+                # the bin of an event is determined once for all weight variants
+                _ragged_binnings = RaggedBinnings([_binnings])
+                _ragged_binnings.declare()
+                _cells_expression = _weight_variants.get_cells_expression(_ragged_binnings.get_cell_expression(0, _vars[:_n_binned]))
+                _cells_column = _define("lumberjackVariantCells_{}".format(hashlib.md5(_cells_expression.encode('utf-8')).hexdigest()[:12]), _cells_expression)
+
+                _columns = [_cells_column]
+                _columns += [_define("{}_{}".format(_cells_column, _column), SplitSlots.get_repeat_expression(_column, _cells_column)) for _column in _vars[_n_binned:]]
+                _columns.append(_weights_column)
+
+                # statistics (e.g. for the mean) and entries are accumulated separately for each weight variant
+                _stats = FillStatistics(_n_binned, _obj_type == self.__class__.ObjectType.profile)
+                _stats_expression = _stats.get_variant_stats_expression(_weights_column, _ragged_binnings.get_in_range_expression(0, _vars[:_n_binned]), _vars)
+                _stats_cells_expression = _stats.get_variant_cells_expression(_weight_variants.n_variants)
+                _stats_columns = [
+                    _define("lumberjackVariantStatsCells_{}".format(hashlib.md5(_stats_cells_expression.encode('utf-8')).hexdigest()[:12]), _stats_cells_expression),
+                    _define("lumberjackVariantStats_{}".format(hashlib.md5(_stats_expression.encode('utf-8')).hexdigest()[:12]), _stats_expression),
+                ]
+
+                _layouts[(_i_group, _split_name)] = (_ragged_binnings.n_cells, _binnings, _columns, _object_layouts, _stats, _stats_columns)
+
+        self._weight_variant_layouts = (_operations, _layouts)
+        return self._weight_variant_layouts
+
+    def _create_weight_variant_objects(self):
+        '''book the objects filled with several weights, with one data frame action for all weight variants in each split'''
+        _, _layouts = self._get_weight_variant_layouts()
+        for (_i_group, _split_name), (_n_cells, _binnings, _columns, _object_layouts, _stats, _stats_columns) in _layouts.items():
+            _obj_type, _vars_xyz, _weight_variants = self._weight_variants[_i_group]
+
+            _n_variant_cells = _n_cells * _weight_variants.n_variants
+            _model_class_name, _action_name = self._RAGGED_DATA_FRAME_ACTIONS[_obj_type]
+            # one bin per cell, centered on the cell number
+            _model = getattr(ROOT.RDF, _model_class_name)("lumberjack_variants_{}".format(_i_group), "", _n_variant_cells, -0.5, _n_variant_cells - 0.5)
+            _result = getattr(self._split_dfs[_split_name], _action_name)(_model, *_columns)
+            _n_stats_cells = _weight_variants.n_variants * _stats.n_terms
+            _stats_result = self._split_dfs[_split_name].Histo1D(
+                ROOT.RDF.TH1DModel("lumberjack_variants_stats_{}".format(_i_group), "", _n_stats_cells, -0.5, _n_stats_cells - 0.5), *_stats_columns)
+
+            for _i_variant, (_weight, (_obj_name, _title, _, _subdirectory_keys)) in enumerate(zip(_weight_variants.weights, _object_layouts)):
+                self._get_object_dict(_split_name, _subdirectory_keys)[_obj_name] = BatchedObject(
+                    _result, _obj_type == self.__class__.ObjectType.profile, None, _obj_name, _title, _binnings,
+                    cell_offset=_i_variant, cell_stride=_weight_variants.n_variants, weighted=_weight is not None,
+                    stats_result=_stats_result, stats_offset=_i_variant * _stats.n_terms)
+
+    def _partition_specs(self):
+        '''specifications of the objects filled for all splits at once (if `batch_fills` or `use_split_index` is set), and of the other objects'''
+        _weight_variant_specs = self._get_weight_variant_specs()
+        _batched_specs, _other_specs = [], []
+        for _obj_type, _vars_xyz, _weight in self._specs:
+            _n_vars = len([_v for _v in _vars_xyz if _v is not None])
+            if (_obj_type, _vars_xyz, _weight) in _weight_variant_specs:
+                # filled together with the other weight variants
+                _other_specs.append((_obj_type, _vars_xyz, _weight))
+            elif self._batch_fills and (_obj_type, _n_vars) in self._BATCHED_DATA_FRAME_ACTIONS:
+                _batched_specs.append((_obj_type, _vars_xyz, _weight))
+            else:
+                _other_specs.append((_obj_type, _vars_xyz, _weight))
+        return _batched_specs, _other_specs
+
+    @property
+    def needs_split_nodes(self):
+        """Whether data frame nodes are needed for the individual splits (i.e. not all objects are filled in batches)."""
+        return bool(self._partition_specs()[1])
+
+    def _create_batched_objects(self):
+        '''book the objects of all splits at once for the specifications which allow it, returns the other specifications'''
+        _batched_specs, _other_specs = self._partition_specs()
+        if not _batched_specs:
+            return _other_specs
+
+        # -- one column holding the slots of the splits matching each event
+        _split_slots = SplitSlots(self._splitting_spec, self._splittings, variable_expressions=self._bit_expressions)
+        _split_slots.declare()
+        _slots_column = "lumberjackBatchSlots_{}".format(hashlib.md5(_split_slots.expression.encode('utf-8')).hexdigest()[:12])
+        _operations = list(self._base_operations) + [('Define', _slots_column, _split_slots.expression)]
+        _defined_columns = set([_slots_column])
+
+        def _define(column_name, expression):
+            if column_name not in _defined_columns:
+                _operations.append(('Define', column_name, expression))
+                _defined_columns.add(column_name)
+            return column_name
+
+        # -- one action per specification and binning, filled once per event for all matching splits
+        def _get_local_slots_column(slots):
+            if slots == list(range(_split_slots.n_slots)):
+                return _slots_column
+            _remap_expression = _split_slots.get_remap_expression(_slots_column, slots, _split_slots.n_slots)
+            return _define("lumberjackBatchSlots_{}".format(hashlib.md5(_remap_expression.encode('utf-8')).hexdigest()[:12]), _remap_expression)
+
+        def _get_repeated_columns(columns, local_slots_column):
+            return [_define("{}_{}".format(local_slots_column, _column), _split_slots.get_repeat_expression(_column, local_slots_column)) for _column in columns]
+
+        def _get_stats_columns(stats, terms_column, local_slots_column, in_range_expression, shared_binnings):
+            _stats_expression = FillStatistics.get_slot_stats_expression(terms_column, in_range_expression, local_slots_column if shared_binnings else None)
+            _cells_expression = stats.get_cells_expression(local_slots_column)
+            return [
+                _define("lumberjackBatchStatsCells_{}".format(hashlib.md5(_cells_expression.encode('utf-8')).hexdigest()[:12]), _cells_expression),
+                _define("lumberjackBatchStats_{}".format(hashlib.md5(_stats_expression.encode('utf-8')).hexdigest()[:12]), _stats_expression),
+            ]
+
+        FillStatistics.declare()
+
+        _batches = []
+        for _obj_type, _vars_xyz, _weight in _batched_specs:
+            _vars = [_v for _v in _vars_xyz if _v is not None]
+            _weights = [_weight] if _weight is not None else []
+
+            _splits_by_binnings = {}
+            for _split_name in self._splitting_spec:
+                _split_dict = dict([_path_element.split(':', 1) for _path_element in _split_name.split('/')])
+                _layout = self._get_object_layout(_split_name, _split_dict, _obj_type, _vars_xyz, _weight)
+                # bin edges are stored with single precision, as for the unbatched objects
+                _binnings = tuple([tuple([float(np.float32(_edge)) for _edge in _binning]) for _binning in _layout[2]])
+                _splits_by_binnings.setdefault(_binnings, []).append((_split_slots.get_slot(_split_name), _split_name, _layout))
+            _n_binned = len(_layout[2])
+
+            # statistics (e.g. for the mean) and entries are accumulated separately for each split
+            _stats = FillStatistics(_n_binned, _obj_type == self.__class__.ObjectType.profile)
+            _terms_expression = _stats.get_terms_expression(_vars, _weight)
+            _terms_column = _define("lumberjackBatchStatsTerms_{}".format(hashlib.md5(_terms_expression.encode('utf-8')).hexdigest()[:12]), _terms_expression)
+
+            if len(_splits_by_binnings) > 1:
+                # -- binnings differ between splits: one action filling the flat cells of all splits
+                _splits = sorted([(_slot, _split_name, _layout, _binnings) for _binnings, _splits in _splits_by_binnings.items() for _slot, _split_name, _layout in _splits])
+                _local_slots_column = _get_local_slots_column([_slot for _slot, _, _, _ in _splits])
+                _ragged_binnings = RaggedBinnings([_binnings for _, _, _, _binnings in _splits])
+                _ragged_binnings.declare()
+                _cells_expression = _ragged_binnings.get_cells_expression(_local_slots_column, _vars[:_n_binned])
+                _columns = [_define("lumberjackBatchCells_{}".format(hashlib.md5(_cells_expression.encode('utf-8')).hexdigest()[:12]), _cells_expression)]
+                _columns += _get_repeated_columns(_vars[_n_binned:] + _weights, _local_slots_column)
+                _stats_columns = _get_stats_columns(
+                    _stats, _terms_column, _local_slots_column, _ragged_binnings.get_in_ranges_expression(_local_slots_column, _vars[:_n_binned]), shared_binnings=False)
+
+                _model_class_name, _action_name = self._RAGGED_DATA_FRAME_ACTIONS[_obj_type]
+                # one bin per cell, centered on the cell number
+                _model = getattr(ROOT.RDF, _model_class_name)("lumberjack_batch_{}".format(len(_batches)), "", _ragged_binnings.n_cells, -0.5, _ragged_binnings.n_cells - 0.5)
+                _objects = [
+                    (_split_name, _layout, _binnings, _local_slot, _ragged_binnings.get_cell_offset(_local_slot))
+                    for _local_slot, (_, _split_name, _layout, _binnings) in enumerate(_splits)
+                ]
+                _batches.append((_obj_type, _model, _action_name, _columns, _objects, _stats, _stats_columns))
+                continue
+
+            # -- same binnings for all splits: one action with an additional axis for the slots
+            for _binnings, _splits in _splits_by_binnings.items():
+                _splits.sort()
+                _local_slots_column = _get_local_slots_column([_slot for _slot, _, _ in _splits])
+
+                _columns = _get_repeated_columns(_vars + _weights, _local_slots_column)
+                # the slot axis is the last binned axis (before the profiled variable)
+                _columns.insert(_n_binned, _local_slots_column)
+
+                # all splits share the binnings, so the values are inside the binnings either for all or for none of them
+                _shared_binnings = RaggedBinnings([_binnings])
+                _shared_binnings.declare()
+                _stats_columns = _get_stats_columns(
+                    _stats, _terms_column, _local_slots_column, _shared_binnings.get_in_range_expression(0, _vars[:_n_binned]), shared_binnings=True)
+
+                _model_class_name, _action_name = self._BATCHED_DATA_FRAME_ACTIONS[(_obj_type, len(_vars))]
+                _model_args = ["lumberjack_batch_{}".format(len(_batches)), ""]
+                for _binning in _binnings + (range(len(_splits) + 1),):
+                    _model_args += [len(_binning) - 1, array('d', _binning)]
+                _objects = [(_split_name, _layout, _binnings, _local_slot, None) for _local_slot, (_, _split_name, _layout) in enumerate(_splits)]
+                _batches.append((_obj_type, getattr(ROOT.RDF, _model_class_name)(*_model_args), _action_name, _columns, _objects, _stats, _stats_columns))
+
+        _node = self._node_cache.get_node(_operations)
+        for _i_batch, (_obj_type, _model, _action_name, _columns, _objects, _stats, _stats_columns) in enumerate(_batches):
+            _result = getattr(_node, _action_name)(_model, *_columns)
+            _n_stats_cells = len(_objects) * _stats.n_terms
+            _stats_result = _node.Histo1D(ROOT.RDF.TH1DModel("lumberjack_batch_stats_{}".format(_i_batch), "", _n_stats_cells, -0.5, _n_stats_cells - 0.5), *_stats_columns)
+            for _split_name, (_obj_name, _title, _, _subdirectory_keys), _binnings, _local_slot, _cell_offset in _objects:
+                self._get_object_dict(_split_name, _subdirectory_keys)[_obj_name] = BatchedObject(
+                    _result, _obj_type == self.__class__.ObjectType.profile, _local_slot, _obj_name, _title, _binnings, cell_offset=_cell_offset,
+                    stats_result=_stats_result, stats_offset=_local_slot * _stats.n_terms)
+
+        print("[INFO] Filling {} object(s) in {} splits with {} batched data frame action(s)".format(
+            len(_batched_specs) * len(self._splitting_spec), len(self._splitting_spec), len(_batches)))
+
+        return _other_specs
+
+    @property
+    def n_objects_per_split(self):
+        """Number of objects requested for each split (counting each weight variant)."""
+        return len(self._specs)
 
+    @staticmethod
+    def _get_weight_variants(weight_spec):
+        '''weight variants for a weight specification `[weight1,weight2,...]` (an empty weight denotes no weight), or `None` for other specifications'''
+        if weight_spec is None or not weight_spec.startswith('['):
+            return None
+        if not weight_spec.endswith(']'):
+            raise ValueError("Invalid weight specification '{}': expected '[weight1,weight2,...]'".format(weight_spec))
+        return WeightVariants([_weight.strip() or None for _weight in weight_spec[1:-1].split(',')])
+
+    def _add_spec(self, obj_type, vars_xyz, weight_spec):
+        '''register an object specification (or one for each weight variant)'''
+        _weight_variants = self._get_weight_variants(weight_spec)
+        if _weight_variants is None:
+            self._specs.append((obj_type, vars_xyz, weight_spec))
+            return
+
+        self._weight_variants.append((obj_type, vars_xyz, _weight_variants))
+        for _weight in _weight_variants.weights:
+            self._specs.append((obj_type, vars_xyz, _weight))
 
     def add_histograms(self, histogram_specs):
         for _hspec in histogram_specs:
@@ -206,7 +559,7 @@ class PostProcessor(object):
             else:
                 _x, _y, _z = (_hspec, None, None)
 
-            self._specs.append((self.__class__.ObjectType.histogram, (_x, _y, _z), _weight_spec))
+            self._add_spec(self.__class__.ObjectType.histogram, (_x, _y, _z), _weight_spec)
 
     def add_profiles(self, profile_specs):
         for _pspec in profile_specs:
@@ -224,45 +577,56 @@ class PostProcessor(object):
                 # only x and y provided -> set 'z' to None
                 _x, _y, _z = _pspec.split(':', 1) + [None]
 
-            self._specs.append((self.__class__.ObjectType.profile, (_x, _y, _z), _weight_spec))
+            self._add_spec(self.__class__.ObjectType.profile, (_x, _y, _z), _weight_spec)
 
-    @staticmethod
-    def _write_output_recursively(object_or_dict, output_file, output_path):
-        '''write `object_or_dict` to path `output_path` if ROOT object or call recursively for all subobjects'''
-
-        # write out ROOT objects
-        if isinstance(object_or_dict, dict):
-            # create the output directory inside the ROOT file (if it does not exist)
-            if not output_file.GetDirectory(output_path):
-                output_file.mkdir(output_path)
-            # recurse through all the subdictionaries
-            for _subkey, _subobject_or_dict in object_or_dict.iteritems():
-                _subdir = "{}/{}".format(output_path, _subkey)
-                PostProcessor._write_output_recursively(_subobject_or_dict, output_file, _subdir)
-        else:
-            # write out the ROOT objects to the output directory
-            _output_dir = '/'.join(output_path.split('/')[:-1])
-            if _output_dir:
-                output_file.cd(_output_dir)
-            object_or_dict.Write()
+    def get_booking_plan(self):
+        """Return the :py:class:`BookingPlan` of the objects requested for all splits. Does not book anything."""
+        _entries = []
+        for _split_name in sorted(self._splitting_spec):
+            _split_dict = dict([_path_element.split(':', 1) for _path_element in _split_name.split('/')])
+            for _obj_type, _vars_xyz, _weight in self._specs:
+                _obj_name, _, _binnings, _subdirectory_keys = self._get_object_layout(_split_name, _split_dict, _obj_type, _vars_xyz, _weight)
+                _entries.append(dict(
+                    split=_split_name,
+                    path='/'.join(_subdirectory_keys + [_obj_name]),
+                    object_type=_obj_type.name,
+                    n_vars=len([_v for _v in _vars_xyz if _v is not None]),
+                    n_bins=[len(_binning) - 1 for _binning in _binnings],
+                    weighted=_weight is not None,
+                ))
+        return BookingPlan(_entries)
+
+    def book(self):
+        """Create the splits and book all requested objects on the data frame. Does not trigger the event loop."""
+        if not self._specs:
+            return False
 
-    def run(self, output_file_path):
+        self._root_objects = {}
+        _specs = self._create_batched_objects()
+        if _specs:
+            self._split_df()
+            self._create_objects(_specs)
+
+        return True
+
+    def write(self, output_file_path, writer=None):
+        """Write all booked objects to a ROOT file (using an :py:class:`OutputWriter`, if given). Triggers the event loop if it has not yet been run."""
 
         if not self._specs:
             print("[WARNING] No histograms and/or profiles booked for output. No file written.")
             return
 
-        self._split_df()
-        self._create_objects()
-
-        _outfile = ROOT.TFile(output_file_path, "RECREATE")
-        _split_names = set(self._root_objects.keys())
-
-        for _split_name in sorted(_split_names):
-            _directory_path = self._get_directory_from_split_name(_split_name)
-            _object_or_dict = self._root_objects.get(_split_name, {})
+        # nested dictionary of directories and objects
+        _objects = {}
+        for _split_name, _object_dict in self._root_objects.items():
+            _directory = _objects
+            for _name in self._get_directory_from_split_name(_split_name).split('/'):
+                _directory = _directory.setdefault(_name, {})
+            _directory.update(_object_dict)
 
-            PostProcessor._write_output_recursively(_object_or_dict, _outfile, _directory_path)
-
-        _outfile.Close()
+        (writer or OutputWriter()).write(_objects, output_file_path)
 
+    def run(self, output_file_path):
+        """Book all requested objects, run the event loop and write the output file."""
+        self.book()
+        self.write(output_file_path)
@@ -0,0 +1,125 @@
+from __future__ import print_function
+
+import datetime
+import json
+import socket
+import sys
+import time
+
+from contextlib import contextmanager
+
+
+__all__ = ['ProfileReport', 'get_peak_rss_bytes']
+
+
+def get_peak_rss_bytes(children=False):
+    """Peak resident set size of the current process (or of its terminated child processes, if `children` is set), in bytes."""
+    import resource
+
+    _usage = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF)
+    # `ru_maxrss` is given in kilobytes on Linux, but in bytes on macOS
+    return int(_usage.ru_maxrss) * (1 if sys.platform == 'darwin' else 1024)
+
+
+class ProfileReport(object):
+    """Timings of the phases of a run, statistics of its event loops and its memory usage, for writing to a JSON file.
+
+    Phases are named stages of the run (e.g. 'config', 'macros', 'jit',
+    'booking', 'event_loop', 'write') and can be recorded several times,
+    e.g. once per task. The report contains both the individual records and
+    the total duration of each phase. For each event loop, the number of
+    processed events, the event rate, the amount of data read and (if
+    available) the events processed by each slot are recorded. The reports
+    of worker processes can be attached to the report of the main process.
+
+    If `start_time` is not given, the run is assumed to start when the
+    report is created.
+    """
+
+    def __init__(self, start_time=None):
+        self._start_time = start_time if start_time is not None else time.time()
+        self._phases = []
+        self._event_loops = []
+        self._workers = []
+
+    @contextmanager
+    def phase(self, phase, name=None):
+        """Context manager recording the time spent inside it as a phase (optionally with a `name`, e.g. the task).
+
+        Yields the record of the phase, whose 'seconds' are set on exit.
+        """
+        _record = dict(phase=phase, name=name, seconds=None)
+        _start = time.time()
+        try:
+            yield _record
+        finally:
+            _record['seconds'] = time.time() - _start
+            self._phases.append(_record)
+
+    def add_phase(self, phase, seconds, name=None):
+        """Record a phase which took `seconds`."""
+        self._phases.append(dict(phase=phase, name=name, seconds=seconds))
+
+    def add_event_loop(self, name, n_events, seconds, bytes_read=None, slot_events=None, slot_seconds=None):
+        """Record an event loop which processed `n_events` in `seconds`.
+
+        `slot_events` and `slot_seconds` are the numbers of events processed by
+        each slot and the times after which each slot last reported progress,
+        counted from the start of the event loop.
+        """
+        _seconds = max(seconds, 1e-9)
+        _event_loop = dict(
+            name=name,
+            n_events=int(n_events),
+            seconds=seconds,
+            events_per_second=n_events / _seconds,
+            bytes_read=bytes_read,
+        )
+        if slot_events is not None:
+            _event_loop['slots'] = [
+                dict(
+                    slot=_slot,
+                    n_events=int(_n_events),
+                    events_per_second=_n_events / _seconds,
+                    active_seconds=slot_seconds[_slot] if slot_seconds is not None else None,
+                )
+                for _slot, _n_events in enumerate(slot_events)
+            ]
+        self._event_loops.append(_event_loop)
+
+    def add_worker(self, name, report_dict):
+        """Attach the report (as returned by :py:meth:`to_dict`) of a worker process."""
+        self._workers.append(dict(report_dict, name=name))
+
+    def to_dict(self):
+        """Dictionary with the contents of the report."""
+        _wall_seconds = time.time() - self._start_time
+
+        _phase_seconds = {}
+        for _phase in self._phases:
+            _phase_seconds[_phase['phase']] = _phase_seconds.get(_phase['phase'], 0) + _phase['seconds']
+
+        # totals include the event loops of the worker processes
+        _n_events = sum([_e['n_events'] for _e in self._event_loops]) + sum([_w['n_events'] for _w in self._workers])
+        _bytes_read = sum([_e['bytes_read'] or 0 for _e in self._event_loops]) + sum([_w['bytes_read'] or 0 for _w in self._workers])
+
+        return dict(
+            argv=sys.argv,
+            host=socket.gethostname(),
+            start_time=datetime.datetime.fromtimestamp(self._start_time).isoformat(),
+            wall_seconds=_wall_seconds,
+            phases=_phase_seconds,
+            phase_records=self._phases,
+            event_loops=self._event_loops,
+            n_events=_n_events,
+            events_per_second=_n_events / max(_wall_seconds, 1e-9),
+            bytes_read=_bytes_read,
+            peak_rss_bytes=get_peak_rss_bytes(),
+            peak_rss_children_bytes=get_peak_rss_bytes(children=True),
+            workers=self._workers,
+        )
+
+    def write(self, file_path):
+        """Write the report to a JSON file."""
+        with open(file_path, 'w') as _f:
+            json.dump(self.to_dict(), _f, indent=1, sort_keys=True)
@@ -0,0 +1,186 @@
+from __future__ import print_function
+
+import threading
+import time
+
+from tqdm import tqdm
+
+from ._splitting import _declare_once
+
+
+__all__ = ['EventLoopProgress']
+
+
+# per-slot event counters, incremented from the event loop without locking or calling Python
+_PROGRESS_CODE = r"""
+#include <atomic>
+#include <chrono>
+#include <vector>
+#include "ROOT/RDataFrame.hxx"
+
+namespace lumberjack {
+namespace progress {
+
+class SlotCounters {
+  public:
+    explicit SlotCounters(unsigned int nSlots) : fCounters(nSlots) {
+        for (auto& counter : fCounters) {
+            counter.fValue.store(0, std::memory_order_relaxed);
+            counter.fLastUpdate.store(0, std::memory_order_relaxed);
+        }
+        Start();
+    }
+
+    // reference time for the times of the last updates
+    void Start() { fStart = std::chrono::steady_clock::now(); }
+
+    void Register(ROOT::RDF::RResultPtr<ULong64_t>& count, ULong64_t everyNEvents) {
+        count.OnPartialResultSlot(everyNEvents, [this, everyNEvents](unsigned int slot, ULong64_t&) {
+            auto& counter = fCounters[slot];
+            counter.fValue.fetch_add(everyNEvents, std::memory_order_relaxed);
+            counter.fLastUpdate.store(
+                std::chrono::duration_cast<std::chrono::nanoseconds>(std::chrono::steady_clock::now() - fStart).count(),
+                std::memory_order_relaxed);
+        });
+    }
+
+    unsigned int GetNSlots() const { return fCounters.size(); }
+    ULong64_t Get(unsigned int slot) const { return fCounters[slot].fValue.load(std::memory_order_relaxed); }
+    double GetSeconds(unsigned int slot) const { return 1e-9 * fCounters[slot].fLastUpdate.load(std::memory_order_relaxed); }
+
+  private:
+    // pad counters to separate cache lines, so that slots do not contend for them
+    struct Counter {
+        std::atomic<ULong64_t> fValue;
+        std::atomic<Long64_t> fLastUpdate;  // nanoseconds after `fStart`
+        char fPadding[64 - sizeof(std::atomic<ULong64_t>) - sizeof(std::atomic<Long64_t>)];
+    };
+    std::vector<Counter> fCounters;
+    std::chrono::steady_clock::time_point fStart;
+};
+
+// trigger the event loop (called with the Python GIL released)
+inline ULong64_t RunEventLoop(ROOT::RDF::RResultPtr<ULong64_t>& count) { return *count; }
+
+}  // namespace progress
+}  // namespace lumberjack
+"""
+
+
+def _get_n_slots():
+    '''number of processing slots used by the event loop'''
+    import ROOT
+
+    for _name in ('GetThreadPoolSize', 'GetImplicitMTPoolSize'):
+        _get_pool_size = getattr(ROOT.ROOT, _name, None)
+        if _get_pool_size is not None:
+            return max(1, int(_get_pool_size()))
+    return 1
+
+
+class EventLoopProgress(object):
+    """Progress bar for the event loop of a data frame.
+
+    Each processing slot adds the number of events it has processed to its own
+    atomic counter in C++ (every `every_n_events` events), so the event loop
+    never waits for a lock or calls back into Python. While the event loop is
+    running (see :py:meth:`run_event_loop`), a Python thread polls the
+    counters and updates a `tqdm` progress bar. Once the event loop has
+    finished, the event rate of each slot is reported.
+
+    `count_result` is the result of a `Count` action on the data frame, which
+    must not have been triggered yet. If `show_progress_bar` is not set, only
+    the slot counters are kept (e.g. for profiling).
+    """
+
+    def __init__(self, count_result, total=None, every_n_events=1000, poll_interval=0.2, show_progress_bar=True):
+        import ROOT
+
+        if not _declare_once(_PROGRESS_CODE):
+            raise RuntimeError("Failed to declare C++ code for progress reporting!")
+
+        self._count_result = count_result
+        self._total = total
+        self._poll_interval = poll_interval
+        self._show_progress_bar = show_progress_bar
+
+        self._counters = ROOT.lumberjack.progress.SlotCounters(_get_n_slots())
+        self._counters.Register(count_result, int(every_n_events))
+
+        # release the GIL while the event loop is running, so that the polling thread can run
+        self._run = ROOT.lumberjack.progress.RunEventLoop
+        self._gil_released = False
+        for _attribute in ('__release_gil__', '_threaded'):  # cppyy, legacy PyROOT
+            try:
+                setattr(self._run, _attribute, True)
+                self._gil_released = True
+                break
+            except (AttributeError, TypeError):
+                pass
+
+        if show_progress_bar and not self._gil_released:
+            print("[WARNING] Cannot release the GIL during the event loop: progress will only be shown once it has finished.")
+
+    def get_slot_counts(self):
+        """Number of events processed by each slot so far (rounded down to multiples of `every_n_events`)."""
+        return [self._counters.Get(_slot) for _slot in range(self._counters.GetNSlots())]
+
+    def get_slot_seconds(self):
+        """Time after the start of the event loop at which each slot last updated its counter, in seconds (0 for slots without updates)."""
+        return [self._counters.GetSeconds(_slot) for _slot in range(self._counters.GetNSlots())]
+
+    def _poll(self, progress_bar, stop_event):
+        '''update the progress bar from the slot counters until `stop_event` is set'''
+        _n_shown = 0
+        while not stop_event.wait(self._poll_interval):
+            _n_processed = sum(self.get_slot_counts())
+            if _n_processed > _n_shown:
+                progress_bar.update(_n_processed - _n_shown)
+                _n_shown = _n_processed
+
+    def run_event_loop(self):
+        """Run the event loop, showing its progress (if requested). Returns the number of processed events."""
+        if not self._show_progress_bar:
+            self._counters.Start()
+            _start = time.time()
+            _n_events = int(self._count_result.GetValue())
+            self.report(_n_events, max(time.time() - _start, 1e-9))
+            return _n_events
+
+        _progress_bar = tqdm(
+            unit=" events",
+            unit_scale=False,
+            dynamic_ncols=True,
+            desc="Event loop progress",
+            total=self._total,
+        )
+        _stop_event = threading.Event()
+        _poll_thread = threading.Thread(target=self._poll, args=(_progress_bar, _stop_event))
+        _poll_thread.daemon = True
+
+        self._counters.Start()
+        _start = time.time()
+        _poll_thread.start()
+        try:
+            _n_events = int(self._run(self._count_result))
+        finally:
+            _stop_event.set()
+            _poll_thread.join()
+        _duration = max(time.time() - _start, 1e-9)
+
+        # the slot counters lag behind by up to `every_n_events` per slot
+        _progress_bar.update(max(0, _n_events - _progress_bar.n))
+        _progress_bar.close()
+
+        self.report(_n_events, _duration)
+
+        return _n_events
+
+    def report(self, n_events, duration):
+        """Print the total event rate and the event rate of each slot."""
+        print("[INFO] Processed {} events in {:.1f} seconds ({:.0f} events/s)".format(n_events, duration, n_events / duration))
+        _slot_counts = self.get_slot_counts()
+        if len(_slot_counts) > 1:
+            print("[INFO] Event rates per slot:")
+            for _slot, _slot_count in enumerate(_slot_counts):
+                print("    - slot {}: {:.0f} events/s".format(_slot, _slot_count / duration))
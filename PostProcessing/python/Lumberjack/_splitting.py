@@ -0,0 +1,376 @@
+from __future__ import print_function
+
+import bisect
+import hashlib
+import math
+import numpy as np
+import re
+
+
+__all__ = ['DataFrameNodeCache', 'SplittingIndex', 'get_cut_expressions']
+
+
+# C++ helpers for looking up the bin of a value in a sorted array of edges/values
+_SPLITTING_HELPERS_CODE = """
+#include <algorithm>
+
+namespace lumberjack {
+namespace splitting {
+
+/*
+ * Index `k` of the interval [edges[k], edges[k+1]) containing `x`, or -1 if outside
+ */
+inline int findInterval(const double* edges, const int nEdges, const double& x) {
+    const double* it = std::upper_bound(edges, edges + nEdges, x);
+    const int k = (it - edges) - 1;
+    return ((k >= 0) && (k < nEdges - 1)) ? k : -1;
+}
+
+/*
+ * Index `k` of the element of `values` equal to `x`, or -1 if there is none
+ */
+inline int findExact(const double* values, const int nValues, const double& x) {
+    const double* it = std::lower_bound(values, values + nValues, x);
+    return ((it != values + nValues) && (*it == x)) ? (it - values) : -1;
+}
+
+}  // namespace splitting
+}  // namespace lumberjack
+"""
+
+_declared_code_hashes = set()
+
+
+def _declare_once(code):
+    '''pass C++ code to the ROOT interpreter, unless identical code has already been declared'''
+    _hash = hashlib.md5(code.encode('utf-8')).hexdigest()
+    if _hash in _declared_code_hashes:
+        return True
+
+    import ROOT
+    _success = ROOT.gInterpreter.Declare(code)
+    if _success:
+        _declared_code_hashes.add(_hash)
+    return _success
+
+
+def _cpp_double_literal(value):
+    '''C++ literal for a floating-point value'''
+    value = float(value)
+    if math.isinf(value):
+        return "{}std::numeric_limits<double>::infinity()".format('-' if value < 0 else '')
+    return repr(value)
+
+
+def get_cut_expressions(split_dict, variable_expressions=None):
+    """Return the filter expressions for the cuts in a splitting dictionary (intervals `(lo, hi)` or exact values).
+
+    `variable_expressions` maps variables which are not columns (e.g. bits of
+    a :py:class:`Bitmask`) to the expressions computing them.
+    """
+    _variable_expressions = variable_expressions or {}
+    _filter_exprs = []
+    for _var, _bin_spec in split_dict.items():
+        _var = _variable_expressions.get(_var, _var)
+        if isinstance(_bin_spec, tuple):
+            _filter_exprs.append("{lo}<={var}&&{var}<{hi}".format(lo=_bin_spec[0], hi=_bin_spec[1], var=_var))
+        else:
+            _filter_exprs.append("{var}=={value}".format(value=_bin_spec, var=_var))
+    return _filter_exprs
+
+
+class SplittingIndex(object):
+    """Per-event lookup of the value of a splitting key.
+
+    Instead of filtering the data frame once for every value of a splitting
+    key, the index of the (unique) value matching an event is computed via a
+    binary search over the interval edges (or the exact values) of each cut
+    variable, followed by a lookup in a table.
+
+    Values without any cuts (e.g. ``'inclusive'`` or ``'all'``) match every
+    event and are not part of the lookup table. A splitting can only be
+    indexed if all other values cut on the same variables in the same way
+    (intervals or exact values) and no two of them overlap.
+
+    `variable_expressions` maps variables which are not columns (e.g. bits of
+    a :py:class:`Bitmask`) to the expressions computing them.
+    """
+
+    # maximum number of cells of the lookup table
+    MAX_TABLE_SIZE = 100000
+
+    RE_NON_IDENTIFIER = re.compile(r'[^A-Za-z0-9_]')
+
+    def __init__(self, key, splitting, variable_expressions=None):
+        self._key = key
+        self._splitting = splitting
+        self._variable_expressions = variable_expressions or {}
+
+        # values which apply no cuts match all events
+        self._catch_all_values = sorted([_value for _value, _cuts in splitting.items() if not _cuts])
+        self._values = sorted([_value for _value, _cuts in splitting.items() if _cuts])
+
+        self._variables = None
+        self._axes = None
+        self._table = None
+        self._reason = None
+
+        try:
+            self._build()
+        except ValueError as _e:
+            self._variables = None
+            self._axes = None
+            self._table = None
+            self._reason = str(_e)
+
+    def _build(self):
+        '''build axes and lookup table, raising ValueError if the splitting cannot be indexed'''
+        if not self._values:
+            # only values without cuts -> nothing to look up
+            self._variables, self._axes, self._table = [], [], []
+            return
+
+        self._variables = sorted(self._splitting[self._values[0]].keys())
+
+        # -- build one axis per variable
+        self._axes = []
+        for _var in self._variables:
+            _specs = []
+            for _value in self._values:
+                _cuts = self._splitting[_value]
+                if sorted(_cuts.keys()) != self._variables:
+                    raise ValueError("values '{}' and '{}' cut on different variables".format(self._values[0], _value))
+                _specs.append(_cuts[_var])
+
+            if all(isinstance(_spec, tuple) for _spec in _specs):
+                _edges = sorted(set([float(_e) for _spec in _specs for _e in _spec]))
+                self._axes.append(('interval', _edges))
+            elif not any(isinstance(_spec, tuple) for _spec in _specs):
+                try:
+                    _exact_values = sorted(set([float(_spec) for _spec in _specs]))
+                except (TypeError, ValueError):
+                    raise ValueError("non-numeric value for variable '{}'".format(_var))
+                self._axes.append(('exact', _exact_values))
+            else:
+                raise ValueError("variable '{}' used both in interval and equality cuts".format(_var))
+
+        _shape = [self._get_axis_size(_axis) for _axis in self._axes]
+        _table_size = 1
+        for _n in _shape:
+            _table_size *= _n
+        if _table_size > self.MAX_TABLE_SIZE:
+            raise ValueError("lookup table would have {} cells (maximum: {})".format(_table_size, self.MAX_TABLE_SIZE))
+
+        # -- fill the lookup table (row-major, first variable varies slowest)
+        self._table = [-1] * _table_size
+        for _i_value, _value in enumerate(self._values):
+            _cuts = self._splitting[_value]
+            _cell_ranges = [
+                self._get_axis_cells(_axis, _cuts[_var])
+                for _var, _axis in zip(self._variables, self._axes)
+            ]
+            for _flat_index in self._iter_flat_indices(_cell_ranges, _shape):
+                if self._table[_flat_index] != -1:
+                    raise ValueError("values '{}' and '{}' overlap".format(self._values[self._table[_flat_index]], _value))
+                self._table[_flat_index] = _i_value
+
+    @staticmethod
+    def _get_axis_size(axis):
+        _type, _points = axis
+        if _type == 'interval':
+            return len(_points) - 1
+        return len(_points)
+
+    @staticmethod
+    def _get_axis_cells(axis, spec):
+        '''return the indices of all axis cells covered by a cut specification'''
+        _type, _points = axis
+        if _type == 'interval':
+            _lo, _hi = float(spec[0]), float(spec[1])
+            return range(_points.index(_lo), _points.index(_hi))
+        return [_points.index(float(spec))]
+
+    @staticmethod
+    def _iter_flat_indices(cell_ranges, shape):
+        '''return the flat (row-major) table indices of all combinations of cells'''
+        _flat_indices = [0]
+        for _cells, _n in zip(cell_ranges, shape):
+            _flat_indices = [_fi * _n + _c for _fi in _flat_indices for _c in _cells]
+        return _flat_indices
+
+    # -- public API
+
+    @property
+    def key(self):
+        return self._key
+
+    @property
+    def is_indexable(self):
+        """Whether the values of this splitting can be looked up via a single index."""
+        return self._table is not None
+
+    @property
+    def reason(self):
+        """Reason why the splitting cannot be indexed (`None` if it can)."""
+        return self._reason
+
+    @property
+    def variables(self):
+        """Names of the variables (columns) needed to compute the index."""
+        return self._variables
+
+    @property
+    def column_name(self):
+        """Name of the data frame column holding the index."""
+        return "lumberjackSplitIndex_{}".format(self.RE_NON_IDENTIFIER.sub('_', self._key))
+
+    def get_value_index(self, value):
+        """Index corresponding to splitting value `value`, or `None` for values which match all events."""
+        if value in self._catch_all_values:
+            return None
+        return self._values.index(value)
+
+    def get_filter_expression(self, value):
+        """Filter expression selecting events for splitting value `value`, or `None` if no filter is needed."""
+        _index = self.get_value_index(value)
+        if _index is None:
+            return None
+        return "{}=={}".format(self.column_name, _index)
+
+    def get_index(self, *variable_values):
+        """Index of the splitting value matching the variable values (in the order given by `variables`), or -1."""
+        _flat_index = 0
+        for (_type, _points), _x in zip(self._axes, variable_values):
+            _x = float(_x)
+            if _type == 'interval':
+                _k = bisect.bisect_right(_points, _x) - 1
+                if _k < 0 or _k >= len(_points) - 1:
+                    return -1
+            else:
+                _k = bisect.bisect_left(_points, _x)
+                if _k >= len(_points) or _points[_k] != _x:
+                    return -1
+            _flat_index = _flat_index * self._get_axis_size((_type, _points)) + _k
+        return self._table[_flat_index]
+
+    def get_indices(self, *variable_arrays):
+        """Vectorized version of :py:meth:`get_index`, taking and returning NumPy arrays."""
+        _variable_arrays = [np.asarray(_x, dtype=np.float64) for _x in variable_arrays]
+        _flat_indices = np.zeros(len(_variable_arrays[0]), dtype=np.int64)
+        _found = np.ones(len(_variable_arrays[0]), dtype=bool)
+        for (_type, _points), _x in zip(self._axes, _variable_arrays):
+            _n = self._get_axis_size((_type, _points))
+            _points = np.asarray(_points, dtype=np.float64)
+            if _type == 'interval':
+                _k = np.searchsorted(_points, _x, side='right') - 1
+                _found &= (_k >= 0) & (_k < _n)
+            else:
+                _k = np.searchsorted(_points, _x, side='left')
+                _found &= (_k < _n) & (_points[np.minimum(_k, _n - 1)] == _x)
+            _flat_indices = _flat_indices * _n + np.clip(_k, 0, _n - 1)
+        return np.where(_found, np.asarray(self._table, dtype=np.int64)[_flat_indices], -1)
+
+    @property
+    def function_name(self):
+        """Name of the C++ function computing the index."""
+        _hash = hashlib.md5(repr((self._variables, self._axes, self._table)).encode('utf-8')).hexdigest()[:12]
+        return "lumberjack::splitting::index_{}_{}".format(self.RE_NON_IDENTIFIER.sub('_', self._key), _hash)
+
+    @property
+    def expression(self):
+        """Expression for defining the index column on the data frame."""
+        return "{}({})".format(self.function_name, ", ".join([self._variable_expressions.get(_var, _var) for _var in self._variables]))
+
+    def get_cpp_code(self):
+        """C++ code for the function computing the index."""
+        _function_basename = self.function_name.rsplit('::', 1)[-1]
+        _lines = [
+            "namespace lumberjack {",
+            "namespace splitting {",
+            "int {}({}) {{".format(
+                _function_basename,
+                ", ".join(["const double& x{}".format(_i) for _i in range(len(self._variables))])
+            ),
+        ]
+        for _i, (_type, _points) in enumerate(self._axes):
+            _lines.append("    static const double axis{}[] = {{{}}};".format(_i, ", ".join(map(_cpp_double_literal, _points))))
+        _lines.append("    static const int table[] = {{{}}};".format(", ".join(map(str, self._table))))
+        _lines.append("    int flatIndex = 0;")
+        for _i, (_type, _points) in enumerate(self._axes):
+            _find_function = "findInterval" if _type == 'interval' else "findExact"
+            _lines += [
+                "    const int i{0} = {1}(axis{0}, {2}, x{0});".format(_i, _find_function, len(_points)),
+                "    if (i{} < 0) return -1;".format(_i),
+                "    flatIndex = flatIndex * {} + i{};".format(self._get_axis_size((_type, _points)), _i),
+            ]
+        _lines += [
+            "    return table[flatIndex];",
+            "}",
+            "}  // namespace splitting",
+            "}  // namespace lumberjack",
+        ]
+        return "\n".join(_lines)
+
+    def declare(self):
+        """Declare the C++ function computing the index to the ROOT interpreter."""
+        if not _declare_once("#include <limits>\n" + _SPLITTING_HELPERS_CODE):
+            raise RuntimeError("Failed to declare C++ helpers for splitting indices!")
+        if not _declare_once(self.get_cpp_code()):
+            raise RuntimeError("Failed to declare C++ function for index of splitting '{}'!".format(self._key))
+
+    def define(self, data_frame):
+        """Declare the index function and define the index column on a data frame."""
+        if not self._values:
+            return data_frame
+        self.declare()
+        return data_frame.Define(self.column_name, self.expression)
+
+
+class DataFrameNodeCache(object):
+    """Cache of data frame nodes obtained by applying `Define` and `Filter` operations to a common root node.
+
+    Nodes are identified by the sequence of operations leading to them from the
+    root. Requesting a sequence of operations only creates the nodes which do
+    not exist yet, so that identical prefixes (e.g. the cuts for the first
+    splitting key) are evaluated only once per event, even across tasks.
+
+    Operations are tuples of the form ``('Filter', expression)`` or
+    ``('Define', column_name, expression)``.
+    """
+
+    def __init__(self, root_data_frame):
+        self._root = root_data_frame
+        self._nodes = {(): root_data_frame}
+
+    @property
+    def root(self):
+        """The root node."""
+        return self._root
+
+    @property
+    def n_nodes(self):
+        """Number of nodes created so far (excluding the root node)."""
+        return len(self._nodes) - 1
+
+    def add_node(self, operations, node):
+        """Register a node created elsewhere (e.g. by compiling the operations) for a sequence of operations."""
+        self._nodes[tuple(operations)] = node
+
+    def get_node(self, operations):
+        """Return the node obtained by applying `operations` to the root node, creating it if needed."""
+        operations = tuple(operations)
+        _node = self._nodes.get(operations, None)
+        if _node is not None:
+            return _node
+
+        _parent = self.get_node(operations[:-1])
+        _operation = operations[-1]
+        if _operation[0] == 'Filter':
+            _node = _parent.Filter(_operation[1])
+        elif _operation[0] == 'Define':
+            _node = _parent.Define(_operation[1], _operation[2])
+        else:
+            raise ValueError("Unknown data frame operation '{}'!".format(_operation[0]))
+
+        self._nodes[operations] = _node
+        return _node
@@ -0,0 +1,32 @@
+from __future__ import print_function
+
+
+__all__ = ['configure_tree_io', 'enable_async_prefetching', 'get_bytes_read']
+
+
+def configure_tree_io(tree, cache_size=None, cluster_prefetch=False):
+    """Configure how the entries of a TTree (or TChain) are read.
+
+    `cache_size` is the size of the TTreeCache in bytes (ROOT's default is
+    used if not given). If `cluster_prefetch` is set, all baskets of the next
+    cluster are read at once when a cluster is entered. Note that
+    multithreaded event loops read the input files through TTree objects of
+    their own, which these settings do not reach.
+    """
+    if cache_size is not None:
+        tree.SetCacheSize(int(cache_size))
+
+    if cluster_prefetch:
+        tree.SetClusterPrefetch(True)
+
+
+def enable_async_prefetching():
+    """Let ROOT read the baskets in the TTreeCache asynchronously (only affects files opened afterwards)."""
+    import ROOT
+    ROOT.gEnv.SetValue("TFile.AsyncPrefetching", 1)
+
+
+def get_bytes_read():
+    """Total number of bytes read from ROOT files by the current process so far."""
+    import ROOT
+    return int(ROOT.TFile.GetFileBytesRead())
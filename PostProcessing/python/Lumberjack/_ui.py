@@ -3,16 +3,17 @@ from __future__ import print_function
 import abc
 import argparse
 import datetime
-import hashlib
+import json
 import time
 import numpy as np
 import os
 import re
+import shutil
 import sys
+import tempfile
 #import ROOT
 
 from contextlib import contextmanager
-from tqdm import tqdm
 
 __all__ = ["LumberjackInterfaceBase", "LumberjackCLI"]
 
@@ -50,12 +51,12 @@ class StreamDup:
 
 
 @contextmanager
-def log_stdout_to_file(filename):
+def log_stdout_to_file(filename, mode='w'):
     if filename is None:
         yield
     else:
         _old_stdout = sys.stdout
-        with open(filename, 'w') as _log:
+        with open(filename, mode) as _log:
             sys.stdout = StreamDup([sys.stdout, _log])
             yield
             sys.stdout.flush()
@@ -64,11 +65,19 @@ def log_stdout_to_file(filename):
 
 class LumberjackInterfaceBase(object):
 
-    RE_SPLITTING_KEY_SPEC = re.compile(r"([^[]]*)(\[(.*)\])?")
+    RE_SPLITTING_KEY_SPEC = re.compile(r"([^[\]]*)(\[(.*)\])?")
+
+    def __init__(self, start_time=None, **kwargs):
+        from Karma.PostProcessing.Lumberjack import ProfileReport
+
+        # timings and statistics of the run (written to a file with `--profile-report`)
+        self._profile = ProfileReport(start_time=start_time)
+        if start_time is not None:
+            self._profile.add_phase('root_import', time.time() - start_time)
 
-    def __init__(self, **kwargs):
         # retrieve runner arguments and analysis config
-        self._args, self._config = self._get_args_config(**kwargs)
+        with self._profile.phase('config'):
+            self._args, self._config = self._get_args_config(**kwargs)
 
     @abc.abstractmethod
     def _get_args_config(self, **kwargs):
@@ -79,6 +88,10 @@ class LumberjackInterfaceBase(object):
 
         import ROOT  # do this here to avoid ROOT overriding standard Python behavior
 
+        from Karma.PostProcessing.Lumberjack import (
+            CompiledCodeCache, Timer, configure_tree_io, enable_async_prefetching, get_cluster_ranges,
+            intersect_entry_ranges, make_entry_list_chain)
+
         # determine correct ROOT DataFrame class
         try:
             ROOT_DF_CLASS = ROOT.ROOT.RDataFrame
@@ -87,6 +100,9 @@ class LumberjackInterfaceBase(object):
 
         ROOT_MACROS = self._config.ROOT_MACROS
 
+        if self._args.async_prefetch:
+            enable_async_prefetching()
+
         # -- enable multithreading
         if int(self._args.jobs) > 1:
             print("[INFO] Enabling multithreading with {} threads...".format(self._args.jobs))
@@ -94,108 +110,392 @@ class LumberjackInterfaceBase(object):
 
         # -- set up data frame
         print("[INFO] Setting up data frame...")
-        print("[INFO] Sample file: {}".format(self._args.input_file))
+        if len(self._input_files) == 1:
+            print("[INFO] Sample file: {}".format(self._input_files[0]))
+        else:
+            print("[INFO] Sample files ({}):".format(len(self._input_files)))
+            for _input_file in self._input_files:
+                print("    - {}".format(_input_file))
+
+        # entry ranges `(i_file, begin, end)`, which may be restricted below
+        _entry_ranges = []
+        _use_entry_lists = self._args.entry_lists and self._args.selections is not None
+        _use_entry_ranges = self._args.entry_sampling is not None or int(self._args.num_events) > 0 or _use_entry_lists
+
+        self._df_size = 0
+        _file_sizes = []
+        for _i_file, _input_file in enumerate(self._input_files):
+            # exit if input file does not exist
+            if not os.path.exists(_input_file):
+                print("[ERROR] Input file does not exist: '{}'".format(_input_file))
+                exit(1)
+
+            # exit if tree does not exist in file
+            _f = ROOT.TFile(_input_file, "READ")
+            _tree = _f.Get(self._args.tree)
+            if not isinstance(_tree, ROOT.TTree):
+                print("[ERROR] Input file does not contain TTree '{}'".format(_input_file))
+                exit(1)
+            self._df_size += _tree.GetEntries()
+            _file_sizes.append(_tree.GetEntries())
+            if self._args.entry_sampling is not None:
+                _entry_ranges += [(_i_file, _begin, _end) for _begin, _end in get_cluster_ranges(_tree)]
+            elif _use_entry_ranges:
+                _entry_ranges.append((_i_file, 0, _tree.GetEntries()))
+            _f.Close()
 
-        # exit if input file does not exist
-        if not os.path.exists(self._args.input_file):
-            print("[ERROR] Input file does not exist: '{}'".format(self._args.input_file))
-            exit(1)
+        print("[INFO] Defining ROOT macros...")
 
-        # exit if tree does not exist in file
-        _f = ROOT.TFile(self._args.input_file, "READ")
-        _tree = _f.Get(self._args.tree)
-        if not isinstance(_tree, ROOT.TTree):
-            print("[ERROR] Input file does not contain TTree '{}'".format(self._args.input_file))
-            exit(1)
-        self._df_size = _tree.GetEntries()
-        _f.Close()
+        # sources of cached libraries to be included by generated code
+        self._code_cache = None
+        self._code_cache_dependencies = []
+        with self._profile.phase('macros'):
+            if self._args.compile_macros:
+                self._code_cache = CompiledCodeCache(self._args.cache_dir)
+                with Timer("ROOT macros") as _t:
+                    _root_macros_source = self._code_cache.load(ROOT_MACROS, name='root_macros')
+                _t.report()
+                if _root_macros_source is not None:
+                    self._code_cache_dependencies.append(_root_macros_source)
+                else:
+                    print("[WARNING] Compilation of ROOT macros failed: passing them to the interpreter instead.")
+
+            if not self._code_cache_dependencies:
+                ROOT.gInterpreter.Declare(ROOT_MACROS)
 
         print("[INFO] Sample type: {}".format(self._args.input_type))
-        self._df_bare = ROOT_DF_CLASS(self._args.tree, self._args.input_file)
+        if _use_entry_ranges:
+            # select entries with an entry list (unlike `Range`, this works with multithreading)
+            _entry_ranges = self._restrict_entry_ranges(_entry_ranges)
+            if _use_entry_lists:
+                # only read entries passing the global selections
+                _entry_ranges = intersect_entry_ranges(_entry_ranges, self._get_selection_entry_ranges(_file_sizes))
+
+            _n_selected = sum([_end - _begin for _, _begin, _end in _entry_ranges])
+            print("[INFO] Selected {} out of {} entries in {} entry range(s)".format(_n_selected, self._df_size, len(_entry_ranges)))
+            self._df_size = _n_selected
+
+            # keep chain and entry list alive as long as the data frame
+            self._chain, self._entry_list = make_entry_list_chain(self._args.tree, self._input_files, _entry_ranges)
+        else:
+            self._chain, self._entry_list = ROOT.TChain(self._args.tree), None
+            for _input_file in self._input_files:
+                self._chain.Add(_input_file)
+
+        # settings for reading the chain (only used directly by single-threaded event loops)
+        if self._args.tree_cache_size is not None or self._args.cluster_prefetch:
+            if int(self._args.jobs) > 1:
+                print("[WARNING] Options `--tree-cache-size` and `--cluster-prefetch` only have an effect on single-threaded event loops (`-j 1`).")
+            configure_tree_io(
+                self._chain,
+                cache_size=float(self._args.tree_cache_size) * 1024**2 if self._args.tree_cache_size is not None else None,
+                cluster_prefetch=self._args.cluster_prefetch,
+            )
 
-        print("[INFO] Defining ROOT macros...")
+        self._df_bare = ROOT_DF_CLASS(self._chain)
+        self._input_branch_names = [str(_c) for _c in self._df_bare.GetColumnNames()]
+        self._input_bytes = sum([os.path.getsize(_input_file) for _input_file in self._input_files])
+
+    def _restrict_entry_ranges(self, entry_ranges):
+        '''apply `--entry-sampling` and `-n` to a list of entry ranges `(i_file, begin, end)`'''
+
+        from Karma.PostProcessing.Lumberjack import limit_entry_ranges, sample_entry_ranges
+
+        if self._args.entry_sampling is not None:
+            if not 0 < float(self._args.entry_sampling) <= 1:
+                print("[ERROR] Fraction given to `--entry-sampling` must be in the interval (0, 1]: {}".format(self._args.entry_sampling))
+                exit(1)
+            entry_ranges = sample_entry_ranges(entry_ranges, float(self._args.entry_sampling))
+        if int(self._args.num_events) > 0:
+            print("[INFO] Limiting number of processed events to: {}".format(self._args.num_events))
+            entry_ranges = limit_entry_ranges(entry_ranges, int(self._args.num_events))
+
+        return entry_ranges
+
+    def _get_selection_entry_ranges(self, file_sizes):
+        '''entry ranges `(i_file, begin, end)` passing the global selections (cached, or determined in a separate event loop)'''
+
+        import ROOT
+
+        from Karma.PostProcessing.Lumberjack import apply_defines, apply_filters, entry_numbers_to_ranges, get_required_defines, EntryRangeCache, Timer
+
+        _define_groups = self._get_define_groups()
+        _selection_exprs = self._get_selection_exprs()
+        _selection_defines = get_required_defines(_define_groups, _selection_exprs)
+
+        _entry_range_cache = EntryRangeCache(self._args.cache_dir)
+        _key = _entry_range_cache.get_key(self._input_files, dict(
+            # entry lists of earlier versions may have been determined in multithreaded event loops
+            version=2,
+            tree=self._args.tree,
+            root_macros=self._config.ROOT_MACROS,
+            defines={_name: _expr for _defines in _define_groups for _name, _expr in _defines.items() if _name in _selection_defines},
+            selections=_selection_exprs,
+        ))
+
+        _entry_ranges = _entry_range_cache.load(_key)
+        if _entry_ranges is not None:
+            print("[INFO] Reading entries passing the global selections from entry list: {}".format(_entry_range_cache.get_path(_key)))
+            return _entry_ranges
+
+        print("[INFO] Determining entries passing the global selections for entry list: {}".format(_entry_range_cache.get_path(_key)))
+        _input_file_vector = ROOT.std.vector('string')()
+        for _input_file in self._input_files:
+            _input_file_vector.push_back(_input_file)
+
+        # in multithreaded event loops, `rdfentry_` does not coincide with the entry number in the chain,
+        # so this event loop is always single-threaded (the data frame is set up for the current mode when created)
+        _imt_enabled = ROOT.ROOT.IsImplicitMTEnabled()
+        if _imt_enabled:
+            ROOT.ROOT.DisableImplicitMT()
+        try:
+            _df = ROOT.ROOT.RDataFrame(self._args.tree, _input_file_vector)
+            for _defines in _define_groups:
+                _df = apply_defines(_df, {_name: _expr for _name, _expr in _defines.items() if _name in _selection_defines})
+            _df = apply_filters(_df, _selection_exprs)
 
-        ROOT.gInterpreter.Declare(ROOT_MACROS)
+            with Timer("entry list") as _t:
+                _entry_numbers = _df.AsNumpy(['rdfentry_'])['rdfentry_']
+            _t.report()
+        finally:
+            if _imt_enabled:
+                ROOT.ROOT.EnableImplicitMT(int(self._args.jobs))
 
-    def _prepare_data_frame(self):
+        _entry_ranges = entry_numbers_to_ranges(_entry_numbers, file_sizes)
+        print("[INFO] {} out of {} entries pass the global selections ({} entry ranges)".format(len(_entry_numbers), sum(file_sizes), len(_entry_ranges)))
+        _entry_range_cache.store(_key, _entry_ranges)
 
-        from Karma.PostProcessing.Lumberjack import apply_defines, apply_filters, define_quantities
+        return _entry_ranges
 
-        QUANTITIES = self._config.QUANTITIES
-        DEFINES = self._config.DEFINES
-        SELECTIONS = self._config.SELECTIONS
-
-        # -- limit the number of processed events
-        if self._args.num_events >= 0:
-            print("[INFO] Limiting number of processed events to: ".format(self._args.num_events))
-            self._df_bare = self._df_bare.Range(0, int(self._args.num_events))
-            self._df_size = min(self._df_size, int(self._args.num_events))
-            self._df_count_increment = max(self._df_size//100, 10)
-
-        # -- set up event counter (for progress reporting)
-        self._df_count = self._df_bare.Count()
-        self._df_count_increment = 100000
-
-        if self._args.progress:
-            self._progress = tqdm(
-                unit=" events",
-                unit_scale=False,
-                dynamic_ncols=True,
-                desc="Event loop progress",
-                total=self._df_size,
-            )
-            def _progress_callback(count):
-                self._progress.update(self._df_count_increment)
-
-            _func_basename = "my_callback_py_f"
-            _func_idstring = hashlib.md5(hex(id(_progress_callback))).hexdigest()  # unique ID
-            _func_fullname = _func_basename + '_' + _func_idstring
-            _func_slotcallback_fullname = _func_basename + '_slot_' + _func_idstring
-
-            import ROOT
-
-            # black magic to obtain pointer to Python function in ROOT's interpreter
-            ROOT.gInterpreter.ProcessLine("#include <Python.h>")
-            ROOT.gInterpreter.ProcessLine("long long "+_func_fullname+"_addr = " + hex(id(_progress_callback)) + ";")
-            ROOT.gInterpreter.ProcessLine("PyObject* "+_func_fullname+" = reinterpret_cast<PyObject*>("+_func_fullname+"_addr);")
-            ROOT.gInterpreter.ProcessLine("Py_INCREF("+_func_fullname+");")  # prevent garbage collection
-
-            # define a thread-safe std::function for the progress callback and register it
-            ROOT.gInterpreter.ProcessLine("std::mutex partialResultMutex_"+_func_idstring+";")
-            ROOT.gInterpreter.ProcessLine(
-                "std::function<void(unsigned int, ULong64_t&)> "+_func_slotcallback_fullname+" = [](unsigned int /*slot*/, ULong64_t& count) { "
-                    "std::lock_guard<std::mutex> lock(partialResultMutex_"+_func_idstring+"); "
-                    "PyEval_CallObject("+_func_fullname+", Py_BuildValue(\"(i)\", count)); "
-                "};"
-            )
-            self._df_count.OnPartialResultSlot(self._df_count_increment, getattr(ROOT, _func_slotcallback_fullname))
+    def _get_define_groups(self):
+        '''groups of defines (name -> expression) for the current input type, in the order they are applied'''
 
-        # -- apply basic analysis selection
+        from Karma.PostProcessing.Lumberjack import get_bitmask_defines, get_quantity_defines
 
-        self._df = self._df_bare  #start from "bare" DataFrame (without defines)
+        QUANTITIES = self._config.QUANTITIES
+        DEFINES = self._config.DEFINES
 
-        print("[INFO] Defining quantities...")
         # "main" quantities (with binning)
         _quantities =  dict(QUANTITIES['global'], **QUANTITIES.get(self._args.input_type, {}))
-        self._df = define_quantities(self._df, _quantities)
 
         # other quantities (only given as expressions, no binning)
-        self._df = apply_defines(self._df, DEFINES['global'])
+        _define_groups = [get_quantity_defines(_quantities), DEFINES['global']]
         if self._args.input_type in DEFINES:
-            self._df = apply_defines(self._df, DEFINES[self._args.input_type])
+            _define_groups.append(DEFINES[self._args.input_type])
 
+        # boolean columns for the bits of bitmasks (only defined if used in expressions)
+        _define_groups.append({
+            _name: _expr for _name, _expr in get_bitmask_defines(self._get_bitmasks()).items()
+            if not any(_name in _defines for _defines in _define_groups)
+        })
+
+        return _define_groups
+
+    def _get_bitmasks(self):
+        '''bitmasks of the analysis configuration (optional)'''
+        return getattr(self._config, 'BITMASKS', [])
+
+    def _get_selection_exprs(self):
+        '''filter expressions of all requested global selections'''
+        SELECTIONS = self._config.SELECTIONS
+
+        _selection_exprs = []
         if self._args.selections is not None:
             for _sel in self._args.selections:
                 if _sel not in SELECTIONS:
                     print("[ERROR] Applying global selection '{}'...".format(_sel))
                     raise ValueError("Unknown selection '{}'".format(_sel))
-                print("[INFO] Applying global selection '{}': {}".format(_sel, ' && '.join(SELECTIONS[_sel])))
-                self._df = apply_filters(self._df, SELECTIONS[_sel])
+                _selection_exprs += SELECTIONS[_sel]
+
+        return _selection_exprs
+
+    def _prepare_data_frame(self, required_columns=None):
+        """Apply defines and global selections to the bare data frame.
+
+        If `required_columns` is given, only the quantities and defines needed to
+        compute these columns (and the global selections) are applied.
+
+        If `--snapshot-cache` is set, the entries passing the global selections
+        are read from a snapshot (see `_get_selection_snapshot`) instead.
+
+        If `--batch-jit` is set, the defines and selections are not applied, but
+        stored as operations to be compiled together with the split filters
+        (see `_compile_operations`).
+        """
+
+        from Karma.PostProcessing.Lumberjack import apply_defines, apply_filters, get_required_defines, DataFrameNodeCache, EventLoopProgress
+
+        SELECTIONS = self._config.SELECTIONS
+
+        _define_groups = self._get_define_groups()
+        _selection_exprs = self._get_selection_exprs()
+
+        # read the entries passing the global selections from a cached snapshot
+        _df_input, _df_input_size, self._df_input_bytes = self._df_bare, self._df_size, self._input_bytes
+        _use_snapshot = self._args.snapshot_cache and bool(_selection_exprs)
+        if _use_snapshot:
+            _df_input, _df_input_size, _snapshot_path = self._get_selection_snapshot(_define_groups, _selection_exprs)
+            self._df_input_bytes = os.path.getsize(_snapshot_path)
+            _selection_exprs = []
+
+        # only define what is needed for the requested columns and the global selections
+        if required_columns is not None:
+            _required_defines = get_required_defines(_define_groups, list(required_columns) + _selection_exprs)
+
+            _n_defines_total = sum([len(_defines) for _defines in _define_groups])
+            _define_groups = [
+                {_name: _expr for _name, _expr in _defines.items() if _name in _required_defines}
+                for _defines in _define_groups
+            ]
+            print("[INFO] Only applying {} out of {} defines, as required by the queued task(s).".format(
+                sum([len(_defines) for _defines in _define_groups]), _n_defines_total))
+
+        # -- set up event counter (for progress reporting and the events processed by each slot)
+        self._df_count = _df_input.Count()
+
+        self._progress = None
+        if self._args.progress or self._args.profile_report is not None:
+            self._progress = EventLoopProgress(self._df_count, total=_df_input_size, show_progress_bar=self._args.progress)
+
+        # -- apply basic analysis selection
+
+        self._df = _df_input  #start from "bare" DataFrame (without defines)
+
+        if self._args.batch_jit:
+            # defer defines and selections, so they can be compiled together with the split filters
+            print("[INFO] Deferring defines and global selections for batch compilation...")
+            self._df_base_operations = tuple(
+                [('Define', _name, _expr) for _defines in _define_groups for _name, _expr in _defines.items()]
+                + [('Filter', _expr) for _expr in _selection_exprs]
+            )
+            self._df_node_cache = DataFrameNodeCache(self._df)
+            return
+
+        print("[INFO] Defining quantities...")
+        with self._profile.phase('jit'):
+            for _defines in _define_groups:
+                self._df = apply_defines(self._df, _defines)
+
+            if self._args.selections is not None and not _use_snapshot:
+                for _sel in self._args.selections:
+                    print("[INFO] Applying global selection '{}': {}".format(_sel, ' && '.join(SELECTIONS[_sel])))
+                    self._df = apply_filters(self._df, SELECTIONS[_sel])
+
+        # share split filter nodes between all tasks booked on this data frame
+        self._df_base_operations = ()
+        self._df_node_cache = DataFrameNodeCache(self._df)
+
+    def _get_selection_snapshot(self, define_groups, selection_exprs):
+        '''data frame reading the entries passing the global selections from a cached snapshot (created if needed), its number of entries and path'''
+
+        import ROOT
+
+        from Karma.PostProcessing.Lumberjack import apply_defines, apply_filters, get_identifiers, get_required_defines, SnapshotCache, Timer
+
+        # columns needed after the selections by all queued tasks (so that they can share the snapshot)
+        _all_defines = {}
+        for _defines in define_groups:
+            _all_defines.update(_defines)
+        if self._snapshot_required_columns is None:
+            _downstream_exprs = list(_all_defines.values())
+        else:
+            _downstream_defines = get_required_defines(define_groups, list(self._snapshot_required_columns))
+            _downstream_exprs = list(self._snapshot_required_columns) + [_all_defines[_name] for _name in _downstream_defines]
+
+        # store only branches of the input tree: defines are applied again when reading the snapshot
+        _branch_names = set(self._input_branch_names)
+        _columns = set()
+        for _expr in _downstream_exprs:
+            _columns.update(get_identifiers(_expr))
+        _columns = sorted(_columns & _branch_names)
+
+        _selection_defines = get_required_defines(define_groups, selection_exprs)
+
+        self._snapshot_cache = SnapshotCache(self._args.cache_dir)
+        _key = self._snapshot_cache.get_key(self._input_files, dict(
+            tree=self._args.tree,
+            num_events=int(self._args.num_events),
+            entry_sampling=self._args.entry_sampling and float(self._args.entry_sampling),
+            root_macros=self._config.ROOT_MACROS,
+            defines={_name: _all_defines[_name] for _name in _selection_defines},
+            selections=selection_exprs,
+            columns=_columns,
+        ))
+
+        if _key not in self._snapshot_data_frames:
+            _snapshot_path = self._snapshot_cache.get_path(_key)
+            if os.path.exists(_snapshot_path):
+                print("[INFO] Reading entries passing the global selections from snapshot: {}".format(_snapshot_path))
+            else:
+                print("[INFO] Creating snapshot of {} column(s) for entries passing the global selections: {}".format(len(_columns), _snapshot_path))
+                _df = self._df_bare
+                for _defines in define_groups:
+                    _df = apply_defines(_df, {_name: _expr for _name, _expr in _defines.items() if _name in _selection_defines})
+                _df = apply_filters(_df, selection_exprs)
+                with Timer("selection snapshot") as _t:
+                    self._snapshot_cache.create(_key, _df, _columns)
+                _t.report()
+
+            _f = ROOT.TFile(_snapshot_path, "READ")
+            _n_entries = _f.Get(SnapshotCache.TREE_NAME).GetEntries()
+            _f.Close()
+            print("[INFO] Snapshot contains {} out of {} entries".format(_n_entries, self._df_size))
+
+            self._snapshot_data_frames[_key] = (ROOT.ROOT.RDataFrame(SnapshotCache.TREE_NAME, _snapshot_path), _n_entries, _snapshot_path)
+
+        return self._snapshot_data_frames[_key]
+
+    def _run_event_loop(self, name):
+        '''run the event loop of the current data frame (with progress reporting, if requested) and report the amount of data read'''
+
+        from Karma.PostProcessing.Lumberjack import get_bytes_read
+
+        _bytes_read_before = get_bytes_read()
+
+        with self._profile.phase('event_loop', name=name) as _phase:
+            if self._progress is not None:
+                _n_events = self._progress.run_event_loop()
+            else:
+                _n_events = self._df_count.GetValue()
+
+        _bytes_read = get_bytes_read() - _bytes_read_before
+        print("[INFO] Read {:.1f} MB out of {:.1f} MB of input files ({:.1f}%)".format(
+            _bytes_read / 1024.0**2, self._df_input_bytes / 1024.0**2, 100.0 * _bytes_read / max(self._df_input_bytes, 1)))
+
+        self._profile.add_event_loop(
+            name, _n_events, _phase['seconds'],
+            bytes_read=_bytes_read,
+            slot_events=self._progress.get_slot_counts() if self._progress is not None else None,
+            slot_seconds=self._progress.get_slot_seconds() if self._progress is not None else None,
+        )
 
     def _cleanup_data_frame(self):
         pass  # what to do here?
 
 
+    def _get_required_columns(self, task_specs):
+        '''columns needed for the objects and splittings of the tasks, or `None` if all defines should be applied'''
+        from Karma.PostProcessing.Lumberjack import get_bitmask_columns, get_object_spec_columns
+
+        if self._args.define_all:
+            return None
+
+        # cuts on bits are tested on the integer columns containing them
+        _bitmask_columns = get_bitmask_columns(self._get_bitmasks())
+
+        _required_columns = set()
+        for _task_spec in task_specs:
+            for _object_spec in list(_task_spec.get('histograms', None) or []) + list(_task_spec.get('profiles', None) or []):
+                _required_columns.update(get_object_spec_columns(_object_spec))
+
+            # cut variables of all splittings
+            _splitting_specs, _ = self._get_splitting_specs(_task_spec)
+            for _splitting in _splitting_specs.values():
+                for _split_dict in _splitting.values():
+                    _required_columns.update([_bitmask_columns.get(_var, _var) for _var in _split_dict])
+
+        return _required_columns
+
     def _expand_subtasks(self, task_configs):
         '''replace single task with subtasks, if slicing a particular splitting is enabled'''
         SPLITTINGS = self._config.SPLITTINGS
@@ -223,28 +523,7 @@ class LumberjackInterfaceBase(object):
                 if _expansions_left:
                     for _i_subtask, _splitting_subkey_group in enumerate(_splitting_subkey_groups):
                         _subtask_splitting_string = "{}[{}]".format(_splitting_key, ",".join(_splitting_subkey_group))
-                        _new_splittings = _task_spec['splittings'][:]
-                        # replace '@' syntax with '[]' syntax specifying subkeys explicitly
-                        _new_splittings[_i_splitting_key] = _subtask_splitting_string
-
-                        _subtask_filename = _task_spec['_filename'].split('.')
-                        _subtask_filename[-2] += '_' + str(_i_subtask)
-                        _subtask_filename = '.'.join(_subtask_filename)
-
-                        _subtask_log_filename = _task_spec.get('_log_filename', None)
-                        if _subtask_log_filename is not None:
-                            _subtask_log_filename = _subtask_log_filename.split('.')
-                            _subtask_log_filename[-2] += '_' + str(_i_subtask)
-                            _subtask_log_filename = '.'.join(_subtask_log_filename)
-
-                        _tasks_with_subtasks.append((
-                            "{}_{}".format(_task_name, _i_subtask),
-                            dict(_task_spec,
-                                splittings=_new_splittings,
-                                _filename=_subtask_filename,
-                                _log_filename=_subtask_log_filename,
-                            ),
-                        ))
+                        _tasks_with_subtasks.append(self._make_subtask(_task_name, _task_spec, _i_subtask, _i_splitting_key, _subtask_splitting_string))
                 else:
                     _tasks_with_subtasks.append((_task_name, _task_spec))
 
@@ -253,114 +532,772 @@ class LumberjackInterfaceBase(object):
         return task_configs
 
 
-    def _run_tasks(self, task_configs):
+    @staticmethod
+    def _make_subtask(task_name, task_spec, i_subtask, i_splitting_key, splitting_string):
+        '''subtask of a task, with the splitting at position `i_splitting_key` replaced by `splitting_string`'''
+        _new_splittings = task_spec['splittings'][:]
+        # replace '@' syntax with '[]' syntax specifying subkeys explicitly
+        _new_splittings[i_splitting_key] = splitting_string
+
+        _subtask_filename = task_spec['_filename'].split('.')
+        _subtask_filename[-2] += '_' + str(i_subtask)
+        _subtask_filename = '.'.join(_subtask_filename)
+
+        _subtask_log_filename = task_spec.get('_log_filename', None)
+        if _subtask_log_filename is not None:
+            _subtask_log_filename = _subtask_log_filename.split('.')
+            _subtask_log_filename[-2] += '_' + str(i_subtask)
+            _subtask_log_filename = '.'.join(_subtask_log_filename)
+
+        return (
+            "{}_{}".format(task_name, i_subtask),
+            dict(task_spec,
+                splittings=_new_splittings,
+                _filename=_subtask_filename,
+                _log_filename=_subtask_log_filename,
+                # keep track of the original (unsliced) task
+                _parent_task=task_spec.get('_parent_task', task_name),
+                _parent_filename=task_spec.get('_parent_filename', task_spec['_filename']),
+                _parent_log_filename=task_spec.get('_parent_log_filename', task_spec.get('_log_filename', None)),
+            ),
+        )
 
-        from Karma.PostProcessing.Lumberjack import PostProcessor, Timer
+    def _get_booking_plan(self, task_spec):
+        '''booking plan of the objects requested by a task (taken from the cache, if available)'''
+
+        from Karma.PostProcessing.Lumberjack import BookingPlan, BookingPlanCache, PostProcessor
+
+        _splitting_specs, _splittings_keys = self._get_splitting_specs(task_spec)
+        _combined_splittings = self._get_combined_splittings(_splitting_specs, _splittings_keys)
+
+        _booking_plan_cache = BookingPlanCache(self._args.cache_dir)
+        _key = _booking_plan_cache.get_key(dict(
+            quantities=task_spec['_quantities'],
+            splittings=_combined_splittings,
+            histograms=task_spec.get('histograms', None),
+            profiles=task_spec.get('profiles', None),
+        ))
+
+        _entries = _booking_plan_cache.load(_key)
+        if _entries is None:
+            # objects are only booked on the data frame in `book()`, so no data frame is needed
+            _pp = PostProcessor(
+                data_frame=None,
+                splitting_spec=_combined_splittings,
+                quantities=task_spec['_quantities'],
+                splittings=_splitting_specs,
+            )
+            _pp.add_histograms(task_spec.get('histograms', None) or [])
+            _pp.add_profiles(task_spec.get('profiles', None) or [])
+            _entries = _pp.get_booking_plan().entries
+            _booking_plan_cache.store(_key, _entries)
+
+        return BookingPlan(_entries)
+
+    def _partition_tasks_by_memory(self, task_configs):
+        '''slice the splittings of tasks whose objects would need more memory than `--memory-budget` into subtasks (passes)'''
+        _budget_bytes = float(self._args.memory_budget) * 1024**2
+        _n_slots = max(int(self._args.jobs), 1)
+
+        _partitioned_task_configs = []
+        _queue = list(task_configs)
+        while _queue:
+            _task_name, _task_spec = _queue.pop(0)
+            _plan = self._get_booking_plan(_task_spec)
+            if _plan.get_total_bytes(_n_slots) <= _budget_bytes:
+                _partitioned_task_configs.append((_task_name, _task_spec))
+                continue
 
-        SPLITTINGS = self._config.SPLITTINGS
+            # slice the splitting with the most values
+            _splitting_specs, _splittings_keys = self._get_splitting_specs(_task_spec)
+            _n_values, _i_splitting_key, _splitting_key = max([
+                (len(_splitting_specs[_key]), _i_key, _key) for _i_key, _key in enumerate(_splittings_keys)
+            ])
+            if _n_values < 2:
+                print("[WARNING] Estimated memory of task '{}' ({:.1f} MB) exceeds the memory budget, but the task cannot be split further!".format(
+                    _task_name, _plan.get_total_bytes(_n_slots) / 1024.0**2))
+                _partitioned_task_configs.append((_task_name, _task_spec))
+                continue
 
-        task_configs = self._expand_subtasks(task_configs)
+            # group the values, such that the objects of each group fit into the budget (if possible)
+            _bytes_by_value = _plan.get_bytes_per_slot_by_value(_splitting_key)
+            _value_groups = [[]]
+            _group_bytes = 0
+            for _value in sorted(_splitting_specs[_splitting_key]):
+                _value_bytes = _bytes_by_value[_value] * _n_slots
+                if _value_groups[-1] and _group_bytes + _value_bytes > _budget_bytes:
+                    _value_groups.append([])
+                    _group_bytes = 0
+                _value_groups[-1].append(_value)
+                _group_bytes += _value_bytes
+
+            print("[INFO] Estimated memory of task '{}' ({:.1f} MB) exceeds the memory budget: splitting '{}' into {} passes".format(
+                _task_name, _plan.get_total_bytes(_n_slots) / 1024.0**2, _splitting_key, len(_value_groups)))
+
+            # subtasks are checked again, since they may have to be split further
+            _queue[0:0] = [
+                self._make_subtask(_task_name, _task_spec, _i_subtask, _i_splitting_key, "{}[{}]".format(_splitting_key, ",".join(_value_group)))
+                for _i_subtask, _value_group in enumerate(_value_groups)
+            ]
 
-        # -- run all queued tasks
+        return _partitioned_task_configs
+
+    def _report_booking_plans(self, task_configs):
+        '''print the booking plan of each task'''
+        _n_slots = max(int(self._args.jobs), 1)
         for _task_name, _task_spec in task_configs:
+            print("[INFO] Task '{}':".format(_task_name))
+            self._get_booking_plan(_task_spec).report(n_slots=_n_slots)
+
+    def _get_splitting_specs(self, task_spec):
+        '''resolve the splitting keys of a task (with optional slicing syntax) to their splitting specifications'''
+        SPLITTINGS = self._config.SPLITTINGS
+
+        _splittings_key_specs = task_spec.get('splittings')
+
+        _splitting_specs = {}
+        _splittings_keys = []
+        for _key_spec in _splittings_key_specs:
+            # support for slicing of individual splittings
+            # key can be '<name>' (no slicing) or '<name>[<splitting_value_1>,<splitting_value_2>,...]'
+            _key_spec_groups = re.match(self.RE_SPLITTING_KEY_SPEC, _key_spec).groups()
+            if _key_spec_groups[2] is None:
+                _key = _key_spec
+                # no slicing -> direct lookup
+                if _key not in SPLITTINGS:
+                    raise KeyError("[ERROR] Cannot find splitting for key '{}'".format(_key))
+                _splitting_specs[_key] = SPLITTINGS[_key]
+            else:
+                # slicing -> lookup and slice
+                _key = _key_spec_groups[0]
+                if _key not in SPLITTINGS:
+                    raise KeyError("[ERROR] Cannot find splitting for key '{}'".format(_key))
+
+                _subkeys = [_subkey.strip() for _subkey in _key_spec_groups[2].split(',')]
+                try:
+                    _splitting_specs[_key] = {_subkey: SPLITTINGS[_key][_subkey] for _subkey in _subkeys}
+                except KeyError as e:
+                    raise KeyError("[ERROR] Cannot find splitting for subkey '{}[{}]'".format(_key, e))
+
+            _splittings_keys.append(_key)  # store key w/o slicing syntax
+
+        return _splitting_specs, _splittings_keys
+
+    def _get_combined_splittings(self, splitting_specs, splittings_keys):
+        '''create combined splitting specification out of the cross product of specified keys'''
+        SPLITTINGS = self._config.SPLITTINGS
+
+        _combined_splittings = {}
+        for _splitting_combination in product_dict(**splitting_specs):
+            _splitting_dict = {}
+            for _key in splittings_keys:
+                _splitting_dict.update(SPLITTINGS[_key][_splitting_combination[_key]])
+            _splitting_name = "/".join([_key + ':' + _splitting_combination[_key] for _key in splittings_keys])
+
+            _combined_splittings[_splitting_name] = _splitting_dict
+
+        return _combined_splittings
+
+    def _book_task(self, task_name, task_spec, event_loop=None):
+        '''set up a PostProcessor for a task on the current data frame (or `event_loop`, for the NumPy backend) and register the requested objects'''
+
+        from Karma.PostProcessing.Lumberjack import NumpyPostProcessor, PostProcessor
+
+        _splitting_specs, _splittings_keys = self._get_splitting_specs(task_spec)
+        _combined_splittings = self._get_combined_splittings(_splitting_specs, _splittings_keys)
+
+        _hs = task_spec.get('histograms', None)
+        _ps = task_spec.get('profiles', None)
 
+        if _hs is None and _ps is None:
+            print("[ERROR] No `histograms` or `profiles` configured for task '{}': skipping...".format(task_name))
+            return None
+
+
+        if _hs:
+            print("[INFO] Requested histograms:")
+            for _h in _hs:
+                print("    - {}".format(_h))
+        else:
+            print("[INFO] Requested histograms: <none>")
+
+        if _ps:
+            print("[INFO] Requested profiles:")
+            for _p in _ps:
+                print("    - {}".format(_p))
+        else:
+            print("[INFO] Requested profiles: <none>")
+
+        print("[INFO] Setting up PostProcessor...")
+        if event_loop is not None:
+            _pp = NumpyPostProcessor(
+                event_loop=event_loop,
+                splitting_spec=_combined_splittings,
+                quantities=task_spec['_quantities'],
+                splittings=_splitting_specs,
+            )
+        else:
+            _pp = PostProcessor(
+                data_frame=self._df_node_cache.root,
+                splitting_spec=_combined_splittings,
+                quantities=task_spec['_quantities'],
+                splittings=_splitting_specs,
+                use_split_index=self._args.split_index,
+                node_cache=self._df_node_cache,
+                base_operations=self._df_base_operations,
+                bitmasks=self._get_bitmasks(),
+                batch_fills=self._args.batch_fills,
+            )
+
+        if _hs is not None:
+            _pp.add_histograms(_hs)
+        if _ps is not None:
+            _pp.add_profiles(_ps)
+        _n_obj = _pp.n_objects_per_split
+
+        _n_subdiv = np.prod([len(_splitting) for _splitting in _splitting_specs.values()])
+
+        print("[INFO] Running Task '{}':".format(task_name))
+        print("    - splitting RDataFrame by keys: {}".format(
+            ", ".join(["{} ({} subdivisions)".format(_key, len(_splitting)) for _key, _splitting in _splitting_specs.iteritems()])
+        ))
+        print("        -> total number of subdivisions: {}\n".format(_n_subdiv))
+        print("    - requested number of objects per subdivision: {}\n".format(_n_obj))
+        print("    -> total number of objects: {}\n".format(_n_obj * _n_subdiv))
+        print("    - output file: {}".format(task_spec['_filename']))
+
+        return _pp
+
+    def _compile_operations(self, postprocessors):
+        '''compile the defines, selections and split filters of all PostProcessors in a single translation unit'''
+
+        from Karma.PostProcessing.Lumberjack import ExpressionCompiler, Timer
+
+        _compiler = ExpressionCompiler(self._df_node_cache.root)
+        _compiler.add_operations(self._df_base_operations)
+        for _pp in postprocessors:
+            if not _pp.needs_split_nodes:
+                continue
+            for _operations in _pp.get_split_operations().values():
+                _compiler.add_operations(_operations)
+
+        print("[INFO] Compiling {} data frame operations in a single translation unit...".format(_compiler.n_operations))
+        with Timer("JIT compilation") as _t, self._profile.phase('jit'):
+            _nodes = _compiler.compile(code_cache=self._code_cache, dependencies=self._code_cache_dependencies)
+        _t.report()
+
+        if _nodes is None:
+            print("[WARNING] Batch compilation failed: falling back to jitting each expression separately.")
+            return
+
+        for _operations, _node in _nodes.items():
+            self._df_node_cache.add_node(_operations, _node)
+
+    def _skip_existing_outputs(self, task_configs):
+        '''remove tasks whose output file exists from the queue, unless `--overwrite` is set'''
+        _remaining_task_configs = []
+        for _task_name, _task_spec in task_configs:
             # skip task if output file exists
-            if os.path.exists(_task_spec['_filename']) and not self._args.overwrite:
+            if os.path.exists(_task_spec['_filename']) and not self._args.overwrite and not self._args.incremental:
                 print("[INFO] Task output file exists: '{}' and `--overwrite` not set. Skipping...".format(_task_spec['_filename']))
                 continue
+            # skip subtask if merged output file exists
+            _parent_filename = _task_spec.get('_parent_filename', None)
+            if self._args.merge_subtasks and _parent_filename is not None and os.path.exists(_parent_filename) and not self._args.overwrite:
+                print("[INFO] Merged task output file exists: '{}' and `--overwrite` not set. Skipping...".format(_parent_filename))
+                continue
+            _remaining_task_configs.append((_task_name, _task_spec))
+        return _remaining_task_configs
 
-            with log_stdout_to_file(_task_spec['_log_filename']):
-                print("[INFO] Running task '{}'...".format(_task_name))
+    def _get_output_writer(self):
+        '''writer for the task outputs, configured from the command-line options'''
+        from Karma.PostProcessing.Lumberjack import get_compression_settings, OutputWriter
 
-                # apply defines, basic selection, etc.
-                self._prepare_data_frame()
-
-                _splittings_key_specs = _task_spec.get('splittings')
-
-                _splitting_specs = {}
-                _splittings_keys = []
-                for _key_spec in _splittings_key_specs:
-                    # support for slicing of individual splittings
-                    # key can be '<name>' (no slicing) or '<name>[<splitting_value_1>,<splitting_value_2>,...]'
-                    _key_spec_groups = re.match(self.RE_SPLITTING_KEY_SPEC, _key_spec).groups()
-                    if _key_spec_groups[2] is None:
-                        _key = _key_spec
-                        # no slicing -> direct lookup
-                        if _key not in SPLITTINGS:
-                            raise KeyError("[ERROR] Cannot find splitting for key '{}'".format(_key))
-                        _splitting_specs[_key] = SPLITTINGS[_key]
-                    else:
-                        # slicing -> lookup and slice
-                        _key = _key_spec_groups[0]
-                        if _key not in SPLITTINGS:
-                            raise KeyError("[ERROR] Cannot find splitting for key '{}'".format(_key))
-
-                        _subkeys = [_subkey.strip() for _subkey in _key_spec_groups[2].split(',')]
-                        try:
-                            _splitting_specs[_key] = {_subkey: SPLITTINGS[_key][_subkey] for _subkey in _subkeys}
-                        except KeyError as e:
-                            raise KeyError("[ERROR] Cannot find splitting for subkey '{}[{}]'".format(_key, e))
-
-                    _splittings_keys.append(_key)  # store key w/o slicing syntax
-
-                # create combined splitting specification out of the cross product
-                # of specified keys
-                _combined_splittings = {}
-                for _splitting_combination in product_dict(**_splitting_specs):
-                    _splitting_dict = {}
-                    for _key in _splittings_keys:
-                        _splitting_dict.update(SPLITTINGS[_key][_splitting_combination[_key]])
-                    _splitting_name = "/".join([_key + ':' + _splitting_combination[_key] for _key in _splittings_keys])
-
-                    _combined_splittings[_splitting_name] = _splitting_dict
-
-                _hs = _task_spec.get('histograms', None)
-                _ps = _task_spec.get('profiles', None)
-
-                if _hs is None and _ps is None:
-                    print("[ERROR] No `histograms` or `profiles` configured for task '{}': skipping...".format(_task_name))
+        _compression = None
+        if self._args.compression is not None:
+            try:
+                _compression = get_compression_settings(self._args.compression)
+            except ValueError as _e:
+                print("[ERROR] {}".format(_e))
+                exit(1)
+
+        return OutputWriter(compression=_compression, skip_empty=self._args.skip_empty, manifest=self._args.manifest)
+
+    def _get_task_description(self, task_spec):
+        '''everything the output of a task depends on, apart from the input files (used for caching results and incremental outputs)'''
+        DEFINES = self._config.DEFINES
+        SELECTIONS = self._config.SELECTIONS
+
+        _splitting_specs, _splittings_keys = self._get_splitting_specs(task_spec)
+
+        _description = dict(
+            tree=self._args.tree,
+            input_type=self._args.input_type,
+            root_macros=self._config.ROOT_MACROS,
+            defines=[DEFINES['global'], DEFINES.get(self._args.input_type, {})],
+            bitmasks=[(_bitmask.column, sorted(_bitmask.bits.items())) for _bitmask in self._get_bitmasks()],
+            selections=[SELECTIONS[_sel] for _sel in self._args.selections or []],
+            quantities=task_spec['_quantities'],
+            splittings=self._get_combined_splittings(_splitting_specs, _splittings_keys),
+            histograms=task_spec.get('histograms', None),
+            profiles=task_spec.get('profiles', None),
+        )
+
+        # the output file layout and compression
+        if self._args.compression is not None or self._args.skip_empty:
+            _description.update(
+                compression=self._args.compression,
+                skip_empty=self._args.skip_empty,
+            )
+
+        # the way the objects are filled (results of different engines may differ in the last digits, e.g. due to the summation order)
+        _description.update(backend=self._args.backend)
+        if self._args.backend != 'numpy' and (self._args.batch_fills or self._args.split_index):
+            _description.update(batch_fills=True)
+        if int(self._args.processes) > 1:
+            # partial outputs of the processes are merged
+            _description.update(processes=int(self._args.processes))
+
+        # the event limit and sampling apply to each process separately
+        if int(self._args.num_events) > 0 or self._args.entry_sampling is not None:
+            _description.update(
+                num_events=int(self._args.num_events),
+                entry_sampling=self._args.entry_sampling and float(self._args.entry_sampling),
+                processes=int(self._args.processes),
+            )
+
+        return _description
+
+    def _fetch_cached_results(self, task_configs):
+        '''copy the outputs of tasks found in the result cache to their output files and return the remaining tasks'''
+        from Karma.PostProcessing.Lumberjack import ResultCache, write_manifest
+
+        # exit if an input file does not exist (its identity is part of the key)
+        for _input_file in self._input_files:
+            if not os.path.exists(_input_file):
+                print("[ERROR] Input file does not exist: '{}'".format(_input_file))
+                exit(1)
+
+        self._result_cache = ResultCache(self._args.cache_dir)
+        print("[INFO] Looking up task outputs in result cache: {}".format(self._result_cache.results_dir))
+
+        _remaining_task_configs = []
+        for _task_name, _task_spec in task_configs:
+            _task_spec['_result_cache_key'] = self._result_cache.get_key(self._input_files, self._get_task_description(_task_spec))
+            if self._result_cache.fetch(_task_spec['_result_cache_key'], _task_spec['_filename'], _task_spec['_log_filename']):
+                print("[INFO] Output of task '{}' found in result cache. Copied to file: {}".format(_task_name, _task_spec['_filename']))
+                if self._args.manifest:
+                    write_manifest(_task_spec['_filename'])
+                continue
+            _remaining_task_configs.append((_task_name, _task_spec))
+
+        print("[INFO] Result cache: {} out of {} task(s) found, {} left to run.".format(
+            len(task_configs) - len(_remaining_task_configs), len(task_configs), len(_remaining_task_configs)))
+
+        return _remaining_task_configs
+
+    def _store_results(self, task_configs):
+        '''copy the outputs of tasks that have been run into the result cache'''
+        for _task_name, _task_spec in task_configs:
+            if os.path.exists(_task_spec['_filename']):
+                self._result_cache.store(_task_spec['_result_cache_key'], _task_spec['_filename'], _task_spec['_log_filename'])
+
+    def _run_tasks(self, task_configs):
+
+        task_configs = self._expand_subtasks(task_configs)
+        if self._args.memory_budget is not None:
+            task_configs = self._partition_tasks_by_memory(task_configs)
+        task_configs = self._skip_existing_outputs(task_configs)
+
+        if int(self._args.processes) > 1 and int(self._args.parallel_subtasks) > 1:
+            print("[ERROR] Options `--processes` and `--parallel-subtasks` cannot be used together!")
+            exit(1)
+        if self._args.incremental:
+            for _option, _is_set in (('--merge-subtasks', self._args.merge_subtasks), ('--result-cache', self._args.result_cache),
+                                     ('-n', int(self._args.num_events) > 0), ('--entry-sampling', self._args.entry_sampling is not None)):
+                if _is_set:
+                    print("[ERROR] Options `--incremental` and `{}` cannot be used together!".format(_option))
+                    exit(1)
+
+        # only run tasks whose outputs are not in the result cache
+        _tasks_to_run = task_configs
+        if self._args.result_cache:
+            _tasks_to_run = self._fetch_cached_results(task_configs)
+
+        # snapshots of the selected entries contain the columns needed by all tasks
+        self._snapshot_required_columns = self._get_required_columns([_task_spec for _, _task_spec in _tasks_to_run])
+        self._snapshot_data_frames = {}
+
+        if self._args.dry_run:
+            self._report_booking_plans(_tasks_to_run)
+
+        if not _tasks_to_run:
+            print("[INFO] No tasks left to run.")
+        elif self._args.incremental:
+            self._run_tasks_incrementally(_tasks_to_run)
+        else:
+            self._run_tasks_on_input_files(_tasks_to_run)
+
+        if self._args.result_cache and not self._args.dry_run:
+            self._store_results(_tasks_to_run)
+
+        if self._args.merge_subtasks and not self._args.dry_run:
+            self._merge_subtask_outputs(task_configs)
+
+    def _run_tasks_on_input_files(self, task_configs):
+        '''run the tasks on the current input files, in the current process or in several processes'''
+        if int(self._args.processes) > 1:
+            self._run_tasks_in_processes(task_configs)
+        elif int(self._args.parallel_subtasks) > 1:
+            self._run_subtasks_in_parallel(task_configs)
+        else:
+            self._run_tasks_in_current_process(task_configs)
+
+    def _get_new_input_files(self, task_configs):
+        '''processed files manifest of the output of each task and the input files not yet processed for it'''
+        from Karma.PostProcessing.Lumberjack import get_task_key, ProcessedFilesManifest
+
+        # exit if an input file does not exist (its checksum is needed)
+        for _input_file in self._input_files:
+            if not os.path.exists(_input_file):
+                print("[ERROR] Input file does not exist: '{}'".format(_input_file))
+                exit(1)
+
+        _manifests, _new_entries = {}, {}
+        for _task_name, _task_spec in task_configs:
+            _task_key = get_task_key(self._get_task_description(_task_spec))
+            if os.path.exists(_task_spec['_filename']) and not self._args.overwrite:
+                _manifest = ProcessedFilesManifest.read(_task_spec['_filename'])
+                if _manifest is None:
+                    print("[ERROR] Output file '{}' has no record of processed input files (it was not produced with `--incremental`). "
+                          "Use `--overwrite` to process all input files again.".format(_task_spec['_filename']))
+                    exit(1)
+                if _manifest.task_key != _task_key:
+                    print("[ERROR] Configuration of task '{}' has changed since output file '{}' was produced: refusing to add new input files. "
+                          "Use `--overwrite` to process all input files again.".format(_task_name, _task_spec['_filename']))
+                    exit(1)
+            else:
+                _manifest = ProcessedFilesManifest(_task_key)
+
+            try:
+                _new_entries[_task_name] = _manifest.get_new_files(self._input_files)
+            except ValueError as _e:
+                print("[ERROR] {}: cannot update output file '{}'. Use `--overwrite` to process all input files again.".format(_e, _task_spec['_filename']))
+                exit(1)
+            _manifests[_task_name] = _manifest
+
+            print("[INFO] Task '{}': {} new input file(s), {} already processed.".format(
+                _task_name, len(_new_entries[_task_name]), len(_manifest.entries)))
+
+        return _manifests, _new_entries
+
+    def _run_tasks_incrementally(self, task_configs):
+        '''run the tasks only on the input files not yet processed for their outputs and add the results to the existing output files'''
+
+        from Karma.PostProcessing.Lumberjack import add_to_output_file, get_manifest_path, write_manifest, Timer
+
+        def _get_increment_path(path):
+            if path is None:
+                return None
+            _head, _tail = os.path.split(path)
+            return os.path.join(_head, ".increment_{}".format(_tail))
+
+        def _add_to_log_file(log_filename, increment_log_filename, new_files):
+            if increment_log_filename is None or not os.path.exists(increment_log_filename):
+                return
+            # the log of the increment is appended to the logs of the previous runs (or replaces them along with the output)
+            with open(log_filename, 'w' if self._args.overwrite else 'a') as _log:
+                _log.write("[INFO] Log of run on {} new input file(s) (input files: {})\n".format(len(new_files), ", ".join(new_files)))
+                with open(increment_log_filename, 'r') as _increment_log:
+                    shutil.copyfileobj(_increment_log, _log)
+            os.remove(increment_log_filename)
+
+        _manifests, _new_entries = self._get_new_input_files(task_configs)
+
+        # tasks with the same new input files are run together
+        _task_configs_by_new_files = {}
+        for _task_name, _task_spec in task_configs:
+            _new_paths = set([_entry['path'] for _entry in _new_entries[_task_name]])
+            if not _new_paths:
+                print("[INFO] No new input files for task '{}'. Skipping...".format(_task_name))
+                continue
+            _new_files = tuple([_input_file for _input_file in self._input_files if os.path.abspath(_input_file) in _new_paths])
+            _task_configs_by_new_files.setdefault(_new_files, []).append((_task_name, _task_spec))
+
+        _all_input_files = self._input_files
+        try:
+            for _new_files, _group_task_configs in sorted(_task_configs_by_new_files.items()):
+                self._input_files = list(_new_files)
+
+                # the outputs for the new input files are written to separate files first
+                _increment_task_configs = [
+                    (_task_name, dict(_task_spec,
+                        _filename=_get_increment_path(_task_spec['_filename']),
+                        _log_filename=_get_increment_path(_task_spec['_log_filename']),
+                    ))
+                    for _task_name, _task_spec in _group_task_configs
+                ]
+                self._run_tasks_on_input_files(_increment_task_configs)
+
+                for (_, _task_spec), (_, _increment_task_spec) in zip(_group_task_configs, _increment_task_configs):
+                    _add_to_log_file(_task_spec['_log_filename'], _increment_task_spec['_log_filename'], _new_files)
+
+                if self._args.dry_run:
                     continue
 
+                with Timer("adding outputs for {} new input file(s)".format(len(_new_files))) as _t, self._profile.phase('merge'):
+                    for (_task_name, _task_spec), (_, _increment_task_spec) in zip(_group_task_configs, _increment_task_configs):
+                        _increment_filename = _increment_task_spec['_filename']
+                        if not os.path.exists(_increment_filename):
+                            continue
+
+                        _manifests[_task_name].add(_new_entries[_task_name])
+                        add_to_output_file(_task_spec['_filename'], _increment_filename, _manifests[_task_name], overwrite=self._args.overwrite)
+                        print("[INFO] Added outputs for {} new input file(s) to file: {}".format(len(_new_files), _task_spec['_filename']))
+
+                        os.remove(_increment_filename)
+                        if os.path.exists(get_manifest_path(_increment_filename)):
+                            os.remove(get_manifest_path(_increment_filename))
+                        if self._args.manifest:
+                            write_manifest(_task_spec['_filename'])
+                _t.report()
+        finally:
+            self._input_files = _all_input_files
 
-                if _hs:
-                    print("[INFO] Requested histograms:")
-                    for _h in _hs:
-                        print("    - {}".format(_h))
-                else:
-                    print("[INFO] Requested histograms: <none>")
+    def _run_tasks_in_current_process(self, task_configs):
+        '''run the tasks on the input files of the current process with the selected backend'''
+        if self._args.backend == 'numpy':
+            self._run_tasks_numpy(task_configs)
+            return
 
-                if _ps:
-                    print("[INFO] Requested profiles:")
-                    for _p in _ps:
-                        print("    - {}".format(_p))
-                else:
-                    print("[INFO] Requested profiles: <none>")
+        self._prepare_bare_data_frame()
+        if self._args.shared_event_loop:
+            self._run_tasks_shared_event_loop(task_configs)
+        else:
+            self._run_tasks_sequentially(task_configs)
+
+    def _run_tasks_in_processes(self, task_configs):
+        '''run the tasks in a pool of processes, each processing a subset of the input files, and merge the outputs'''
+
+        from Karma.PostProcessing.Lumberjack import merge_root_files, partition_files, run_in_process_pool, write_manifest, ProfileReport, Timer
+
+        if not task_configs:
+            print("[INFO] No tasks left to run.")
+            return
+
+        # exit if an input file does not exist (before starting any process)
+        for _input_file in self._input_files:
+            if not os.path.exists(_input_file):
+                print("[ERROR] Input file does not exist: '{}'".format(_input_file))
+                exit(1)
+
+        _file_groups = partition_files(self._input_files, int(self._args.processes))
+        print("[INFO] Distributing {} input file(s) among {} processes with {} thread(s) each...".format(
+            len(self._input_files), len(_file_groups), self._args.jobs))
+        if int(self._args.num_events) > 0 or self._args.entry_sampling is not None:
+            print("[WARNING] The limit on the number of processed events (`-n`) and `--entry-sampling` apply to each process separately!")
+
+        # intermediate outputs are written next to the final outputs
+        _work_dir = tempfile.mkdtemp(prefix='.lumberjack_', dir='.')
+
+        def _get_worker_path(i_worker, path):
+            if path is None:
+                return None
+            return os.path.join(_work_dir, str(i_worker), os.path.basename(path))
+
+        def _run_worker(i_worker):
+            os.mkdir(os.path.join(_work_dir, str(i_worker)))
+            self._input_files = _file_groups[i_worker]
+            self._profile = ProfileReport()
+            _worker_task_configs = [
+                (_task_name, dict(_task_spec,
+                    _filename=_get_worker_path(i_worker, _task_spec['_filename']),
+                    _log_filename=_get_worker_path(i_worker, _task_spec['_log_filename']),
+                ))
+                for _task_name, _task_spec in task_configs
+            ]
+            try:
+                self._run_tasks_in_current_process(_worker_task_configs)
+            except SystemExit as _e:
+                # propagate to the main process instead of terminating the worker
+                raise RuntimeError("Process {} exited with status {}".format(i_worker, _e.code))
+            self._profile.write(os.path.join(_work_dir, str(i_worker), 'profile.json'))
 
-                print("[INFO] Setting up PostProcessor...")
-                _pp = PostProcessor(
-                    data_frame=self._df,
-                    splitting_spec=_combined_splittings,
-                    quantities=_task_spec['_quantities'],
+        try:
+            with Timer("{} processes".format(len(_file_groups))) as _t, self._profile.phase('processes'):
+                run_in_process_pool(_run_worker, [(_i,) for _i in range(len(_file_groups))], len(_file_groups))
+            _t.report()
+
+            # -- collect the profiling reports of the individual processes
+            for _i_worker in range(len(_file_groups)):
+                _worker_profile_filename = os.path.join(_work_dir, str(_i_worker), 'profile.json')
+                if os.path.exists(_worker_profile_filename):
+                    with open(_worker_profile_filename, 'r') as _f:
+                        self._profile.add_worker("process {}".format(_i_worker), json.load(_f))
+
+            # -- concatenate the logs of the individual processes
+            for _task_name, _task_spec in task_configs:
+                if _task_spec['_log_filename'] is None:
+                    continue
+                with open(_task_spec['_log_filename'], 'w') as _log:
+                    for _i_worker, _files in enumerate(_file_groups):
+                        _worker_log_filename = _get_worker_path(_i_worker, _task_spec['_log_filename'])
+                        _log.write("[INFO] Log of process {} (input files: {})\n".format(_i_worker, ", ".join(_files)))
+                        if os.path.exists(_worker_log_filename):
+                            with open(_worker_log_filename, 'r') as _worker_log:
+                                shutil.copyfileobj(_worker_log, _log)
+
+            if self._args.dry_run:
+                print("[INFO] `--dry-run` has been specified: not merging outputs")
+                return
+
+            # -- merge the outputs of the individual processes
+            with Timer("merging outputs") as _t, self._profile.phase('merge'):
+                merge_root_files(
+                    {
+                        _task_spec['_filename']: [
+                            _get_worker_path(_i_worker, _task_spec['_filename'])
+                            for _i_worker in range(len(_file_groups))
+                            if os.path.exists(_get_worker_path(_i_worker, _task_spec['_filename']))
+                        ]
+                        for _task_name, _task_spec in task_configs
+                    },
+                    work_dir=_work_dir,
+                    n_processes=int(self._args.processes),
                 )
+            _t.report()
 
-                _n_obj = 0
-                if _hs is not None:
-                    _pp.add_histograms(_hs)
-                    _n_obj += len(_hs)
-                if _ps is not None:
-                    _pp.add_profiles(_ps)
-                    _n_obj += len(_ps)
+            if self._args.manifest:
+                for _task_name, _task_spec in task_configs:
+                    if os.path.exists(_task_spec['_filename']):
+                        write_manifest(_task_spec['_filename'])
+        finally:
+            shutil.rmtree(_work_dir, ignore_errors=True)
 
-                _n_subdiv = np.prod([len(_splitting) for _splitting in _splitting_specs.values()])
+    def _run_subtasks_in_parallel(self, task_configs):
+        '''run each (sub)task in a separate process, with several processes running at the same time'''
 
-                print("[INFO] Running Task '{}':".format(_task_name))
-                print("    - splitting RDataFrame by keys: {}".format(
-                    ", ".join(["{} ({} subdivisions)".format(_key, len(_splitting)) for _key, _splitting in _splitting_specs.iteritems()])
-                ))
-                print("        -> total number of subdivisions: {}\n".format(_n_subdiv))
-                print("    - requested number of objects per subdivision: {}\n".format(_n_obj))
-                print("    -> total number of objects: {}\n".format(_n_obj * _n_subdiv))
-                print("    - output file: {}".format(_task_spec['_filename']))
+        from Karma.PostProcessing.Lumberjack import run_in_process_pool, ProfileReport, Timer
+
+        _n_processes = int(self._args.parallel_subtasks)
+        _n_threads = max(1, int(self._args.jobs) // _n_processes)
+
+        if not task_configs:
+            print("[INFO] No tasks left to run.")
+            return
+
+        print("[INFO] Running {} (sub)tasks in {} parallel processes with {} thread(s) each...".format(
+            len(task_configs), _n_processes, _n_threads))
+
+        # the output of each process is captured in a file
+        _work_dir = tempfile.mkdtemp(prefix='.lumberjack_', dir='.')
+
+        def _run_task(task_name, task_spec):
+            _output_filename = os.path.join(_work_dir, "{}.out".format(task_name))
+            with open(_output_filename, 'w') as _output:
+                sys.stdout = _output
+                try:
+                    self._args.jobs = _n_threads
+                    self._profile = ProfileReport()
+                    with Timer(task_name) as _t:
+                        self._run_tasks_in_current_process([(task_name, task_spec)])
+                    self._profile.write(os.path.join(_work_dir, "{}.profile.json".format(task_name)))
+                except (Exception, SystemExit) as _e:
+                    # propagate to the main process instead of terminating the worker
+                    raise RuntimeError("Task '{}' failed ({}). See output in '{}'.".format(task_name, repr(_e), _output_filename))
+                finally:
+                    sys.stdout = sys.__stdout__
+            return task_name, _t.get_duration_string()
+
+        _n_finished = [0]
+        def _report_finished(result):
+            _n_finished[0] += 1
+            print("[INFO] Finished task '{}' ({}/{}) after {}".format(result[0], _n_finished[0], len(task_configs), result[1]))
+
+        with Timer("{} (sub)tasks in {} processes".format(len(task_configs), _n_processes)) as _t, self._profile.phase('processes'):
+            run_in_process_pool(_run_task, task_configs, _n_processes, max_tasks_per_child=1, callback=_report_finished)
+        _t.report()
+
+        # -- collect the profiling reports of the individual (sub)tasks
+        for _task_name, _task_spec in task_configs:
+            _task_profile_filename = os.path.join(_work_dir, "{}.profile.json".format(_task_name))
+            if os.path.exists(_task_profile_filename):
+                with open(_task_profile_filename, 'r') as _f:
+                    self._profile.add_worker(_task_name, json.load(_f))
+
+        # captured output is only kept in case of errors
+        shutil.rmtree(_work_dir, ignore_errors=True)
+
+    def _merge_subtask_outputs(self, task_configs):
+        '''merge the output (and log) files of subtasks into the files of the original, unsliced tasks'''
+
+        from Karma.PostProcessing.Lumberjack import get_manifest_path, merge_root_files, write_manifest, Timer
+
+        _subtask_specs_by_parent = {}
+        for _task_name, _task_spec in task_configs:
+            if '_parent_filename' in _task_spec and os.path.exists(_task_spec['_filename']):
+                _subtask_specs_by_parent.setdefault(_task_spec['_parent_task'], []).append(_task_spec)
+
+        if not _subtask_specs_by_parent:
+            return
+
+        _work_dir = tempfile.mkdtemp(prefix='.lumberjack_', dir='.')
+        try:
+            with Timer("merging subtask outputs") as _t, self._profile.phase('merge'):
+                merge_root_files(
+                    {
+                        _subtask_specs[0]['_parent_filename']: [_subtask_spec['_filename'] for _subtask_spec in _subtask_specs]
+                        for _subtask_specs in _subtask_specs_by_parent.values()
+                    },
+                    work_dir=_work_dir,
+                    n_processes=max(int(self._args.parallel_subtasks), int(self._args.processes)),
+                )
+            _t.report()
+        finally:
+            shutil.rmtree(_work_dir, ignore_errors=True)
+
+        for _parent_task, _subtask_specs in _subtask_specs_by_parent.items():
+            print("[INFO] Merged outputs of {} subtasks into file: {}".format(len(_subtask_specs), _subtask_specs[0]['_parent_filename']))
+
+            # concatenate the logs of the subtasks
+            _parent_log_filename = _subtask_specs[0]['_parent_log_filename']
+            if _parent_log_filename is not None:
+                with open(_parent_log_filename, 'w') as _log:
+                    for _subtask_spec in _subtask_specs:
+                        if _subtask_spec['_log_filename'] is not None and os.path.exists(_subtask_spec['_log_filename']):
+                            with open(_subtask_spec['_log_filename'], 'r') as _subtask_log:
+                                shutil.copyfileobj(_subtask_log, _log)
+                            os.remove(_subtask_spec['_log_filename'])
+
+            for _subtask_spec in _subtask_specs:
+                os.remove(_subtask_spec['_filename'])
+                if os.path.exists(get_manifest_path(_subtask_spec['_filename'])):
+                    os.remove(get_manifest_path(_subtask_spec['_filename']))
+
+            if self._args.manifest:
+                write_manifest(_subtask_specs[0]['_parent_filename'])
+
+    def _run_tasks_sequentially(self, task_configs):
+        '''run each task in a separate event loop'''
+
+        from Karma.PostProcessing.Lumberjack import Timer
+
+        # -- run all queued tasks
+        for _task_name, _task_spec in task_configs:
+
+            with log_stdout_to_file(_task_spec['_log_filename']):
+                print("[INFO] Running task '{}'...".format(_task_name))
+
+                # apply defines, basic selection, etc.
+                self._prepare_data_frame(required_columns=self._get_required_columns([_task_spec]))
+
+                with self._profile.phase('booking', name=_task_name):
+                    _pp = self._book_task(_task_name, _task_spec)
+                if _pp is None:
+                    continue
+
+                if self._args.batch_jit:
+                    self._compile_operations([_pp])
 
                 # run PostProcessor and time execution
                 with Timer(_task_name) as _t:
@@ -368,7 +1305,12 @@ class LumberjackInterfaceBase(object):
                         print("[INFO] `--dry-run` has been specified: not running task '{}'".format(_task_name))
                         time.sleep(0.1)
                     else:
-                        _pp.run(output_file_path=_task_spec['_filename'])
+                        with self._profile.phase('booking', name=_task_name):
+                            _booked = _pp.book()
+                        if _booked:
+                            self._run_event_loop(_task_name)
+                        with self._profile.phase('write', name=_task_name):
+                            _pp.write(output_file_path=_task_spec['_filename'], writer=self._output_writer)
 
                 # print report
                 if not self._args.dry_run:
@@ -378,6 +1320,179 @@ class LumberjackInterfaceBase(object):
                 print("[INFO] Cleaning up after task '{}'...".format(_task_name))
                 self._cleanup_data_frame()
 
+    def _run_tasks_shared_event_loop(self, task_configs):
+        '''book all tasks on a single data frame and fill all objects in one event loop'''
+
+        from Karma.PostProcessing.Lumberjack import Timer
+
+        if not task_configs:
+            print("[INFO] No tasks left to run.")
+            return
+
+        # apply defines, basic selection, etc. (once for all tasks)
+        self._prepare_data_frame(required_columns=self._get_required_columns([_task_spec for _, _task_spec in task_configs]))
+
+        # -- set up all queued tasks on the shared data frame
+        _set_up_tasks = []
+        for _task_name, _task_spec in task_configs:
+            with log_stdout_to_file(_task_spec['_log_filename']):
+                print("[INFO] Booking task '{}' on shared data frame...".format(_task_name))
+
+                with self._profile.phase('booking', name=_task_name):
+                    _pp = self._book_task(_task_name, _task_spec)
+                if _pp is None:
+                    continue
+
+            _set_up_tasks.append((_task_name, _task_spec, _pp))
+
+        if self._args.batch_jit:
+            self._compile_operations([_pp for _, _, _pp in _set_up_tasks])
+
+        # -- book the objects of all tasks
+        _booked_tasks = []
+        for _task_name, _task_spec, _pp in _set_up_tasks:
+            with log_stdout_to_file(_task_spec['_log_filename'], mode='a'):
+                with self._profile.phase('booking', name=_task_name):
+                    _booked = _pp.book()
+                if not _booked:
+                    print("[WARNING] No histograms and/or profiles booked for task '{}'. No file will be written.".format(_task_name))
+                    continue
+
+            _booked_tasks.append((_task_name, _task_spec, _pp))
+
+        if not _booked_tasks:
+            print("[INFO] No objects booked for any task. Exiting...")
+            return
+
+        # -- run a single event loop for all tasks
+        _event_loop_name = "shared event loop ({} tasks)".format(len(_booked_tasks))
+        print("[INFO] Running {}...".format(_event_loop_name))
+        with Timer(_event_loop_name) as _t:
+            if self._args.dry_run:
+                print("[INFO] `--dry-run` has been specified: not running event loop")
+                time.sleep(0.1)
+            else:
+                self._run_event_loop(_event_loop_name)
+
+        if not self._args.dry_run:
+            print("[INFO] Processed a total of {} events.".format(self._df_count.GetValue()))
+        _t.report()
+
+        # -- write the output of each task to its own file
+        for _task_name, _task_spec, _pp in _booked_tasks:
+            with log_stdout_to_file(_task_spec['_log_filename'], mode='a'):
+                if self._args.dry_run:
+                    print("[INFO] `--dry-run` has been specified: not writing output for task '{}'".format(_task_name))
+                    continue
+
+                print("[INFO] Writing output of task '{}' to file: {}".format(_task_name, _task_spec['_filename']))
+                with Timer(_task_name) as _t, self._profile.phase('write', name=_task_name):
+                    _pp.write(output_file_path=_task_spec['_filename'], writer=self._output_writer)
+                _t.report()
+
+        print("[INFO] Cleaning up after shared event loop...")
+        self._cleanup_data_frame()
+
+
+    def _run_tasks_numpy(self, task_configs):
+        '''fill the objects of all tasks in a single pass over the input files, read in chunks of NumPy arrays'''
+
+        from Karma.PostProcessing.Lumberjack import ChunkedEventLoop, RootMacros, Timer, UnsupportedExpressionError
+
+        if not task_configs:
+            print("[INFO] No tasks left to run.")
+            return
+
+        for _option in ('batch_jit', 'batch_fills', 'compile_macros', 'split_index', 'entry_lists', 'snapshot_cache',
+                        'tree_cache_size', 'cluster_prefetch', 'async_prefetch'):
+            if getattr(self._args, _option):
+                print("[WARNING] Option `--{}` has no effect with `--backend numpy`.".format(_option.replace('_', '-')))
+
+        for _input_file in self._input_files:
+            if not os.path.exists(_input_file):
+                print("[ERROR] Input file does not exist: '{}'".format(_input_file))
+                exit(1)
+
+        print("[INFO] Sample type: {}".format(self._args.input_type))
+        with self._profile.phase('macros'):
+            _macros = RootMacros(self._config.ROOT_MACROS)
+        _event_loop = ChunkedEventLoop(
+            self._input_files,
+            self._args.tree,
+            self._get_define_groups(),
+            self._get_selection_exprs(),
+            chunk_size=int(self._args.chunk_size),
+            macros=_macros,
+            use_numexpr=self._args.numexpr,
+        )
+
+        # -- restrict the processed entries (chunks take the role of clusters for sampling)
+        if self._args.entry_sampling is not None or int(self._args.num_events) > 0:
+            _chunk_ranges = _event_loop.get_chunk_ranges()
+            _event_loop.entry_ranges = self._restrict_entry_ranges(_chunk_ranges)
+            print("[INFO] Selected {} out of {} entries".format(
+                sum([_end - _begin for _, _begin, _end in _event_loop.entry_ranges]),
+                sum([_end - _begin for _, _begin, _end in _chunk_ranges])))
+
+        # -- set up all queued tasks
+        _booked_tasks = []
+        for _task_name, _task_spec in task_configs:
+            with log_stdout_to_file(_task_spec['_log_filename']):
+                print("[INFO] Booking task '{}' for the NumPy backend...".format(_task_name))
+
+                with self._profile.phase('booking', name=_task_name):
+                    _pp = self._book_task(_task_name, _task_spec, event_loop=_event_loop)
+                    _booked = _pp is not None and _pp.book()
+                if _pp is None:
+                    continue
+
+                if not _booked:
+                    print("[WARNING] No histograms and/or profiles booked for task '{}'. No file will be written.".format(_task_name))
+                    continue
+
+            _booked_tasks.append((_task_name, _task_spec, _pp))
+
+        if not _booked_tasks:
+            print("[INFO] No objects booked for any task. Exiting...")
+            return
+
+        # -- translate all needed expressions before reading any data
+        try:
+            with self._profile.phase('jit'):
+                _event_loop.prepare()
+        except UnsupportedExpressionError as _e:
+            print("[ERROR] {}".format(_e))
+            print("[ERROR] Expressions which cannot be vectorized are only supported by `--backend rdataframe`.")
+            exit(1)
+
+        # -- fill the objects of all tasks in a single pass
+        _event_loop_name = "NumPy event loop ({} tasks)".format(len(_booked_tasks))
+        print("[INFO] Running {}...".format(_event_loop_name))
+        with Timer(_event_loop_name) as _t:
+            if self._args.dry_run:
+                print("[INFO] `--dry-run` has been specified: not running event loop")
+                time.sleep(0.1)
+            else:
+                with self._profile.phase('event_loop', name=_event_loop_name) as _phase:
+                    _n_processed, _n_selected = _event_loop.run(progress=self._args.progress)
+                self._profile.add_event_loop(_event_loop_name, _n_processed, _phase['seconds'])
+
+        if not self._args.dry_run:
+            print("[INFO] Processed a total of {} events ({} passing the global selections).".format(_n_processed, _n_selected))
+        _t.report()
+
+        # -- write the output of each task to its own file
+        for _task_name, _task_spec, _pp in _booked_tasks:
+            with log_stdout_to_file(_task_spec['_log_filename'], mode='a'):
+                if self._args.dry_run:
+                    print("[INFO] `--dry-run` has been specified: not writing output for task '{}'".format(_task_name))
+                    continue
+
+                print("[INFO] Writing output of task '{}' to file: {}".format(_task_name, _task_spec['_filename']))
+                with Timer(_task_name) as _t, self._profile.phase('write', name=_task_name):
+                    _pp.write(output_file_path=_task_spec['_filename'], writer=self._output_writer)
+                _t.report()
+
 
     # -- subcommand methods
 
@@ -390,7 +1505,7 @@ class LumberjackInterfaceBase(object):
         # -- configure and queue freestyle task
 
         # exit if output filename exists
-        if os.path.exists(self._args.output_file) and not self._args.overwrite:
+        if os.path.exists(self._args.output_file) and not self._args.overwrite and not self._args.incremental:
             print("[INFO] Output file exists: '{}' and `--overwrite` not set. Exiting...".format(self._args.output_file))
             exit(1)
 
@@ -405,7 +1520,6 @@ class LumberjackInterfaceBase(object):
         )
         _tasks = [("Freestyle", _task_spec)]
 
-        self._prepare_bare_data_frame()
         self._run_tasks(_tasks)
 
 
@@ -437,7 +1551,6 @@ class LumberjackInterfaceBase(object):
             print("[INFO] No tasks in queue. Exiting...")
             exit(1)
 
-        self._prepare_bare_data_frame()
         self._run_tasks(_tasks)
 
 
@@ -445,6 +1558,11 @@ class LumberjackInterfaceBase(object):
 
     def run(self):
 
+        from Karma.PostProcessing.Lumberjack import expand_input_files
+
+        self._input_files = expand_input_files(self._args.input_file)
+        self._output_writer = self._get_output_writer()
+
         if self._args.subparser_name == 'task':
             self._subcommand_task()
 
@@ -454,6 +1572,10 @@ class LumberjackInterfaceBase(object):
         else:
             raise ValueError("Unknown operation '{}'! Exiting...".format(_args.subparser_name))
 
+        if self._args.profile_report is not None:
+            self._profile.write(self._args.profile_report)
+            print("[INFO] Wrote profiling report: {}".format(self._args.profile_report))
+
 
 class LumberjackCLI(LumberjackInterfaceBase):
 
@@ -483,8 +1605,8 @@ class LumberjackCLI(LumberjackInterfaceBase):
 
             parser.exit()
 
-    def __init__(self):
-        super(LumberjackCLI, self).__init__()  # no kwargs
+    def __init__(self, start_time=None):
+        super(LumberjackCLI, self).__init__(start_time=start_time)  # no other kwargs
 
     def _get_args_config(self):
         '''parse CLI arguments and retrieve analysis config'''
@@ -522,18 +1644,80 @@ class LumberjackCLI(LumberjackInterfaceBase):
             help="Name of the analysis configuration to load (must have a configuration module under 'Lumberjack/cfg/ANALYSIS_NAME')",
             required=True,
             choices=_available_analysis_configs)
-        _required_args.add_argument('-i', '--input-file', metavar='FILE', type=str, help='Input file', required=True)
+        _required_args.add_argument('-i', '--input-file', metavar='FILE', type=str, help="Input file. Can be given several times. "
+                                    "Glob patterns are expanded and '@LIST' reads the input files from text file 'LIST' (one per line).", action='append', required=True)
         _required_args.add_argument('--selections', metavar='SELECTION', help='Specification of event selection cuts', nargs='+')
 
         _optional_args = _top_parser.add_argument_group('optional arguments', '')
         _optional_args.add_argument('-h', '--help', action=self.__class__._LumberjackCLIHelpAction, help="Display help and exit")
         _optional_args.add_argument('-t', '--tree', metavar='TREE', help="Name of the TTree containng the ntuple (default: 'Events')", default='Events')
-        _optional_args.add_argument('-j', '--jobs', help="Number of jobs (threads) to use with EnableImplicitMT (default: 1)", default=1)
-        _optional_args.add_argument('-n', '--num-events', help="Number of events to process. Incompatible with multithreading. Use 0 or negative for all (default)", default=-1)
-        _optional_args.add_argument('--dry-run', help="Set up post-processing tasks, but do not execute", action='store_true')
+        _optional_args.add_argument('-j', '--jobs', help="Number of jobs (threads) to use with EnableImplicitMT (default: 1). With `--processes`, this is the number of threads per process.", default=1)
+        _optional_args.add_argument('--parallel-subtasks', metavar='K', help="Run tasks and subtasks (created by slicing splittings with 'KEY@N') in K processes at the same time, "
+                                                                             "sharing the `--jobs` threads among them (default: 1)", default=1)
+        _optional_args.add_argument('--merge-subtasks', help="Merge the outputs (and logs) of the subtasks of each task into a single file with the layout "
+                                                             "of the unsliced task. The subtask files are removed afterwards.", action="store_true")
+        _optional_args.add_argument('--processes', metavar='N', help="Number of processes, each running all tasks on a subset of the input files. "
+                                                                     "The outputs are merged afterwards (default: 1)", default=1)
+        _optional_args.add_argument('-n', '--num-events', help="Number of events to process. Use 0 or a negative number for all (default)", default=-1)
+        _optional_args.add_argument('--entry-sampling', metavar='FRACTION', help="Only process a fraction of the events, given by a number between 0 and 1. "
+                                                                                  "Whole clusters of entries spread evenly over the input are selected, "
+                                                                                  "so that they can be read efficiently with multithreading.", default=None)
+        _optional_args.add_argument('--dry-run', help="Set up post-processing tasks, but do not execute. Reports the booking plan of each task "
+                                                      "(objects and estimated memory).", action='store_true')
         _optional_args.add_argument('--overwrite', help="Overwrite output file, if it exists.", action='store_true')
+        _optional_args.add_argument('--incremental', help="Only process input files which have not been processed for the existing output files yet, "
+                                                           "and add the new histograms and profiles to them. Each output file records the processed input files "
+                                                           "(with checksums). Refuses to update outputs produced with a different task configuration.", action='store_true')
+        _optional_args.add_argument('--compression', metavar='ALGORITHM:LEVEL', help="Compression of the output files, e.g. 'LZ4:4' (fast) or 'ZSTD:5' "
+                                                                                     "(algorithms: ZLIB, LZMA, LZ4, ZSTD; default: ROOT's default).", default=None)
+        _optional_args.add_argument('--skip-empty', help="Do not write histograms and profiles without entries to the output files.", action='store_true')
+        _optional_args.add_argument('--manifest', help="Write an index of the objects in each output file (path, class and size) "
+                                                       "to a JSON file next to it ('<output>.manifest.json').", action='store_true')
         _optional_args.add_argument('--log', help="Whether to output a log file.", action="store_true")
-        _optional_args.add_argument('--progress', help="Whether to show a progress bar.", action="store_true")
+        _optional_args.add_argument('--progress', help="Whether to show a progress bar (and report the event rate of each processing slot).", action="store_true")
+        _optional_args.add_argument('--profile-report', metavar='FILE', help="Write the timings of the phases of the run (configuration, ROOT import, macros, JIT, booking, "
+                                                                             "event loop, output), the processed events, event rates, bytes read, peak memory "
+                                                                             "and the events processed by each slot to a JSON file.", default=None)
+        _optional_args.add_argument('--split-index', help="Look up the value of each splitting key with a single binary search per event "
+                                                          "instead of evaluating the cuts for every value (where possible), and fill the objects of all splits "
+                                                          "from the looked-up indices (implies `--batch-fills`).", action="store_true")
+        _optional_args.add_argument('--batch-fills', help="Fill each histogram (1D, 2D) and profile (1D) specification for all splits with a single data frame action, "
+                                                          "using an additional axis for the splits, instead of booking one action per split.", action="store_true")
+        _optional_args.add_argument('--shared-event-loop', help="Book all queued tasks (and subtasks) on a single data frame and fill them in a single event loop. "
+                                                                "Each task is still written to its own output file.", action="store_true")
+        _optional_args.add_argument('--batch-jit', help="Compile all defines, selections and split filters in a single C++ translation unit "
+                                                        "instead of jitting each expression separately.", action="store_true")
+        _optional_args.add_argument('--compile-macros', help="Compile the ROOT macros (and the code generated with `--batch-jit`) into shared libraries "
+                                                             "which are cached and reused in later runs.", action="store_true")
+        _optional_args.add_argument('--memory-budget', metavar='MB', help="Maximum memory (in MB) for the objects filled by a task, estimated from their binnings "
+                                                                          "and the number of threads (see `--dry-run` for the estimates). Tasks exceeding it are split into "
+                                                                          "subtasks by slicing their splittings, as with 'KEY@N' (see `--merge-subtasks`).", default=None)
+        _optional_args.add_argument('--cache-dir', metavar='DIR', help="Directory for caching data between runs (default: '$XDG_CACHE_HOME/lumberjack' "
+                                                                        "or '~/.cache/lumberjack').", default=None)
+        _optional_args.add_argument('--entry-lists', help="Store the numbers of the entries passing the global selections in the cache directory (see `--cache-dir`), "
+                                                          "and only read these entries in later runs with the same selections.", action="store_true")
+        _optional_args.add_argument('--snapshot-cache', help="Write the entries passing the global selections (and only the columns needed by the queued tasks) "
+                                                             "to a slim ntuple in the cache directory (see `--cache-dir`) and process this instead of the input. "
+                                                             "Later runs with the same inputs, selections and columns reuse the snapshot.", action="store_true")
+        _optional_args.add_argument('--result-cache', help="Look up task outputs in a cache (see `--cache-dir`) before running the tasks, and store new outputs in it. "
+                                                           "Outputs are identified by the input files (path, size and modification time) and the task configuration.", action="store_true")
+        _optional_args.add_argument('--tree-cache-size', metavar='MB', help="Size of the TTreeCache for reading the input tree in MB (default: ROOT's default). "
+                                                                            "Only has an effect on single-threaded event loops (`-j 1`), since multithreaded ones "
+                                                                            "read the input files through TTree objects of their own.", default=None)
+        _optional_args.add_argument('--cluster-prefetch', help="Read all baskets of a cluster of the input tree at once. "
+                                                               "Only has an effect on single-threaded event loops (`-j 1`).", action="store_true")
+        _optional_args.add_argument('--async-prefetch', help="Let ROOT prefetch the baskets of the input files asynchronously. "
+                                                             "Input branches are not pruned explicitly, since the data frame only reads the columns used by the queued tasks.", action="store_true")
+        _optional_args.add_argument('--backend', help="Engine for filling the histograms and profiles. With 'numpy', the needed branches are read in chunks "
+                                                      "into NumPy arrays (requires `uproot`) and all expressions are evaluated as vectorized array operations, "
+                                                      "so nothing is compiled by the ROOT interpreter, and all tasks are filled in a single pass. "
+                                                      "Functions from the ROOT macros can only be used with 'numpy' if they consist of `if`/`else` "
+                                                      "and `return` statements (default: 'rdataframe').",
+                                    choices=['rdataframe', 'numpy'], default='rdataframe')
+        _optional_args.add_argument('--chunk-size', metavar='N', help="Number of entries read at once with `--backend numpy` (default: 100000).", default=100000)
+        _optional_args.add_argument('--numexpr', help="Evaluate expressions with `numexpr` (if installed) where possible with `--backend numpy`.", action="store_true")
+        _optional_args.add_argument('--define-all', help="Apply all quantity definitions and defines from the analysis configuration, "
+                                                         "instead of only those needed by the queued tasks.", action="store_true")
 
         # retrieve analysis config (tasks, splittings, quantities, etc.)
         if _analysis_name is not None:
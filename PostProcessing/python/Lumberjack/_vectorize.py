@@ -0,0 +1,803 @@
+from __future__ import print_function
+
+import hashlib
+import numpy as np
+import re
+
+
+__all__ = ['RootMacros', 'UnsupportedExpressionError', 'VectorizedExpression', 'compile_expression', 'translate_expression']
+
+
+class UnsupportedExpressionError(ValueError):
+    """Raised if a C++ expression cannot be translated into a vectorized NumPy expression."""
+
+    def __init__(self, expression, reason):
+        super(UnsupportedExpressionError, self).__init__("Cannot vectorize expression '{}': {}".format(expression, reason))
+        self.expression = expression
+        self.reason = reason
+
+
+_RE_TOKEN = re.compile(r"""
+    (?P<space>\s+)
+    |(?P<number>0[xX][0-9a-fA-F]+[uUlL]*|(?:\d+\.\d*|\.\d+|\d+)(?:[eE][+-]?\d+)?[fFuUlL]*)
+    |(?P<name>[A-Za-z_]\w*(?:\s*::\s*[A-Za-z_]\w*)*)
+    |(?P<operator>&&|\|\||==|!=|<=|>=|<<|>>|[-+*/%<>!~&|^(),?:\[\]{};=])
+""", re.VERBOSE)
+
+# binary operators and their precedence (higher binds tighter), as in C++
+_BINARY_OPERATORS = {
+    '||': 1,
+    '&&': 2,
+    '|': 3,
+    '^': 4,
+    '&': 5,
+    '==': 6, '!=': 6,
+    '<': 7, '<=': 7, '>': 7, '>=': 7,
+    '<<': 8, '>>': 8,
+    '+': 9, '-': 9,
+    '*': 10, '/': 10, '%': 10,
+}
+
+_COMPARISON_OPERATORS = ('==', '!=', '<', '<=', '>', '>=')
+
+# operators whose C++ semantics differ from the corresponding Python operator
+_BINARY_OPERATOR_TEMPLATES = {
+    '||': "_np.logical_or({}, {})",
+    '&&': "_np.logical_and({}, {})",
+    '/': "_divide({}, {})",
+    '%': "_np.fmod({}, {})",
+}
+
+_UNARY_OPERATOR_TEMPLATES = {
+    '!': "_np.logical_not({})",
+    '~': "_np.invert({})",
+    '-': "(-{})",
+    '+': "(+{})",
+}
+
+# functions which can be called in expressions and their NumPy counterparts
+_FUNCTIONS = {}
+for _name, _np_function in [
+        ('abs', 'abs'), ('fabs', 'abs'), ('sqrt', 'sqrt'), ('cbrt', 'cbrt'), ('pow', 'power'), ('exp', 'exp'),
+        ('log', 'log'), ('log10', 'log10'), ('sin', 'sin'), ('cos', 'cos'), ('tan', 'tan'), ('asin', 'arcsin'),
+        ('acos', 'arccos'), ('atan', 'arctan'), ('atan2', 'arctan2'), ('sinh', 'sinh'), ('cosh', 'cosh'),
+        ('tanh', 'tanh'), ('hypot', 'hypot'), ('fmod', 'fmod'), ('floor', 'floor'), ('ceil', 'ceil'),
+        ('min', 'minimum'), ('max', 'maximum'), ('fmin', 'fmin'), ('fmax', 'fmax')]:
+    _FUNCTIONS[_name] = _FUNCTIONS['std::' + _name] = _np_function
+for _name, _np_function in [
+        ('Abs', 'abs'), ('Sqrt', 'sqrt'), ('Sq', 'square'), ('Power', 'power'), ('Exp', 'exp'), ('Log', 'log'),
+        ('Log10', 'log10'), ('Sin', 'sin'), ('Cos', 'cos'), ('Tan', 'tan'), ('ASin', 'arcsin'), ('ACos', 'arccos'),
+        ('ATan', 'arctan'), ('ATan2', 'arctan2'), ('Hypot', 'hypot'), ('Floor', 'floor'), ('Ceil', 'ceil'),
+        ('Min', 'minimum'), ('Max', 'maximum')]:
+    _FUNCTIONS['TMath::' + _name] = _np_function
+
+# NumPy functions with a numexpr counterpart (with the same semantics)
+_NUMEXPR_FUNCTIONS = {
+    'abs': "abs({})", 'sqrt': "sqrt({})", 'exp': "exp({})", 'log': "log({})", 'log10': "log10({})",
+    'sin': "sin({})", 'cos': "cos({})", 'tan': "tan({})", 'arcsin': "arcsin({})", 'arccos': "arccos({})",
+    'arctan': "arctan({})", 'arctan2': "arctan2({}, {})", 'sinh': "sinh({})", 'cosh': "cosh({})", 'tanh': "tanh({})",
+    'square': "(({})**2)", 'power': "(({})**({}))",
+}
+
+# functions without arguments returning constants
+_CONSTANT_FUNCTIONS = {
+    'TMath::Pi': np.pi,
+    'TMath::TwoPi': 2.0 * np.pi,
+    'TMath::PiOver2': 0.5 * np.pi,
+    'TMath::E': np.e,
+}
+
+_CONSTANTS = {
+    'true': True,
+    'false': False,
+    'M_PI': np.pi,
+}
+
+# C++ types and the corresponding NumPy types (for casts and function arguments)
+_TYPES = {
+    'bool': 'bool', 'Bool_t': 'bool',
+    'float': 'float32', 'Float_t': 'float32',
+    'double': 'float64', 'Double_t': 'float64',
+    'short': 'int16', 'Short_t': 'int16', 'unsigned short': 'uint16', 'UShort_t': 'uint16',
+    'int': 'int32', 'Int_t': 'int32', 'unsigned': 'uint32', 'unsigned int': 'uint32', 'UInt_t': 'uint32',
+    'long': 'int64', 'long long': 'int64', 'Long_t': 'int64', 'Long64_t': 'int64',
+    'unsigned long': 'uint64', 'unsigned long long': 'uint64', 'ULong_t': 'uint64', 'ULong64_t': 'uint64',
+    'size_t': 'uint64', 'std::size_t': 'uint64',
+}
+_TYPE_WORDS = set([_word for _type in _TYPES for _word in _type.split()])
+
+
+def _divide(numerator, denominator):
+    '''division with C++ semantics (integer division truncates towards zero)'''
+    _result_type = np.result_type(numerator, denominator)
+    if np.issubdtype(_result_type, np.integer):
+        return np.trunc(np.true_divide(numerator, denominator)).astype(_result_type)
+    return np.true_divide(numerator, denominator)
+
+
+def _to_bool(values):
+    '''truth value of numbers (like a C++ condition)'''
+    return np.asarray(values, dtype=bool)
+
+
+def _cast(values, dtype):
+    '''conversion to a NumPy type (like a C++ cast)'''
+    return np.asarray(values).astype(dtype)
+
+
+# global namespace in which translated expressions are evaluated
+_GLOBALS = dict(_np=np, _divide=_divide, _to_bool=_to_bool, _cast=_cast)
+
+
+def _parse_number(text):
+    '''Python value of a C++ numeric literal'''
+    _text = text.rstrip('fFuUlL') if not text.lower().startswith('0x') else text.rstrip('uUlL')
+    if _text.lower().startswith('0x'):
+        return int(_text, 16)
+    if any(_c in _text for _c in '.eE'):
+        return float(_text)
+    if len(_text) > 1 and _text.startswith('0'):
+        return int(_text, 8)
+    return int(_text)
+
+
+def _tokenize(code, context):
+    '''list of `(type, value)` tokens of C++ code (`context` is used in error messages)'''
+    _tokens = []
+    _position = 0
+    while _position < len(code):
+        _match = _RE_TOKEN.match(code, _position)
+        if _match is None:
+            raise UnsupportedExpressionError(context, "unsupported character '{}' at position {}".format(code[_position], _position))
+        if _match.lastgroup != 'space':
+            _value = _match.group(_match.lastgroup)
+            if _match.lastgroup == 'name':
+                _value = re.sub(r'\s+', '', _value)
+            _tokens.append((_match.lastgroup, _value))
+        _position = _match.end()
+    return _tokens
+
+
+# -- syntax tree
+#
+# Expressions are parsed into nested tuples, with the node type as the first element:
+#   ('number', value), ('column', name), ('param', index), ('unary', op, x), ('binary', op, x, y),
+#   ('ternary', condition, x, y), ('call', numpy_function, args), ('macro', name, args),
+#   ('table', key, index), ('cast', numpy_type, x)
+
+def _is_boolean(node):
+    '''whether a node always evaluates to a boolean'''
+    if node[0] == 'number':
+        return isinstance(node[1], bool)
+    if node[0] == 'unary':
+        return node[1] == '!'
+    if node[0] == 'binary':
+        return node[1] in _COMPARISON_OPERATORS or node[1] in ('&&', '||')
+    return False
+
+
+def _get_ternary_chain(node):
+    '''conditions and values of a chain of ternaries nested in the 'else' branch, and the final value'''
+    _conditions, _values = [], []
+    while node[0] == 'ternary':
+        _conditions.append(node[1])
+        _values.append(node[2])
+        node = node[3]
+    return _conditions, _values, node
+
+
+def _generate_numpy_code(node):
+    '''Python code evaluating a syntax tree on NumPy arrays'''
+    _type = node[0]
+    if _type == 'number':
+        return repr(node[1])
+    if _type == 'column':
+        return "_columns[{!r}]".format(node[1])
+    if _type == 'param':
+        return "_p{}".format(node[1])
+    if _type == 'unary':
+        return _UNARY_OPERATOR_TEMPLATES[node[1]].format(_generate_numpy_code(node[2]))
+    if _type == 'binary':
+        _template = _BINARY_OPERATOR_TEMPLATES.get(node[1], "({{}} {} {{}})".format(node[1]))
+        return _template.format(_generate_numpy_code(node[2]), _generate_numpy_code(node[3]))
+    if _type == 'ternary':
+        _conditions, _values, _default = _get_ternary_chain(node)
+        if len(_conditions) == 1:
+            return "_np.where(_to_bool({}), {}, {})".format(*map(_generate_numpy_code, (_conditions[0], _values[0], _default)))
+        # chains of `if`/`else if` (e.g. from the ROOT macros): first matching condition wins
+        return "_np.select([{}], [{}], {})".format(
+            ", ".join(["_to_bool({})".format(_generate_numpy_code(_c)) for _c in _conditions]),
+            ", ".join(map(_generate_numpy_code, _values)),
+            _generate_numpy_code(_default),
+        )
+    if _type == 'call':
+        return "_np.{}({})".format(node[1], ", ".join(map(_generate_numpy_code, node[2])))
+    if _type == 'macro':
+        return "_macros[{!r}]({})".format(node[1], ", ".join(map(_generate_numpy_code, node[2])))
+    if _type == 'table':
+        return "_tables[{!r}][_np.asarray({}, dtype=_np.intp)]".format(node[1], _generate_numpy_code(node[2]))
+    if _type == 'cast':
+        return "_cast({}, {!r})".format(_generate_numpy_code(node[2]), node[1])
+    raise ValueError("Unknown node type: {}".format(_type))
+
+
+class _NotNumexprCompatible(Exception):
+    '''raised if an expression has no numexpr equivalent with the same semantics'''
+
+
+def _generate_numexpr_code(node, variables):
+    '''numexpr expression evaluating a syntax tree (`variables` maps column names to numexpr variable names)'''
+    _type = node[0]
+    if _type == 'number':
+        return repr(node[1])
+    if _type == 'column':
+        return variables.setdefault(node[1], "v{}".format(len(variables)))
+    if _type == 'unary':
+        if node[1] == '!' and _is_boolean(node[2]):
+            return "(~{})".format(_generate_numexpr_code(node[2], variables))
+        if node[1] in ('-', '+'):
+            return "({}{})".format(node[1], _generate_numexpr_code(node[2], variables))
+    elif _type == 'binary':
+        _operator = node[1]
+        if _operator in ('&&', '||'):
+            # numexpr only has bitwise operators, which are only equivalent for booleans
+            if not (_is_boolean(node[2]) and _is_boolean(node[3])):
+                raise _NotNumexprCompatible
+            _operator = '&' if _operator == '&&' else '|'
+        elif _operator not in _COMPARISON_OPERATORS + ('+', '-', '*', '/'):
+            raise _NotNumexprCompatible
+        return "({} {} {})".format(_generate_numexpr_code(node[2], variables), _operator, _generate_numexpr_code(node[3], variables))
+    elif _type == 'ternary':
+        if _is_boolean(node[1]):
+            return "where({}, {}, {})".format(*[_generate_numexpr_code(_n, variables) for _n in node[1:]])
+    elif _type == 'call':
+        if node[1] in _NUMEXPR_FUNCTIONS:
+            return _NUMEXPR_FUNCTIONS[node[1]].format(*[_generate_numexpr_code(_n, variables) for _n in node[2]])
+    raise _NotNumexprCompatible
+
+
+def _uses_division(node):
+    '''whether a syntax tree contains a division'''
+    if node[0] == 'binary' and node[1] == '/':
+        return True
+    if node[0] in ('call', 'macro'):
+        return any(_uses_division(_n) for _n in node[2])
+    return any(_uses_division(_n) for _n in node[1:] if isinstance(_n, tuple))
+
+
+class _Parser(object):
+    '''recursive descent parser for C++ expressions (and the function bodies in the ROOT macros)
+
+    Unknown identifiers are columns, unless `params` (a dictionary mapping
+    parameter names to indices) is given, which is the case for functions.
+    Lookup tables declared in functions are registered under the `scope`.
+    '''
+
+    def __init__(self, code, macros=None, params=None, context=None, scope=None):
+        self._context = code if context is None else context
+        self._macros = macros
+        self._params = params
+        self._scope = scope
+        self._locals = {}
+        self._tables = {}
+        self._tokens = _tokenize(code, self._context)
+        if macros is not None:
+            self._tokens = macros.expand(self._tokens, self._context)
+        self._position = 0
+        self.columns = set()
+
+    def _error(self, reason):
+        return UnsupportedExpressionError(self._context, reason)
+
+    def _peek(self, offset=0):
+        if self._position + offset < len(self._tokens):
+            return self._tokens[self._position + offset]
+        return (None, None)
+
+    def _next(self):
+        _token = self._peek()
+        if _token[0] is None:
+            raise self._error("unexpected end of expression")
+        self._position += 1
+        return _token
+
+    def _expect(self, value):
+        _type, _value = self._next()
+        if _value != value:
+            raise self._error("expected '{}', found '{}'".format(value, _value))
+
+    def _at_end(self):
+        return self._peek()[0] is None
+
+    # -- expressions
+
+    def parse_expression(self):
+        """Parse the complete code as an expression."""
+        _node = self._parse_ternary()
+        if not self._at_end():
+            raise self._error("unexpected '{}'".format(self._peek()[1]))
+        return _node
+
+    def _parse_ternary(self):
+        _condition = self._parse_binary(1)
+        if self._peek()[1] != '?':
+            return _condition
+        self._next()
+        _value_true = self._parse_ternary()
+        self._expect(':')
+        _value_false = self._parse_ternary()
+        return ('ternary', _condition, _value_true, _value_false)
+
+    def _parse_binary(self, min_precedence):
+        '''parse operands joined by binary operators with at least `min_precedence` (precedence climbing)'''
+        _lhs = self._parse_unary()
+        while True:
+            _type, _operator = self._peek()
+            if _type != 'operator' or _BINARY_OPERATORS.get(_operator, 0) < min_precedence:
+                return _lhs
+            self._next()
+            # all binary operators are left-associative
+            _rhs = self._parse_binary(_BINARY_OPERATORS[_operator] + 1)
+            _lhs = ('binary', _operator, _lhs, _rhs)
+
+    def _parse_unary(self):
+        _type, _value = self._peek()
+        if _type == 'operator' and _value in _UNARY_OPERATOR_TEMPLATES:
+            self._next()
+            return ('unary', _value, self._parse_unary())
+        if _type == 'operator' and _value == '(' and self._peek(1)[1] in _TYPE_WORDS:
+            # C-style cast, e.g. `(double)x`
+            self._next()
+            _numpy_type = self._parse_type()
+            self._expect(')')
+            return ('cast', _numpy_type, self._parse_unary())
+        return self._parse_primary()
+
+    def _parse_type(self):
+        _words = []
+        while self._peek()[1] in _TYPE_WORDS:
+            _words.append(self._next()[1])
+        _type = ' '.join(_words)
+        if _type not in _TYPES:
+            raise self._error("unsupported type '{}'".format(_type))
+        return _TYPES[_type]
+
+    def _parse_primary(self):
+        _type, _value = self._next()
+
+        if _type == 'number':
+            return ('number', _parse_number(_value))
+
+        if _type == 'operator' and _value == '(':
+            _node = self._parse_ternary()
+            self._expect(')')
+            return _node
+
+        if _type == 'name':
+            if _value == 'static_cast':
+                self._expect('<')
+                _numpy_type = self._parse_type()
+                self._expect('>')
+                self._expect('(')
+                _node = self._parse_ternary()
+                self._expect(')')
+                return ('cast', _numpy_type, _node)
+            if self._peek()[1] == '(':
+                return self._parse_call(_value)
+            if self._peek()[1] == '[':
+                return self._parse_table_lookup(_value)
+            if _value in self._locals:
+                return self._locals[_value]
+            if _value in _CONSTANTS:
+                return ('number', _CONSTANTS[_value])
+            if self._params is not None:
+                if _value not in self._params:
+                    raise self._error("unknown identifier '{}'".format(_value))
+                return ('param', self._params[_value])
+            if '::' in _value:
+                raise self._error("unknown qualified name '{}'".format(_value))
+            self.columns.add(_value)
+            return ('column', _value)
+
+        raise self._error("unexpected '{}'".format(_value))
+
+    def _parse_call(self, function_name):
+        self._expect('(')
+        _args = []
+        if self._peek()[1] != ')':
+            _args.append(self._parse_ternary())
+            while self._peek()[1] == ',':
+                self._next()
+                _args.append(self._parse_ternary())
+        self._expect(')')
+
+        if function_name in _CONSTANT_FUNCTIONS:
+            if _args:
+                raise self._error("function '{}' takes no arguments".format(function_name))
+            return ('number', _CONSTANT_FUNCTIONS[function_name])
+        if function_name in _FUNCTIONS:
+            return ('call', _FUNCTIONS[function_name], _args)
+        if self._macros is not None and self._macros.has_function(function_name):
+            self._macros.check_function(function_name, len(_args), self._context)
+            return ('macro', function_name, _args)
+        raise self._error("unknown function '{}'".format(function_name))
+
+    def _parse_table_lookup(self, table_name):
+        self._expect('[')
+        _index = self._parse_ternary()
+        self._expect(']')
+        if table_name in self._tables:
+            return ('table', self._tables[table_name], _index)
+        if self._macros is not None:
+            self._macros.check_table(table_name, self._context)
+            return ('table', table_name, _index)
+        raise self._error("unknown table '{}'".format(table_name))
+
+    # -- function bodies
+
+    def parse_function_body(self, function_name):
+        """Parse the statements of a function body into a single expression."""
+        _statements = self._parse_statements()
+        if not self._at_end():
+            raise self._error("unexpected '{}'".format(self._peek()[1]))
+        _node = self._statements_to_node(_statements, None)
+        if _node is None:
+            raise self._error("function '{}' does not return a value".format(function_name))
+        return _node
+
+    def _parse_statements(self):
+        _statements = []
+        while not self._at_end() and self._peek()[1] != '}':
+            _statement = self._parse_statement()
+            if _statement is not None:
+                _statements.append(_statement)
+        return _statements
+
+    def _parse_statement(self):
+        _type, _value = self._peek()
+        if _value == '{':
+            self._next()
+            _statements = self._parse_statements()
+            self._expect('}')
+            return ('block', _statements)
+        if _value == ';':
+            self._next()
+            return None
+        if _value == 'return':
+            self._next()
+            _node = self._parse_ternary()
+            self._expect(';')
+            return ('return', _node)
+        if _value == 'if':
+            self._next()
+            self._expect('(')
+            _condition = self._parse_ternary()
+            self._expect(')')
+            _then = self._parse_statement()
+            _else = None
+            if self._peek()[1] == 'else':
+                self._next()
+                _else = self._parse_statement()
+            return ('if', _condition, _then, _else)
+        if _value in ('static', 'const', 'constexpr') or _value in _TYPE_WORDS:
+            self._parse_declaration()
+            return None
+        raise self._error("unsupported statement starting with '{}'".format(_value))
+
+    def _parse_declaration(self):
+        '''local constant or lookup table (substituted wherever it is used)'''
+        while self._peek()[1] in ('static', 'const', 'constexpr'):
+            self._next()
+        _numpy_type = self._parse_type()
+        while self._peek()[1] in ('const', 'constexpr'):
+            self._next()
+        _type, _name = self._next()
+        if _type != 'name':
+            raise self._error("expected a name in declaration, found '{}'".format(_name))
+
+        if self._peek()[1] == '[':
+            # constant lookup table: `type name[] = {value1, value2, ...};`
+            self._next()
+            if self._peek()[0] == 'number':
+                self._next()
+            self._expect(']')
+            self._expect('=')
+            self._expect('{')
+            _values = [self._parse_ternary()]
+            while self._peek()[1] == ',':
+                self._next()
+                if self._peek()[1] != '}':
+                    _values.append(self._parse_ternary())
+            self._expect('}')
+            self._expect(';')
+            self._tables[_name] = self._macros.add_table(_name, _values, _numpy_type, scope=self._scope)
+            return
+
+        self._expect('=')
+        self._locals[_name] = ('cast', _numpy_type, self._parse_ternary())
+        self._expect(';')
+
+    def _statements_to_node(self, statements, rest):
+        '''expression for a list of statements, followed by the expression `rest` (`None` if the function ends)'''
+        for _statement in reversed(statements):
+            rest = self._statement_to_node(_statement, rest)
+        return rest
+
+    def _statement_to_node(self, statement, rest):
+        if statement is None:
+            return rest
+        if statement[0] == 'return':
+            return statement[1]
+        if statement[0] == 'block':
+            return self._statements_to_node(statement[1], rest)
+        # 'if' statement: both branches continue with the following statements
+        _then = self._statement_to_node(statement[2], rest)
+        _else = self._statement_to_node(statement[3], rest)
+        if _then is None or _else is None:
+            raise self._error("not all paths return a value")
+        return ('ternary', statement[1], _then, _else)
+
+
+class RootMacros(object):
+    """Constants and functions from C++ code (e.g. the ``ROOT_MACROS`` of an analysis) for vectorized expressions.
+
+    Object-like ``#define`` macros and constants at file scope are expanded
+    in all expressions. Functions whose bodies only consist of ``if``/``else``
+    and ``return`` statements, local constants and constant lookup tables
+    (arrays) are translated into vectorized functions, with ``if``/``else if``
+    chains evaluated via `np.select`. Constant arrays at file scope can be used
+    as lookup tables. Using a function, macro or table which cannot be
+    translated raises an :py:class:`UnsupportedExpressionError` stating the
+    reason.
+    """
+
+    _RE_COMMENT = re.compile(r'//[^\n]*|/\*.*?\*/', re.DOTALL)
+    _RE_DEFINE = re.compile(r'^[ \t]*#[ \t]*define[ \t]+(\w+)(\([^)]*\))?[ \t]*(.*)$', re.MULTILINE)
+    _RE_PREPROCESSOR = re.compile(r'^[ \t]*#.*$', re.MULTILINE)
+    _RE_FUNCTION = re.compile(r'\b(?:(?:static|inline|constexpr)\s+)*(?P<return_type>[A-Za-z_][\w:<>,]*(?:\s+[A-Za-z_][\w:<>,]*)*?)\s*&?\s*\b(?P<name>[A-Za-z_]\w*)\s*\((?P<params>[^()]*)\)\s*(?:const\s*)?\{')
+    _RE_CONSTANT = re.compile(r'\b(?:static\s+)?const(?:expr)?\s+(?P<type>[A-Za-z_][\w:]*(?:\s+[A-Za-z_][\w:]*)*?)\s+(?P<name>[A-Za-z_]\w*)\s*=\s*(?P<value>[^;{}]+);')
+    _RE_TABLE = re.compile(r'\b(?P<declaration>(?:(?:static|const|constexpr)\s+)*[A-Za-z_][\w:]*(?:\s+[A-Za-z_][\w:]*)*\s*\[\s*\d*\s*\]\s*=\s*\{[^{}]*\}\s*;)')
+
+    def __init__(self, code):
+        self.key = hashlib.md5(code.encode('utf-8')).hexdigest()
+        self.functions = {}
+        self.tables = {}
+        self._defines = {}
+        self._errors = {}
+        self._function_signatures = {}
+
+        _code = self._RE_COMMENT.sub(' ', code.replace('\\\n', ' '))
+
+        # -- preprocessor macros
+        for _name, _params, _value in self._RE_DEFINE.findall(_code):
+            if _params:
+                self._errors[_name] = "function-like preprocessor macros are not supported"
+                continue
+            try:
+                self._defines[_name] = _tokenize(_value, "#define {} {}".format(_name, _value))
+            except UnsupportedExpressionError as _e:
+                self._errors[_name] = _e.reason
+        _code = self._RE_PREPROCESSOR.sub(' ', _code)
+
+        # -- function definitions (skipping their bodies)
+        _bodies = {}
+        _top_level_code = []
+        _position = 0
+        while True:
+            _match = self._RE_FUNCTION.search(_code, _position)
+            if _match is None:
+                break
+            _body_end = self._find_closing_brace(_code, _match.end())
+            _top_level_code.append(_code[_position:_match.start()])
+            _bodies[_match.group('name')] = (_match.group('return_type'), _match.group('params'), _code[_match.end():_body_end])
+            _position = _body_end + 1
+        _top_level_code.append(_code[_position:])
+        _top_level_code = ' '.join(_top_level_code)
+
+        # -- constants and lookup tables at file scope
+        for _match in self._RE_CONSTANT.finditer(_top_level_code):
+            if _match.group('type') in _TYPES:
+                self._defines[_match.group('name')] = _tokenize(
+                    "static_cast<{}>({})".format(_match.group('type'), _match.group('value')),
+                    _match.group(0),
+                )
+        for _match in self._RE_TABLE.finditer(_top_level_code):
+            _name = re.search(r'(\w+)\s*\[', _match.group('declaration')).group(1)
+            try:
+                _Parser(_match.group('declaration'), macros=self, params={})._parse_declaration()
+            except UnsupportedExpressionError as _e:
+                self._errors[_name] = _e.reason
+
+        # -- functions (translated once all signatures are known, so they can call each other)
+        for _name, (_return_type, _params, _body) in _bodies.items():
+            self._function_signatures[_name] = len([_p for _p in _params.split(',') if _p.strip() not in ('', 'void')])
+        for _name, (_return_type, _params, _body) in _bodies.items():
+            try:
+                self.functions[_name] = self._translate_function(_name, _return_type, _params, _body)
+            except UnsupportedExpressionError as _e:
+                self._errors[_name] = _e.reason
+
+    @staticmethod
+    def _find_closing_brace(code, start):
+        '''position of the brace closing the block starting at `start`'''
+        _depth = 1
+        for _position in range(start, len(code)):
+            if code[_position] == '{':
+                _depth += 1
+            elif code[_position] == '}':
+                _depth -= 1
+                if _depth == 0:
+                    return _position
+        return len(code)
+
+    def _translate_function(self, name, return_type, params, body):
+        '''vectorized Python function for a C++ function'''
+        _context = "function '{}'".format(name)
+
+        _param_names, _param_types = [], []
+        for _param in params.split(','):
+            _param = re.sub(r'\bconst\b|&', ' ', _param).strip()
+            if not _param or _param == 'void':
+                continue
+            if '*' in _param or '=' in _param or '[' in _param:
+                raise UnsupportedExpressionError(_context, "unsupported parameter '{}'".format(_param))
+            _words = _param.split()
+            _type = ' '.join(_words[:-1])
+            if _type not in _TYPES:
+                raise UnsupportedExpressionError(_context, "unsupported parameter type '{}'".format(_type))
+            _param_names.append(_words[-1])
+            _param_types.append(_TYPES[_type])
+
+        _return_type = ' '.join(re.sub(r'\b(?:const|constexpr|inline|static)\b', ' ', return_type).split())
+        if _return_type not in _TYPES:
+            raise UnsupportedExpressionError(_context, "unsupported return type '{}'".format(_return_type))
+
+        _parser = _Parser(body, macros=self, params={_n: _i for _i, _n in enumerate(_param_names)}, context=_context, scope=name)
+        _node = _parser.parse_function_body(name)
+
+        # arguments are converted to the parameter types, the result to the return type
+        _lines = ["def _function({}):".format(", ".join(["_p{}".format(_i) for _i in range(len(_param_names))]))]
+        for _i, _param_type in enumerate(_param_types):
+            _lines.append("    _p{0} = _cast(_p{0}, {1!r})".format(_i, _param_type))
+        _lines.append("    return _cast({}, {!r})".format(_generate_numpy_code(_node), _TYPES[_return_type]))
+
+        _namespace = dict(_GLOBALS, _macros=self.functions, _tables=self.tables)
+        exec(compile("\n".join(_lines), "<ROOT macro: {}>".format(name), 'exec'), _namespace)
+        return _namespace['_function']
+
+    def expand(self, tokens, context, _expanding=()):
+        """Replace preprocessor macros and constants in a list of tokens (recursively)."""
+        _expanded = []
+        for _token in tokens:
+            if _token[0] == 'name' and _token[1] in self._defines and _token[1] not in _expanding:
+                _expanded.append(('operator', '('))
+                _expanded += self.expand(self._defines[_token[1]], context, _expanding + (_token[1],))
+                _expanded.append(('operator', ')'))
+            elif _token[0] == 'name' and _token[1] in self._errors and _token[1] not in self._function_signatures:
+                raise UnsupportedExpressionError(context, "'{}' from the ROOT macros cannot be vectorized: {}".format(_token[1], self._errors[_token[1]]))
+            else:
+                _expanded.append(_token)
+        return _expanded
+
+    def has_function(self, name):
+        return name in self._function_signatures
+
+    def check_function(self, name, n_args, context):
+        """Raise an :py:class:`UnsupportedExpressionError` if a function cannot be called with `n_args` arguments."""
+        if name in self._errors:
+            raise UnsupportedExpressionError(context, "function '{}' from the ROOT macros cannot be vectorized: {}".format(name, self._errors[name]))
+        if n_args != self._function_signatures[name]:
+            raise UnsupportedExpressionError(context, "function '{}' takes {} argument(s), {} given".format(name, self._function_signatures[name], n_args))
+
+    def check_table(self, name, context):
+        """Raise an :py:class:`UnsupportedExpressionError` if there is no lookup table `name`."""
+        if name not in self.tables:
+            raise UnsupportedExpressionError(context, "unknown table '{}'".format(name))
+
+    def add_table(self, name, value_nodes, numpy_type, scope=None):
+        """Register a constant lookup table (local to the function `scope`, if given). Returns its key."""
+        _namespace = dict(_GLOBALS, _macros=self.functions, _tables=self.tables)
+        try:
+            _values = [eval(_generate_numpy_code(_node), _namespace) for _node in value_nodes]
+        except (NameError, KeyError):
+            raise UnsupportedExpressionError("table '{}'".format(name), "values are not constant")
+        _key = name if scope is None else "{}::{}".format(scope, name)
+        self.tables[_key] = np.array(_values, dtype=numpy_type)
+        return _key
+
+
+def translate_expression(expression, macros=None):
+    """Translate a C++ expression into a Python expression evaluating it on NumPy arrays.
+
+    Supported are numeric literals, column names, arithmetic, comparison,
+    logical and bitwise operators, ternaries, casts, common mathematical
+    functions (e.g. ``abs``, ``sqrt`` or ``TMath::Pi``) and, if `macros`
+    (:py:class:`RootMacros`) is given, the constants, functions and lookup
+    tables defined there. Columns are looked up in a mapping named
+    ``_columns``. Returns the Python expression and the set of column names
+    used. Raises :py:class:`UnsupportedExpressionError` for anything else.
+    """
+    _parser = _Parser(str(expression), macros=macros)
+    _node = _parser.parse_expression()
+    return _generate_numpy_code(_node), _parser.columns
+
+
+def _get_numexpr():
+    '''the `numexpr` module, or `None` if it is not installed'''
+    try:
+        import numexpr
+    except ImportError:
+        return None
+    return numexpr
+
+
+class VectorizedExpression(object):
+    """A C++ expression compiled into a function of a mapping of column names to NumPy arrays.
+
+    If `use_numexpr` is set and the `numexpr` package is installed,
+    expressions (or parts of them) with an equivalent in `numexpr` are
+    evaluated with it, which avoids temporary arrays and uses several threads.
+    Divisions are only evaluated with `numexpr` if all columns are floating
+    point numbers (integer division differs from C++).
+    """
+
+    def __init__(self, expression, macros=None, use_numexpr=False):
+        self.expression = expression
+
+        _parser = _Parser(str(expression), macros=macros)
+        _node = _parser.parse_expression()
+        self.columns = _parser.columns
+
+        self.code = _generate_numpy_code(_node)
+        _namespace = dict(_GLOBALS)
+        if macros is not None:
+            _namespace.update(_macros=macros.functions, _tables=macros.tables)
+        self._function = eval(compile("lambda _columns: " + self.code, "<expression: {}>".format(expression), 'eval'), _namespace)
+
+        self.numexpr_code = None
+        self._numexpr = _get_numexpr() if use_numexpr else None
+        if self._numexpr is not None:
+            self._numexpr_variables = {}
+            try:
+                self.numexpr_code = _generate_numexpr_code(_node, self._numexpr_variables)
+            except _NotNumexprCompatible:
+                pass
+            self._numexpr_needs_floats = _uses_division(_node)
+
+    def __repr__(self):
+        return "{}({!r})".format(self.__class__.__name__, self.expression)
+
+    def _evaluate_numexpr(self, columns):
+        '''result of evaluating the expression with `numexpr`, or `None` if not possible'''
+        _arrays = {_variable: columns[_column] for _column, _variable in self._numexpr_variables.items()}
+        if self._numexpr_needs_floats and not all(np.issubdtype(np.asarray(_a).dtype, np.floating) for _a in _arrays.values()):
+            return None
+        try:
+            return self._numexpr.evaluate(self.numexpr_code, local_dict=_arrays)
+        except Exception:
+            # e.g. unsupported types: use NumPy from now on
+            self.numexpr_code = None
+            return None
+
+    def __call__(self, columns):
+        """Evaluate the expression for the arrays in `columns`. May return a scalar for expressions without columns."""
+        # follow C++ floating point semantics: division by zero gives inf or nan without warnings
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if self.numexpr_code is not None:
+                _result = self._evaluate_numexpr(columns)
+                if _result is not None:
+                    return _result
+            return self._function(columns)
+
+
+# compiled expressions, by expression, ROOT macros and use of numexpr
+_EXPRESSION_CACHE = {}
+
+
+def compile_expression(expression, macros=None, use_numexpr=False):
+    """Compile a C++ expression into a :py:class:`VectorizedExpression` (cached, so each expression is only translated once)."""
+    _key = (expression, macros.key if macros is not None else None, bool(use_numexpr))
+    _vectorized_expression = _EXPRESSION_CACHE.get(_key, None)
+    if _vectorized_expression is None:
+        _vectorized_expression = _EXPRESSION_CACHE[_key] = VectorizedExpression(expression, macros=macros, use_numexpr=use_numexpr)
+    return _vectorized_expression
@@ -3,7 +3,7 @@ import os
 
 import numpy as np
 
-from Karma.PostProcessing.Lumberjack import Quantity
+from Karma.PostProcessing.Lumberjack import Bitmask, Quantity
 
 
 _QCD_BINNING = [15, 30, 50, 80, 120, 170, 300, 470, 600, 800, 1000, 1400, 1800, 1800, 2400, 3200, 7000]
@@ -12,7 +12,7 @@ _QCD_BINNING_FINE = np.hstack(
         + [_QCD_BINNING[-1]]  # add final bin edge
 )
 
-__all__ = ["ROOT_MACROS", "QUANTITIES", "DEFINES", "SELECTIONS", "SPLITTINGS"]
+__all__ = ["ROOT_MACROS", "QUANTITIES", "DEFINES", "BITMASKS", "SELECTIONS", "SPLITTINGS"]
 
 
 # load ROOT macros into config string
@@ -23,6 +23,7 @@ with open(_root_macro_file_path, 'r') as _root_macro_file:
 
 # specification of quantities
 # NOTE: a 'Define' will be applied to the data frame for every quantity whose name is different from its expression
+#       (only if the quantity is needed by one of the tasks, unless `--define-all` is given)
 QUANTITIES = {
     'global': {
         'run': Quantity(
@@ -379,25 +380,6 @@ DEFINES = dict()
 # defines to be applied globally
 DEFINES['global'] = dict()
 
-# boolean values indicating if a particular trigger path fired for an event
-DEFINES['global'].update({
-    "{}".format(_trigger_name) : "(hltBits&{})>0".format(2**(_trigger_index)) for (_trigger_name, _trigger_index) in _trigger_index_map.items()
-})
-
-# boolean values indicating if the leading jet is matched to a particular trigger path
-DEFINES['global'].update({
-    "{}_".format(_trigger_name)+("Jet12Match" if "DiPFJetAve" in _trigger_name else "Jet1Match") : "(hlt"+("Jet12Match" if "DiPFJetAve" in _trigger_name else "Jet1Match")+"&{})>0".format(2**(_trigger_index)) for (_trigger_name, _trigger_index) in _trigger_index_map.items()
-})
-
-# boolean values indicating if the leading jet passes the L1  pT thresholds for a particular trigger path
-DEFINES['global'].update({
-    "{}_".format(_trigger_name)+("Jet12PtAve" if "DiPFJetAve" in _trigger_name else "Jet1Pt")+"PassThresholdsL1" : "(hlt"+("Jet12PtAve" if "DiPFJetAve" in _trigger_name else "Jet1Pt")+"PassThresholdsL1&{})>0".format(2**(_trigger_index)) for (_trigger_name, _trigger_index) in _trigger_index_map.items()
-})
-# boolean values indicating if the leading jet passes the HLT pT thresholds for a particular trigger path
-DEFINES['global'].update({
-    "{}_".format(_trigger_name)+("Jet12PtAve" if "DiPFJetAve" in _trigger_name else "Jet1Pt")+"PassThresholdsHLT" : "(hlt"+("Jet12PtAve" if "DiPFJetAve" in _trigger_name else "Jet1Pt")+"PassThresholdsHLT&{})>0".format(2**(_trigger_index)) for (_trigger_name, _trigger_index) in _trigger_index_map.items()
-})
-
 # defines to be applied for MC samples only
 DEFINES['mc'] = {
     # jet flavor categories
@@ -428,6 +410,27 @@ DEFINES['mc'] = {
 }
 
 
+# specification of bitmasks: bits of integer columns which can be used like boolean columns
+# NOTE: cuts on bits in splittings are tested directly on the integer columns (no 'Define' needed per bit)
+_trigger_index_map_dijet = {_name: _index for _name, _index in _trigger_index_map.items() if "DiPFJetAve" in _name}
+_trigger_index_map_single_jet = {_name: _index for _name, _index in _trigger_index_map.items() if "DiPFJetAve" not in _name}
+
+BITMASKS = [
+    # boolean values indicating if a particular trigger path fired for an event
+    Bitmask("hltBits", _trigger_index_map),
+
+    # boolean values indicating if the leading jet (pair) is matched to a particular trigger path
+    Bitmask("hltJet1Match",  {"{}_Jet1Match".format(_name):  _index for _name, _index in _trigger_index_map_single_jet.items()}),
+    Bitmask("hltJet12Match", {"{}_Jet12Match".format(_name): _index for _name, _index in _trigger_index_map_dijet.items()}),
+
+    # boolean values indicating if the leading jet (pair) passes the L1/HLT pT thresholds for a particular trigger path
+    Bitmask("hltJet1PtPassThresholdsL1",     {"{}_Jet1PtPassThresholdsL1".format(_name):     _index for _name, _index in _trigger_index_map_single_jet.items()}),
+    Bitmask("hltJet1PtPassThresholdsHLT",    {"{}_Jet1PtPassThresholdsHLT".format(_name):    _index for _name, _index in _trigger_index_map_single_jet.items()}),
+    Bitmask("hltJet12PtAvePassThresholdsL1",  {"{}_Jet12PtAvePassThresholdsL1".format(_name):  _index for _name, _index in _trigger_index_map_dijet.items()}),
+    Bitmask("hltJet12PtAvePassThresholdsHLT", {"{}_Jet12PtAvePassThresholdsHLT".format(_name): _index for _name, _index in _trigger_index_map_dijet.items()}),
+]
+
+
 # specification of filters to be applied to data frame
 SELECTIONS = {
     'jet1TriggerMatch' : [
@@ -723,11 +726,9 @@ TASKS = {
     "MainShapes" : {
         "splittings": ["ybys_narrow",],
         "histograms" : [
-            "{}{}".format(_qn, _ws)
-            for (_qn, _ws) in itertools.product(
-                ["jet12ptave_wide", "jet12mass_wide"],
-                ["", "@assignedTriggerLuminosityWeight"]
-            )
+            # unweighted and luminosity-weighted histograms, filled together
+            "{}@[,assignedTriggerLuminosityWeight]".format(_qn)
+            for _qn in ["jet12ptave_wide", "jet12mass_wide"]
         ],
     },
 
@@ -72,11 +72,9 @@ TASKS = {
     "MainShapes" : {
         "splittings": ["ybys_narrow",],
         "histograms" : [
-            "{}{}".format(_qn, _ws)
-            for (_qn, _ws) in itertools.product(
-                ["jet12ptave_wide", "jet12mass_wide"],
-                ["", "@assignedTriggerLuminosityWeight"]
-            )
+            # unweighted and luminosity-weighted histograms, filled together
+            "{}@[,assignedTriggerLuminosityWeight]".format(_qn)
+            for _qn in ["jet12ptave_wide", "jet12mass_wide"]
         ],
     },
 
@@ -1,9 +1,12 @@
 #!/usr/bin/env python
+import time
+_start_time = time.time()  # the import of ROOT is part of the profiled run
+
 from Karma.PostProcessing.Lumberjack import LumberjackCLI
 
 
 if __name__ == "__main__":
 
-    _cli = LumberjackCLI()
+    _cli = LumberjackCLI(start_time=_start_time)
 
     _cli.run()
@@ -0,0 +1,142 @@
+import unittest2 as unittest
+
+from Karma.PostProcessing.Lumberjack import FillStatistics, RaggedBinnings, SplitSlots, WeightVariants
+
+
+class TestSplitSlots(unittest.TestCase):
+
+    SPLITTINGS = {
+        'ybys': {
+            'inclusive': dict(),
+            'YB01_YS01': dict(yboost=(0, 1), ystar=(0, 1)),
+            'YB01_YS12': dict(yboost=(0, 1), ystar=(1, 2)),
+        },
+        'run': {
+            'RunA': dict(run=(0, 100)),
+            'RunB': dict(run=(100, 200)),
+        },
+    }
+
+    def _get_splitting_spec(self, keys):
+        _spec = {}
+        for _value_1 in self.SPLITTINGS[keys[0]]:
+            for _value_2 in self.SPLITTINGS[keys[1]]:
+                _spec["{}:{}/{}:{}".format(keys[0], _value_1, keys[1], _value_2)] = {}
+        return _spec
+
+    def test_slots_are_flat_indices(self):
+        _slots = SplitSlots(self._get_splitting_spec(['ybys', 'run']), self.SPLITTINGS)
+        self.assertEqual(_slots.n_slots, 6)
+        self.assertEqual(_slots.get_slot('ybys:YB01_YS01/run:RunA'), 0)
+        self.assertEqual(_slots.get_slot('ybys:YB01_YS12/run:RunB'), 3)
+        self.assertEqual(_slots.get_slot('ybys:inclusive/run:RunB'), 5)
+        self.assertEqual(
+            sorted([_slots.get_slot(_name) for _name in self._get_splitting_spec(['ybys', 'run'])]),
+            list(range(6)),
+        )
+
+    def test_slots_without_splittings(self):
+        _slots = SplitSlots({'b': dict(x=(1, 2)), 'a': dict(x=(0, 1))})
+        self.assertEqual(_slots.n_slots, 2)
+        self.assertEqual(_slots.get_slot('a'), 0)
+        self.assertEqual(_slots.get_slot('b'), 1)
+        self.assertEqual(_slots.expression, "lumberjack::batch::select({(0<=x&&x<1), (1<=x&&x<2)})")
+
+    def test_expression_combines_keys(self):
+        _slots = SplitSlots(self._get_splitting_spec(['ybys', 'run']), self.SPLITTINGS)
+        _expression = _slots.expression
+        self.assertTrue(_expression.startswith("lumberjack::batch::combine(lumberjack::batch::lookup(lumberjack::splitting::index_ybys_"))
+        # 'inclusive' has no cuts and matches every event
+        self.assertIn("{0, 1}, {2})", _expression)
+        self.assertTrue(_expression.endswith(", 2, lumberjack::batch::lookup(lumberjack::splitting::index_run_{}(run), {{0, 1}}, {{}}))".format(
+            _expression.split('index_run_')[1].split('(')[0])))
+
+    def test_remap_expression(self):
+        self.assertEqual(
+            SplitSlots.get_remap_expression('slots', [1, 3], 4),
+            "lumberjack::batch::remap(slots, {-1, 0, -1, 1})",
+        )
+
+
+
+class TestRaggedBinnings(unittest.TestCase):
+
+    BINNINGS_BY_SLOT = [
+        ((0, 1, 2, 3), (0, 0.5, 1)),
+        ((0, 5, 10), (0, 0.5, 1)),
+        ((0, 1, 2, 3), (-1, 0, 1)),
+    ]
+
+    def test_flat_buffer(self):
+        _rb = RaggedBinnings(self.BINNINGS_BY_SLOT)
+        # identical binnings are stored once
+        self.assertEqual(_rb.n_edges, 13)
+        self.assertEqual([_rb.get_cell_offset(_slot) for _slot in range(3)], [0, 20, 36])
+        self.assertEqual(_rb.n_cells, 56)
+
+    def test_cells(self):
+        _rb = RaggedBinnings(self.BINNINGS_BY_SLOT)
+        # cells are ordered like the global bins of a TH2D: x + (nx + 2) * y
+        self.assertEqual(_rb.get_cell(0, 0.5, 0.25), 1 + 5 * 1)
+        self.assertEqual(_rb.get_cell(1, 7.0, 0.75), 20 + 2 + 4 * 2)
+        self.assertEqual(_rb.get_cell(2, 2.5, -0.5), 36 + 3 + 5 * 1)
+
+    def test_cells_under_and_overflow(self):
+        _rb = RaggedBinnings(self.BINNINGS_BY_SLOT)
+        self.assertEqual(_rb.get_cell(0, -1.0, 0.25), 0 + 5 * 1)
+        self.assertEqual(_rb.get_cell(0, 3.0, 0.25), 4 + 5 * 1)
+        self.assertEqual(_rb.get_cell(1, 10.0, 1.0), 20 + 3 + 4 * 3)
+
+    def test_different_numbers_of_axes(self):
+        with self.assertRaises(ValueError):
+            RaggedBinnings([((0, 1),), ((0, 1), (0, 1))])
+
+    def test_in_range(self):
+        _rb = RaggedBinnings(self.BINNINGS_BY_SLOT)
+        self.assertTrue(_rb.is_in_range(0, 0.0, 0.25))
+        self.assertTrue(_rb.is_in_range(1, 7.0, 0.75))
+        # the upper edge belongs to the overflow
+        self.assertFalse(_rb.is_in_range(0, 3.0, 0.25))
+        self.assertFalse(_rb.is_in_range(2, 2.5, -1.5))
+        self.assertFalse(_rb.is_in_range(0, float('nan'), 0.25))
+
+
+class TestFillStatistics(unittest.TestCase):
+
+    def test_number_of_terms(self):
+        # terms of `GetStats`, followed by the number of entries
+        self.assertEqual(FillStatistics(1, False).n_terms, 5)
+        self.assertEqual(FillStatistics(2, False).n_terms, 8)
+        self.assertEqual(FillStatistics(3, False).n_terms, 12)
+        self.assertEqual(FillStatistics(1, True).n_terms, 7)
+        self.assertEqual(FillStatistics(2, True).n_terms, 10)
+
+    def test_expressions(self):
+        _stats = FillStatistics(1, True)
+        self.assertEqual(
+            _stats.get_terms_expression(['x', 'y'], 'weight'),
+            "lumberjack::batch::statsTerms(static_cast<double>(weight), true, {static_cast<double>(x), static_cast<double>(y)})",
+        )
+        self.assertEqual(_stats.get_cells_expression("slots"), "lumberjack::batch::statsCells(slots, 7)")
+        self.assertEqual(_stats.get_variant_cells_expression(3), "lumberjack::batch::statsCells({0, 1, 2}, 7)")
+        self.assertEqual(FillStatistics.get_slot_stats_expression("terms", "inRange", "slots"), "lumberjack::batch::slotStats(terms, inRange, slots)")
+
+
+class TestWeightVariants(unittest.TestCase):
+
+    def test_expressions(self):
+        _wv = WeightVariants([None, 'weight', 'weightUp'])
+        self.assertEqual(_wv.n_variants, 3)
+        self.assertEqual(_wv.get_cells_expression("cell"), "lumberjack::batch::variantCells(cell, 3)")
+        self.assertEqual(
+            _wv.weights_expression,
+            "lumberjack::batch::weights({1.0, static_cast<double>(weight), static_cast<double>(weightUp)})",
+        )
+
+    def test_duplicate_weights(self):
+        with self.assertRaises(ValueError):
+            WeightVariants([None, 'weight', 'weight'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,34 @@
+import unittest2 as unittest
+
+from Karma.PostProcessing.Lumberjack import Bitmask, get_bit_expressions, get_bitmask_columns, get_bitmask_defines
+
+
+class TestBitmask(unittest.TestCase):
+
+    BITMASKS = [
+        Bitmask('hltBits', {'HLT_PFJet40': 1, 'HLT_PFJet60': 2}),
+        Bitmask('hltJet1Match', {'HLT_PFJet40_Jet1Match': 1}),
+    ]
+
+    def test_bit_expressions(self):
+        self.assertEqual(get_bit_expressions(self.BITMASKS), {
+            'HLT_PFJet40': '((hltBits>>1)&1)',
+            'HLT_PFJet60': '((hltBits>>2)&1)',
+            'HLT_PFJet40_Jet1Match': '((hltJet1Match>>1)&1)',
+        })
+
+    def test_bit_expressions_match_masks(self):
+        for _word in range(8):
+            for _index in range(3):
+                _expression = Bitmask('word', {'bit': _index}).get_bit_expression('bit')
+                self.assertEqual(eval(_expression, dict(word=_word)), int((_word & 2**_index) > 0))
+
+    def test_columns_and_defines(self):
+        self.assertEqual(get_bitmask_columns(self.BITMASKS)['HLT_PFJet40_Jet1Match'], 'hltJet1Match')
+        self.assertEqual(get_bitmask_defines(self.BITMASKS)['HLT_PFJet60'], '((hltBits>>2)&1)!=0')
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            Bitmask('hltBits', {'HLT_PFJet40': 64})
+        with self.assertRaises(ValueError):
+            get_bit_expressions(self.BITMASKS + [Bitmask('hltBits2', {'HLT_PFJet40': 3})])
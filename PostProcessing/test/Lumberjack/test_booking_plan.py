@@ -0,0 +1,39 @@
+import unittest2 as unittest
+
+from Karma.PostProcessing.Lumberjack import BookingPlan
+
+
+class TestBookingPlan(unittest.TestCase):
+
+    ENTRIES = [
+        dict(split='ybys:YB01/run:A', path='h_pt', object_type='histogram', n_vars=1, n_bins=[98], weighted=False),
+        dict(split='ybys:YB01/run:A', path='eta/p_pt', object_type='profile', n_vars=2, n_bins=[98], weighted=True),
+        dict(split='ybys:YB12/run:A', path='h_pt', object_type='histogram', n_vars=1, n_bins=[8], weighted=True),
+        dict(split='ybys:YB12/run:A', path='z/y/h3d_x', object_type='histogram', n_vars=3, n_bins=[8, 8, 8], weighted=False),
+    ]
+
+    def test_bytes(self):
+        _overhead = BookingPlan.OBJECT_OVERHEAD_BYTES
+        # bins including under- and overflow, one array per bin for unweighted histograms, four for weighted profiles
+        self.assertEqual(BookingPlan.get_bytes(self.ENTRIES[0]), 100 * 8 + _overhead)
+        self.assertEqual(BookingPlan.get_bytes(self.ENTRIES[1]), 100 * 4 * 8 + _overhead)
+        self.assertEqual(BookingPlan.get_bytes(self.ENTRIES[2]), 10 * 2 * 8 + _overhead)
+        self.assertEqual(BookingPlan.get_bytes(self.ENTRIES[3]), 1000 * 8 + _overhead)
+
+    def test_total_bytes_scale_with_slots(self):
+        _plan = BookingPlan(self.ENTRIES)
+        self.assertEqual(_plan.n_objects, 4)
+        self.assertEqual(_plan.get_total_bytes(1), _plan.get_bytes_per_slot())
+        self.assertEqual(_plan.get_total_bytes(4), 4 * _plan.get_bytes_per_slot())
+
+    def test_bytes_by_value(self):
+        _plan = BookingPlan(self.ENTRIES)
+        _bytes_by_value = _plan.get_bytes_per_slot_by_value('ybys')
+        self.assertEqual(sorted(_bytes_by_value), ['YB01', 'YB12'])
+        self.assertEqual(_bytes_by_value['YB01'], BookingPlan.get_bytes(self.ENTRIES[0]) + BookingPlan.get_bytes(self.ENTRIES[1]))
+        self.assertEqual(sum(_bytes_by_value.values()), _plan.get_bytes_per_slot())
+        self.assertEqual(_plan.get_bytes_per_slot_by_value('run'), {'A': _plan.get_bytes_per_slot()})
+
+
+if __name__ == '__main__':
+    unittest.main()
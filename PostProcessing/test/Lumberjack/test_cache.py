@@ -0,0 +1,104 @@
+import os
+import shutil
+import tempfile
+import unittest2 as unittest
+
+from Karma.PostProcessing.Lumberjack import BookingPlanCache, EntryRangeCache, Quantity, ResultCache
+
+
+class TestResultCache(unittest.TestCase):
+
+    TASK_DESCRIPTION = dict(
+        quantities={'jet1pt': Quantity(name='jet1pt', expression='jet1pt', binning=(0, 100, 200))},
+        splittings={'ybys:YB01_YS01': {'yboost': (0, 1), 'ystar': (0, 1)}},
+        histograms=['jet1pt'],
+        profiles=None,
+    )
+
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+        self._input_file = os.path.join(self._dir, 'input.root')
+        with open(self._input_file, 'w') as _f:
+            _f.write('events')
+        self._output_file = os.path.join(self._dir, 'output.root')
+        with open(self._output_file, 'w') as _f:
+            _f.write('histograms')
+        self._cache = ResultCache(os.path.join(self._dir, 'cache'))
+
+    def tearDown(self):
+        shutil.rmtree(self._dir)
+
+    def test_key_independent_of_dict_order(self):
+        _reordered_description = dict(reversed(list(self.TASK_DESCRIPTION.items())))
+        self.assertEqual(
+            self._cache.get_key([self._input_file], self.TASK_DESCRIPTION),
+            self._cache.get_key([self._input_file], _reordered_description),
+        )
+
+    def test_key_depends_on_task(self):
+        _changed_description = dict(self.TASK_DESCRIPTION, histograms=['jet1pt', 'jet2pt'])
+        self.assertNotEqual(
+            self._cache.get_key([self._input_file], self.TASK_DESCRIPTION),
+            self._cache.get_key([self._input_file], _changed_description),
+        )
+
+    def test_key_depends_on_input_file(self):
+        _key = self._cache.get_key([self._input_file], self.TASK_DESCRIPTION)
+        with open(self._input_file, 'a') as _f:
+            _f.write(' and more events')
+        self.assertNotEqual(_key, self._cache.get_key([self._input_file], self.TASK_DESCRIPTION))
+
+    def test_store_fetch(self):
+        _key = self._cache.get_key([self._input_file], self.TASK_DESCRIPTION)
+        _fetched_file = os.path.join(self._dir, 'fetched.root')
+        self.assertFalse(self._cache.fetch(_key, _fetched_file))
+
+        self._cache.store(_key, self._output_file)
+        self.assertTrue(self._cache.fetch(_key, _fetched_file))
+        with open(_fetched_file, 'r') as _f:
+            self.assertEqual(_f.read(), 'histograms')
+
+
+class TestEntryRangeCache(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+        self._cache = EntryRangeCache(self._dir)
+
+    def tearDown(self):
+        shutil.rmtree(self._dir)
+
+    def test_store_load(self):
+        self.assertIsNone(self._cache.load('key'))
+        self._cache.store('key', [(0, 3, 6), (2, 10, 11)])
+        self.assertEqual(self._cache.load('key'), [(0, 3, 6), (2, 10, 11)])
+
+    def test_empty(self):
+        self._cache.store('key', [])
+        self.assertEqual(self._cache.load('key'), [])
+
+
+class TestBookingPlanCache(unittest.TestCase):
+
+    ENTRIES = [
+        dict(split='ybys:YB01_YS01', path='h_jet1pt', object_type='histogram', n_vars=1, n_bins=[2], weighted=False),
+    ]
+
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+        self._cache = BookingPlanCache(self._dir)
+
+    def tearDown(self):
+        shutil.rmtree(self._dir)
+
+    def test_key_independent_of_dict_order(self):
+        _description = TestResultCache.TASK_DESCRIPTION
+        self.assertEqual(
+            self._cache.get_key(_description),
+            self._cache.get_key(dict(reversed(list(_description.items())))),
+        )
+
+    def test_store_load(self):
+        self.assertIsNone(self._cache.load('key'))
+        self._cache.store('key', self.ENTRIES)
+        self.assertEqual(self._cache.load('key'), self.ENTRIES)
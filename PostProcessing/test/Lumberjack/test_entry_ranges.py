@@ -0,0 +1,70 @@
+import unittest2 as unittest
+
+from Karma.PostProcessing.Lumberjack import entry_numbers_to_ranges, intersect_entry_ranges, limit_entry_ranges, sample_entry_ranges
+
+
+class TestSampleEntryRanges(unittest.TestCase):
+
+    # 2 files with 10 clusters of 100 entries each
+    CLUSTERS = [(_i_file, _begin, _begin + 100) for _i_file in range(2) for _begin in range(0, 1000, 100)]
+
+    def test_full(self):
+        self.assertEqual(sample_entry_ranges(self.CLUSTERS, 1.0), self.CLUSTERS)
+
+    def test_fraction(self):
+        _selected = sample_entry_ranges(self.CLUSTERS, 0.2)
+        self.assertEqual(sum([_end - _begin for _, _begin, _end in _selected]), 400)
+
+    def test_spread(self):
+        # every fifth cluster is selected
+        self.assertEqual(sample_entry_ranges(self.CLUSTERS, 0.2), self.CLUSTERS[2::5])
+
+    def test_unequal_sizes(self):
+        _clusters = [(0, 0, 10), (0, 10, 1000), (0, 1000, 1010), (0, 1010, 2000)]
+        _selected = sample_entry_ranges(_clusters, 0.5)
+        self.assertAlmostEqual(sum([_end - _begin for _, _begin, _end in _selected]) / 2000.0, 0.5, delta=0.01)
+
+
+class TestLimitEntryRanges(unittest.TestCase):
+
+    RANGES = [(0, 0, 100), (1, 0, 50), (1, 100, 200)]
+
+    def test_no_limit_needed(self):
+        self.assertEqual(limit_entry_ranges(self.RANGES, 1000), self.RANGES)
+
+    def test_truncate(self):
+        self.assertEqual(limit_entry_ranges(self.RANGES, 120), [(0, 0, 100), (1, 0, 20)])
+
+    def test_exact(self):
+        self.assertEqual(limit_entry_ranges(self.RANGES, 150), [(0, 0, 100), (1, 0, 50)])
+
+    def test_zero(self):
+        self.assertEqual(limit_entry_ranges(self.RANGES, 0), [])
+
+
+class TestEntryNumbersToRanges(unittest.TestCase):
+
+    def test_single_file(self):
+        self.assertEqual(entry_numbers_to_ranges([3, 4, 5, 9, 11, 12], [20]), [(0, 3, 6), (0, 9, 10), (0, 11, 13)])
+
+    def test_unsorted(self):
+        self.assertEqual(entry_numbers_to_ranges([5, 3, 4, 4], [20]), [(0, 3, 6)])
+
+    def test_file_boundaries(self):
+        # consecutive entries in different files are not merged
+        self.assertEqual(entry_numbers_to_ranges([8, 9, 10, 11, 25], [10, 5, 20]), [(0, 8, 10), (1, 0, 2), (2, 10, 11)])
+
+    def test_empty(self):
+        self.assertEqual(entry_numbers_to_ranges([], [10, 10]), [])
+
+
+class TestIntersectEntryRanges(unittest.TestCase):
+
+    def test_overlap(self):
+        self.assertEqual(
+            intersect_entry_ranges([(0, 0, 100), (1, 0, 100)], [(0, 10, 20), (0, 90, 110), (1, 50, 60)]),
+            [(0, 10, 20), (0, 90, 100), (1, 50, 60)]
+        )
+
+    def test_different_files(self):
+        self.assertEqual(intersect_entry_ranges([(0, 0, 100)], [(1, 0, 100)]), [])
@@ -0,0 +1,55 @@
+import unittest2 as unittest
+
+from Karma.PostProcessing.Lumberjack import get_identifiers, get_object_spec_columns, get_required_defines
+
+
+class TestGetIdentifiers(unittest.TestCase):
+
+    def test_simple(self):
+        self.assertEqual(get_identifiers("met/sumEt"), {'met', 'sumEt'})
+
+    def test_numeric_literals(self):
+        self.assertEqual(get_identifiers("(hltBits&1024)>0"), {'hltBits'})
+        self.assertEqual(get_identifiers("1e5*x+0x1F"), {'x'})
+        self.assertEqual(get_identifiers(0.5), set())
+
+    def test_qualified_names_and_members(self):
+        self.assertEqual(get_identifiers("std::abs(jet1y) < 3.0"), {'jet1y'})
+        self.assertEqual(get_identifiers("ROOT::VecOps::Sum(v) + a.b + c->d"), {'v', 'a', 'c'})
+
+    def test_string_literals(self):
+        self.assertEqual(get_identifiers('f("jet1pt", jet2pt)'), {'f', 'jet2pt'})
+
+
+class TestGetObjectSpecColumns(unittest.TestCase):
+
+    def test_object_specs(self):
+        self.assertEqual(get_object_spec_columns("jet1pt"), ['jet1pt'])
+        self.assertEqual(get_object_spec_columns("jet1pt:ystar@weight"), ['jet1pt', 'ystar', 'weight'])
+        self.assertEqual(get_object_spec_columns("x:y:z"), ['x', 'y', 'z'])
+        self.assertEqual(get_object_spec_columns("jet1pt@[,weight, weightUp]"), ['jet1pt', 'weight', 'weightUp'])
+
+
+class TestGetRequiredDefines(unittest.TestCase):
+
+    DEFINE_GROUPS = [
+        {'metOverSumET': 'met/sumEt', 'jet1pt_wide': 'jet1pt'},
+        {'HLT_PFJet40': '(hltBits&2)>0', 'HLT_PFJet60': '(hltBits&4)>0'},
+        {'HLT_PFJet40_Ref': 'HLT_PFJet40 && metOverSumET < 0.3'},
+    ]
+
+    def test_direct(self):
+        self.assertEqual(get_required_defines(self.DEFINE_GROUPS, ['jet1pt_wide']), {'jet1pt_wide'})
+
+    def test_transitive(self):
+        self.assertEqual(
+            get_required_defines(self.DEFINE_GROUPS, ['HLT_PFJet40_Ref']),
+            {'HLT_PFJet40_Ref', 'HLT_PFJet40', 'metOverSumET'}
+        )
+
+    def test_branches_only(self):
+        self.assertEqual(get_required_defines(self.DEFINE_GROUPS, ['jet1pt > 100', 'npv']), set())
+
+    def test_self_reference(self):
+        # a define with the same name as the branch it is computed from must not recurse forever
+        self.assertEqual(get_required_defines([{'x': 'x*2'}], ['x']), {'x'})
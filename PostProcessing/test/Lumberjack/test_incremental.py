@@ -0,0 +1,57 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest2 as unittest
+
+from Karma.PostProcessing.Lumberjack import ProcessedFilesManifest, get_file_checksum, get_task_key
+
+
+class TestProcessedFilesManifest(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+        self._input_files = []
+        for _i in range(3):
+            self._input_files.append(os.path.join(self._dir, 'input_{}.root'.format(_i)))
+            with open(self._input_files[-1], 'w') as _f:
+                _f.write('events {}'.format(_i))
+
+    def tearDown(self):
+        shutil.rmtree(self._dir)
+
+    def test_all_files_new(self):
+        _manifest = ProcessedFilesManifest('key')
+        _new_entries = _manifest.get_new_files(self._input_files)
+        self.assertEqual([_entry['path'] for _entry in _new_entries], self._input_files)
+        self.assertEqual(_new_entries[0]['checksum'], get_file_checksum(self._input_files[0]))
+
+    def test_only_new_files(self):
+        _manifest = ProcessedFilesManifest('key')
+        _manifest.add(_manifest.get_new_files(self._input_files[:2]))
+        _new_entries = _manifest.get_new_files(self._input_files)
+        self.assertEqual([_entry['path'] for _entry in _new_entries], self._input_files[2:])
+
+    def test_moved_file_not_new(self):
+        _manifest = ProcessedFilesManifest('key')
+        _manifest.add(_manifest.get_new_files(self._input_files))
+        _moved_file = os.path.join(self._dir, 'moved.root')
+        shutil.move(self._input_files[0], _moved_file)
+        self.assertEqual(_manifest.get_new_files([_moved_file] + self._input_files[1:]), [])
+
+    def test_changed_file(self):
+        _manifest = ProcessedFilesManifest('key')
+        _manifest.add(_manifest.get_new_files(self._input_files))
+        with open(self._input_files[1], 'a') as _f:
+            _f.write(' and more events')
+        os.utime(self._input_files[1], (time.time() + 10, time.time() + 10))
+        with self.assertRaises(ValueError):
+            _manifest.get_new_files(self._input_files)
+
+
+class TestTaskKey(unittest.TestCase):
+
+    def test_key_depends_on_task(self):
+        _description = dict(histograms=['jet1pt'], profiles=None)
+        self.assertEqual(get_task_key(_description), get_task_key(dict(profiles=None, histograms=['jet1pt'])))
+        self.assertNotEqual(get_task_key(_description), get_task_key(dict(_description, histograms=['jet1pt', 'jet2pt'])))
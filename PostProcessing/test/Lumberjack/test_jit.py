@@ -0,0 +1,51 @@
+import unittest2 as unittest
+
+from Karma.PostProcessing.Lumberjack import ExpressionCompiler
+
+
+class TestExpressionCompiler(unittest.TestCase):
+
+    COLUMN_TYPES = {
+        'met': 'Float_t',
+        'sumEt': 'Float_t',
+        'jet1pt': 'Float_t',
+        'yboost': 'Double_t',
+    }
+
+    BASE_OPERATIONS = (
+        ('Define', 'metOverSumET', 'met/sumEt'),
+        ('Filter', 'jet1pt > 100'),
+    )
+
+    def _get_compiler(self):
+        _compiler = ExpressionCompiler(None, column_types=self.COLUMN_TYPES)
+        _compiler.add_operations(self.BASE_OPERATIONS + (('Filter', '0<=yboost&&yboost<1'),))
+        _compiler.add_operations(self.BASE_OPERATIONS + (('Filter', '1<=yboost&&yboost<2'),))
+        _compiler.add_operations(self.BASE_OPERATIONS + (('Filter', 'metOverSumET < 0.3'),))
+        return _compiler
+
+    def test_shared_prefixes(self):
+        # 2 base operations + 3 split filters
+        self.assertEqual(self._get_compiler().n_operations, 5)
+
+    def test_branch_column_types(self):
+        _code = self._get_compiler().get_cpp_code(namespace='lumberjack::jit::test')
+        self.assertIn('    auto op0 = [](const Float_t& met, const Float_t& sumEt) { return (met/sumEt); };', _code)
+        self.assertIn('    auto op1 = [](const Float_t& jet1pt) { return (jet1pt > 100); };', _code)
+
+    def test_defined_column_types(self):
+        _code = self._get_compiler().get_cpp_code(namespace='lumberjack::jit::test')
+        self.assertIn('    using type0 = typename std::decay<decltype(op0(std::declval<const Float_t&>(), std::declval<const Float_t&>()))>::type;', _code)
+        self.assertIn('    auto op4 = [](const type0& metOverSumET) { return (metOverSumET < 0.3); };', _code)
+
+    def test_node_tree(self):
+        _code = self._get_compiler().get_cpp_code(namespace='lumberjack::jit::test')
+        self.assertIn('nodes.emplace_back(root.Define("metOverSumET", op0, {"met", "sumEt"}));', _code)
+        self.assertIn('nodes.emplace_back(nodes[0].Filter(op1, {"jet1pt"}));', _code)
+        for _i in (2, 3, 4):
+            self.assertIn('nodes.emplace_back(nodes[1].Filter(op{}, '.format(_i), _code)
+
+    def test_namespace(self):
+        _code = self._get_compiler().get_cpp_code(namespace='lumberjack::jit::test')
+        self.assertIn('namespace lumberjack {\nnamespace jit {\nnamespace test {', _code)
+        self.assertIn('std::vector<ROOT::RDF::RNode> build(ROOT::RDF::RNode root) {', _code)
@@ -0,0 +1,37 @@
+import unittest2 as unittest
+
+from Karma.PostProcessing.Lumberjack import OutputWriter, get_compression_settings, get_manifest_path
+
+
+class TestCompressionSettings(unittest.TestCase):
+
+    def test_settings(self):
+        self.assertEqual(get_compression_settings('LZ4:4'), 404)
+        self.assertEqual(get_compression_settings('zstd:5'), 505)
+        self.assertEqual(get_compression_settings('ZLIB:1'), 101)
+
+    def test_invalid(self):
+        for _spec in ('LZ4', 'LZ4:fast', 'LZ5:4', 'ZSTD:10'):
+            with self.assertRaises(ValueError):
+                get_compression_settings(_spec)
+
+
+class TestOutputWriter(unittest.TestCase):
+
+    def test_objects_by_directory(self):
+        _objects = {
+            'YB01': {'h_pt': 'a', 'eta': {'p_pt': 'b'}},
+            'YB12': {'h_pt': 'c', 'h_eta': 'd'},
+        }
+        self.assertEqual(
+            OutputWriter.get_objects_by_directory(_objects),
+            {
+                '': [],
+                'YB01': [('h_pt', 'a')],
+                'YB01/eta': [('p_pt', 'b')],
+                'YB12': [('h_eta', 'd'), ('h_pt', 'c')],
+            }
+        )
+
+    def test_manifest_path(self):
+        self.assertEqual(get_manifest_path('out/MainShapes.root'), 'out/MainShapes.manifest.json')
@@ -0,0 +1,73 @@
+import os
+import shutil
+import tempfile
+import unittest2 as unittest
+
+from Karma.PostProcessing.Lumberjack import expand_input_files, partition_files, run_in_process_pool
+
+
+class TestExpandInputFiles(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+        self._files = []
+        for _name in ('a_1.root', 'a_2.root', 'b_1.root'):
+            _path = os.path.join(self._dir, _name)
+            open(_path, 'w').close()
+            self._files.append(_path)
+
+    def tearDown(self):
+        shutil.rmtree(self._dir)
+
+    def test_single_file(self):
+        self.assertEqual(expand_input_files(self._files[0]), [self._files[0]])
+        self.assertEqual(expand_input_files([self._files[0]]), [self._files[0]])
+
+    def test_glob(self):
+        self.assertEqual(expand_input_files([os.path.join(self._dir, 'a_*.root')]), self._files[:2])
+
+    def test_glob_no_match(self):
+        _pattern = os.path.join(self._dir, 'c_*.root')
+        self.assertEqual(expand_input_files([_pattern]), [_pattern])
+
+    def test_file_list(self):
+        _list_path = os.path.join(self._dir, 'files.txt')
+        with open(_list_path, 'w') as _f:
+            _f.write("# comment\n{}\n\n{}\n".format(self._files[2], os.path.join(self._dir, 'a_*.root')))
+        self.assertEqual(expand_input_files(['@' + _list_path]), [self._files[2]] + self._files[:2])
+
+    def test_duplicates_removed(self):
+        self.assertEqual(
+            expand_input_files([self._files[1], os.path.join(self._dir, '*.root')]),
+            [self._files[1], self._files[0], self._files[2]]
+        )
+
+
+class TestPartitionFiles(unittest.TestCase):
+
+    def test_balanced(self):
+        _groups = partition_files(['a', 'b', 'c', 'd'], 2, sizes=[4, 3, 2, 1])
+        self.assertEqual(_groups, [['a', 'd'], ['b', 'c']])
+
+    def test_more_groups_than_files(self):
+        _groups = partition_files(['a', 'b'], 4, sizes=[1, 1])
+        self.assertEqual(sorted(_groups), [['a'], ['b']])
+
+    def test_order_kept(self):
+        _groups = partition_files(['a', 'b', 'c', 'd', 'e'], 1, sizes=[1, 5, 2, 4, 3])
+        self.assertEqual(_groups, [['a', 'b', 'c', 'd', 'e']])
+
+
+class TestRunInProcessPool(unittest.TestCase):
+
+    def test_closure(self):
+        _offset = 10
+        def _add_offset(x):
+            return x + _offset
+        self.assertEqual(run_in_process_pool(_add_offset, [(1,), (2,), (3,)], 2), [11, 12, 13])
+
+    def test_callback(self):
+        _reported = []
+        _results = run_in_process_pool(abs, [(-1,), (-2,), (-3,)], 2, max_tasks_per_child=1, callback=_reported.append)
+        self.assertEqual(_results, [1, 2, 3])
+        self.assertEqual(sorted(_reported), [1, 2, 3])
@@ -0,0 +1,41 @@
+import unittest2 as unittest
+
+from Karma.PostProcessing.Lumberjack import ProfileReport
+
+
+class TestProfileReport(unittest.TestCase):
+
+    def test_phases(self):
+        _report = ProfileReport()
+        _report.add_phase('booking', 1.5, name='TaskA')
+        _report.add_phase('booking', 0.5, name='TaskB')
+        with _report.phase('write', name='TaskA') as _record:
+            pass
+
+        _dict = _report.to_dict()
+        self.assertEqual(_dict['phases']['booking'], 2.0)
+        self.assertEqual(_dict['phases']['write'], _record['seconds'])
+        self.assertEqual([_r['name'] for _r in _dict['phase_records']], ['TaskA', 'TaskB', 'TaskA'])
+
+    def test_event_loops(self):
+        _report = ProfileReport()
+        _report.add_event_loop('TaskA', 1000, 2.0, bytes_read=4096, slot_events=[600, 400], slot_seconds=[1.9, 2.0])
+
+        _event_loop = _report.to_dict()['event_loops'][0]
+        self.assertEqual(_event_loop['events_per_second'], 500)
+        self.assertEqual([_s['n_events'] for _s in _event_loop['slots']], [600, 400])
+        self.assertEqual([_s['events_per_second'] for _s in _event_loop['slots']], [300, 200])
+        self.assertEqual([_s['active_seconds'] for _s in _event_loop['slots']], [1.9, 2.0])
+
+    def test_totals_include_workers(self):
+        _worker_report = ProfileReport()
+        _worker_report.add_event_loop('TaskA', 1000, 2.0, bytes_read=4096)
+
+        _report = ProfileReport()
+        _report.add_event_loop('TaskB', 500, 1.0)
+        _report.add_worker('process 0', _worker_report.to_dict())
+
+        _dict = _report.to_dict()
+        self.assertEqual(_dict['n_events'], 1500)
+        self.assertEqual(_dict['bytes_read'], 4096)
+        self.assertEqual(_dict['workers'][0]['name'], 'process 0')
@@ -0,0 +1,137 @@
+import unittest2 as unittest
+
+from Karma.PostProcessing.Lumberjack import DataFrameNodeCache, SplittingIndex
+
+
+class TestSplittingIndex(unittest.TestCase):
+
+    SPLITTING_YBYS = {
+        'inclusive': dict(),
+        'YB01_YS01': dict(yboost=(0, 1), ystar=(0, 1)),
+        'YB01_YS12': dict(yboost=(0, 1), ystar=(1, 2)),
+        'YB12_YS01': dict(yboost=(1, 2), ystar=(0, 1)),
+    }
+
+    SPLITTING_SIGN = {
+        'negative': dict(sign=-1),
+        'positive': dict(sign=1),
+    }
+
+    def _get_value(self, split_index, *variable_values):
+        _index = split_index.get_index(*variable_values)
+        if _index == -1:
+            return None
+        return split_index._values[_index]
+
+    def test_intervals_indexable(self):
+        _si = SplittingIndex('ybys', self.SPLITTING_YBYS)
+        self.assertTrue(_si.is_indexable)
+        self.assertIsNone(_si.reason)
+        self.assertEqual(_si.variables, ['yboost', 'ystar'])
+
+    def test_intervals_lookup(self):
+        _si = SplittingIndex('ybys', self.SPLITTING_YBYS)
+        self.assertEqual(self._get_value(_si, 0.5, 0.5), 'YB01_YS01')
+        self.assertEqual(self._get_value(_si, 0.0, 1.0), 'YB01_YS12')
+        self.assertEqual(self._get_value(_si, 1.5, 0.99), 'YB12_YS01')
+
+    def test_intervals_lookup_gap_and_outside(self):
+        _si = SplittingIndex('ybys', self.SPLITTING_YBYS)
+        # (yboost, ystar) in [1, 2) x [1, 2) not covered by any value
+        self.assertIsNone(self._get_value(_si, 1.5, 1.5))
+        # upper edges are exclusive
+        self.assertIsNone(self._get_value(_si, 2.0, 0.5))
+        self.assertIsNone(self._get_value(_si, -0.1, 0.5))
+        self.assertIsNone(self._get_value(_si, float('nan'), 0.5))
+
+    def test_vectorized_lookup(self):
+        _si = SplittingIndex('ybys', self.SPLITTING_YBYS)
+        _yboost = [0.5, 0.0, 1.5, 1.5, 2.0, -0.1, float('nan')]
+        _ystar = [0.5, 1.0, 0.99, 1.5, 0.5, 0.5, 0.5]
+        self.assertEqual(
+            list(_si.get_indices(_yboost, _ystar)),
+            [_si.get_index(_yb, _ys) for _yb, _ys in zip(_yboost, _ystar)]
+        )
+
+        _si = SplittingIndex('sign', self.SPLITTING_SIGN)
+        self.assertEqual(list(_si.get_indices([-1, 0, 1, 2])), [0, -1, 1, -1])
+
+    def test_variable_expressions(self):
+        _si = SplittingIndex('sign', self.SPLITTING_SIGN, variable_expressions={'sign': '((bits>>3)&1)'})
+        self.assertEqual(_si.expression, "{}(((bits>>3)&1))".format(_si.function_name))
+
+    def test_catch_all_values_need_no_filter(self):
+        _si = SplittingIndex('ybys', self.SPLITTING_YBYS)
+        self.assertIsNone(_si.get_filter_expression('inclusive'))
+        self.assertEqual(
+            _si.get_filter_expression('YB01_YS12'),
+            "{}=={}".format(_si.column_name, _si.get_value_index('YB01_YS12'))
+        )
+
+    def test_exact_values_lookup(self):
+        _si = SplittingIndex('sign', self.SPLITTING_SIGN)
+        self.assertTrue(_si.is_indexable)
+        self.assertEqual(self._get_value(_si, -1), 'negative')
+        self.assertEqual(self._get_value(_si, 1), 'positive')
+        self.assertIsNone(self._get_value(_si, 0))
+
+    def test_overlap_not_indexable(self):
+        _si = SplittingIndex('overlap', {
+            'low': dict(x=(0, 2)),
+            'high': dict(x=(1, 3)),
+        })
+        self.assertFalse(_si.is_indexable)
+        self.assertIn('overlap', _si.reason)
+
+    def test_different_variables_not_indexable(self):
+        _si = SplittingIndex('triggers', {
+            'all': dict(),
+            'A': dict(triggerA=1),
+            'B': dict(triggerB=1),
+        })
+        self.assertFalse(_si.is_indexable)
+
+    def test_only_catch_all_values(self):
+        _si = SplittingIndex('none', {'everything': dict()})
+        self.assertTrue(_si.is_indexable)
+        self.assertEqual(_si.variables, [])
+        self.assertIsNone(_si.get_filter_expression('everything'))
+
+
+class DummyDataFrame(object):
+    """records the operations applied to it"""
+    def __init__(self, operations=()):
+        self.operations = operations
+
+    def Filter(self, expression):
+        return DummyDataFrame(self.operations + (('Filter', expression),))
+
+    def Define(self, name, expression):
+        return DummyDataFrame(self.operations + (('Define', name, expression),))
+
+
+class TestDataFrameNodeCache(unittest.TestCase):
+
+    def test_operations_applied_in_order(self):
+        _cache = DataFrameNodeCache(DummyDataFrame())
+        _ops = (('Define', 'y', 'abs(x)'), ('Filter', 'y < 1'))
+        self.assertEqual(_cache.get_node(_ops).operations, _ops)
+
+    def test_shared_prefix_created_once(self):
+        _cache = DataFrameNodeCache(DummyDataFrame())
+        _node_a = _cache.get_node([('Filter', 'x > 0'), ('Filter', 'y == 1')])
+        _node_b = _cache.get_node([('Filter', 'x > 0'), ('Filter', 'y == 2')])
+        self.assertEqual(_cache.n_nodes, 3)
+        self.assertIs(_cache.get_node([('Filter', 'x > 0')]), _cache.get_node([('Filter', 'x > 0')]))
+
+    def test_identical_operations_deduplicated(self):
+        _cache = DataFrameNodeCache(DummyDataFrame())
+        _ops = [('Filter', 'x > 0'), ('Filter', 'y == 1')]
+        self.assertIs(_cache.get_node(_ops), _cache.get_node(list(_ops)))
+        self.assertEqual(_cache.n_nodes, 2)
+
+    def test_empty_operations_return_root(self):
+        _root = DummyDataFrame()
+        _cache = DataFrameNodeCache(_root)
+        self.assertIs(_cache.get_node([]), _root)
+        self.assertEqual(_cache.n_nodes, 0)
@@ -0,0 +1,128 @@
+import numpy as np
+import unittest2 as unittest
+
+from Karma.PostProcessing.Lumberjack import RootMacros, UnsupportedExpressionError, VectorizedExpression, compile_expression
+
+
+class TestVectorizedExpression(unittest.TestCase):
+
+    COLUMNS = dict(
+        hltBits=np.array([1024, 3, 3072], dtype=np.uint64),
+        met=np.array([1.0, 2.0, 3.0]),
+        sumEt=np.array([2.0, 0.0, 3.0]),
+        jet1y=np.array([-3.5, 1.0, 2.9]),
+        n=np.array([7, -7, 3], dtype=np.int32),
+    )
+
+    def _evaluate(self, expression):
+        return VectorizedExpression(expression)(self.COLUMNS)
+
+    def test_columns(self):
+        self.assertEqual(VectorizedExpression("abs(jet1y) < 3.0 && met/sumEt > 0.5").columns, set(['jet1y', 'met', 'sumEt']))
+
+    def test_bit_operations(self):
+        self.assertEqual(list(self._evaluate("(hltBits&1024)>0")), [True, False, True])
+        self.assertEqual(self._evaluate("0x10|1<<2"), 20)
+
+    def test_logical_operators(self):
+        self.assertEqual(list(self._evaluate("abs(jet1y) < 3.0 && met > 1")), [False, True, True])
+        self.assertEqual(list(self._evaluate("!(met > 1) || jet1y < 0")), [True, False, False])
+
+    def test_precedence(self):
+        self.assertEqual(self._evaluate("1 + 2 * 3 == 7 && 2 - 1 - 1 == 0"), True)
+        self.assertEqual(list(self._evaluate("-n * 2 + 3")), [-11, 17, -3])
+
+    def test_division(self):
+        # division by zero gives inf, like in C++
+        self.assertEqual(list(self._evaluate("met/sumEt")), [0.5, float('inf'), 1.0])
+        # integer division and remainder truncate towards zero
+        self.assertEqual(list(self._evaluate("n/2")), [3, -3, 1])
+        self.assertEqual(list(self._evaluate("n%3")), [1, -1, 0])
+        self.assertEqual(self._evaluate("1/2"), 0)
+        self.assertEqual(self._evaluate("1./2"), 0.5)
+
+    def test_functions(self):
+        self.assertAlmostEqual(self._evaluate("2*TMath::Pi()"), 2 * np.pi)
+        self.assertEqual(list(self._evaluate("TMath::Sq(met)")), [1.0, 4.0, 9.0])
+        self.assertEqual(list(self._evaluate("fmod(met, 2.f)")), [1.0, 0.0, 1.0])
+        self.assertEqual(list(self._evaluate("std::abs(n)")), [7, 7, 3])
+
+    def test_ternary_and_casts(self):
+        self.assertEqual(list(self._evaluate("met > 1 ? n : -1")), [-1, -7, 3])
+        self.assertEqual(list(self._evaluate("met < 2 ? 0 : met < 3 ? 1 : 2")), [0, 1, 2])
+        self.assertEqual(list(self._evaluate("(double)n/2")), [3.5, -3.5, 1.5])
+        self.assertEqual(list(self._evaluate("static_cast<int>(jet1y)")), [-3, 1, 2])
+
+    def test_cache(self):
+        self.assertIs(compile_expression("met/sumEt"), compile_expression("met/sumEt"))
+
+    def test_unsupported(self):
+        for _expression in ("getWeightForStitching(binningValue)", "jet.pt", "jets[0]", "TMath::Foo", "(met"):
+            with self.assertRaises(UnsupportedExpressionError):
+                VectorizedExpression(_expression)
+
+    def test_error_message(self):
+        with self.assertRaises(UnsupportedExpressionError) as _context:
+            VectorizedExpression("getWeightForStitching(binningValue)")
+        self.assertIn("getWeightForStitching", str(_context.exception))
+
+
+class TestRootMacros(unittest.TestCase):
+
+    MACROS = RootMacros("""
+        #define IDX_HLT_A 1
+        #define LUMI_WEIGHT_A 1.0e6/2.0e6
+        #define SQUARE(x) ((x)*(x))
+        static const double WEIGHTS[] = {0.5, 1.0, 2.0};
+
+        double getWeightForStitching(const double& binningValue) {
+            if (binningValue < 15) return 0;
+            else if (binningValue < 30) return 45.6;
+            else if (binningValue < 50) return 13.9;
+            else return 0;
+        }
+
+        double getLumiWeight(const double& ptave, const unsigned long& hltBits) {
+            if (ptave > 40 && (hltBits & (1 << IDX_HLT_A)) > 0) {
+                return LUMI_WEIGHT_A;
+            }
+            return 0;
+        }
+
+        int getBin(double x) {
+            static const double edges[] = {0., 10., 20.};
+            return (x < edges[1]) ? 0 : (x < edges[2]) ? 1 : 2;
+        }
+
+        double sumUp(double x) {
+            double _sum = 0;
+            for (int i = 0; i < 3; ++i) _sum += x;
+            return _sum;
+        }
+    """)
+
+    COLUMNS = dict(
+        ptave=np.array([10.0, 20.0, 45.0, 60.0]),
+        hltBits=np.array([2, 2, 2, 1], dtype=np.uint64),
+    )
+
+    def _evaluate(self, expression):
+        return list(compile_expression(expression, macros=self.MACROS)(self.COLUMNS))
+
+    def test_if_else_chain(self):
+        self.assertEqual(self._evaluate("getWeightForStitching(ptave)"), [0.0, 45.6, 13.9, 0.0])
+
+    def test_defines_and_bits(self):
+        self.assertEqual(self._evaluate("getLumiWeight(ptave, hltBits)"), [0.0, 0.0, 0.5, 0.0])
+        self.assertEqual(self._evaluate("(hltBits & (1 << IDX_HLT_A)) > 0"), [True, True, True, False])
+
+    def test_lookup_tables(self):
+        self.assertEqual(self._evaluate("getBin(ptave)"), [1, 2, 2, 2])
+        self.assertEqual(self._evaluate("WEIGHTS[getBin(ptave - 10)]"), [0.5, 1.0, 2.0, 2.0])
+
+    def test_unsupported(self):
+        for _expression, _reason in [("sumUp(ptave)", "'for'"), ("SQUARE(ptave)", "function-like"),
+                                     ("getBin(ptave, 1)", "argument"), ("getFoo(ptave)", "getFoo")]:
+            with self.assertRaises(UnsupportedExpressionError) as _context:
+                compile_expression(_expression, macros=self.MACROS)
+            self.assertIn(_reason, str(_context.exception))